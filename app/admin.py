@@ -1,31 +1,249 @@
-"""Admin configuration for app models."""
+"""Admin configuration for app models.
+
+Change lists stay cheap on large tables: related rows are joined instead
+of fetched per row, searches only use indexed lookups (``contract-number``
+keys, name and address prefixes), foreign keys are edited as raw ids, and
+big tables are paginated with :class:`ApproximatePaginator` instead of a
+full ``COUNT(*)``.
+"""
 
 from django.contrib import admin
+from django.core.paginator import Paginator
+from django.db.models import AutoField, BigAutoField, Max, Min, Q, Value
+from django.db.models.functions import Concat, Lower
+from django.utils.functional import cached_property
+
+from .models import (
+    Contract,
+    ContractStats,
+    Park,
+    StandSnapshot,
+    Station,
+    StationAvailability,
+)
+
+
+class ApproximatePaginator(Paginator):
+    """Paginator that never counts more than ``CAP`` matching rows.
+
+    Unfiltered tables with an integer primary key are sized from their
+    smallest and largest key, two index lookups. Other querysets count at
+    most ``CAP + 1`` rows, so past that the last page is an estimate.
+    """
+
+    CAP = 10_000
+
+    @cached_property
+    def count(self) -> int:
+        queryset = self.object_list
+        pk = queryset.model._meta.pk
+        if not queryset.query.where and isinstance(
+            pk, (AutoField, BigAutoField)
+        ):
+            bounds = queryset.order_by().aggregate(
+                low=Min("pk"), high=Max("pk")
+            )
+            if bounds["low"] is None:
+                return 0
+            return bounds["high"] - bounds["low"] + 1
+        return queryset.order_by()[: self.CAP + 1].count()
+
+
+class ContractFilter(admin.SimpleListFilter):
+    """Filter by contract, listing names without loading contract rows."""
+
+    title = "contract"
+    parameter_name = "contract"
+
+    def lookups(self, request, model_admin):
+        return Contract.objects.order_by("name").values_list(
+            "name", "commercial_name"
+        )
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(contract_id=self.value())
+        return queryset
+
+
+class NaturalKeySearchMixin:
+    """Look up ``"<contract>-<number>"`` searches on the natural key.
+
+    ``natural_key`` is the path to the model holding ``contract`` and
+    ``number``, empty for the model itself. With ``key_only``, other
+    searches match nothing instead of falling back to ``search_fields``.
+    """
+
+    natural_key = ""
+    key_only = False
+
+    def get_search_results(self, request, queryset, search_term):
+        try:
+            contract, number = Station.parse_key(search_term.strip())
+        except ValueError:
+            if self.key_only and search_term:
+                return queryset.none(), False
+            return super().get_search_results(
+                request, queryset, search_term
+            )
+        return (
+            queryset.filter(
+                **{
+                    f"{self.natural_key}contract_id": contract,
+                    f"{self.natural_key}number": number,
+                }
+            ),
+            False,
+        )
 
-from .models import Contract, Park, Stand, Station
+
+class PrefixSearchMixin:
+    """Match searches as a case-insensitive prefix of any ``search_fields``.
+
+    Each field is compared as a range on ``LOWER(field)``, which the
+    field's ``Lower`` expression index serves on every backend. Django's
+    own ``^field`` search compiles to lookups that no index serves on some
+    backends.
+    """
+
+    # Sorts after any character, closing the prefix range.
+    LAST_CHARACTER = "\U0010ffff"
+
+    def get_search_results(self, request, queryset, search_term):
+        term = search_term.strip().strip("\"'")
+        if not term:
+            return queryset, False
+        low = Lower(Value(term))
+        high = Concat(low, Value(self.LAST_CHARACTER))
+        match = Q()
+        for field in self.search_fields:
+            alias = f"{field}_lower"
+            queryset = queryset.alias(**{alias: Lower(field)})
+            match |= Q(
+                **{
+                    f"{alias}__gte": low,
+                    f"{alias}__lt": high,
+                    # Exact where the collation does not sort by code point.
+                    f"{alias}__startswith": low,
+                }
+            )
+        return queryset.filter(match), False
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    paginator = ApproximatePaginator
+    show_full_result_count = False
+
+
+class ContractStatsInline(admin.StackedInline):
+    model = ContractStats
+    can_delete = False
+    readonly_fields = [
+        "stations",
+        "bikes",
+        "electrical_bikes",
+        "stands",
+        "empty_stations",
+        "full_stations",
+        "closed_stations",
+        "updated",
+    ]
 
 
 @admin.register(Contract)
 class ContractAdmin(admin.ModelAdmin):
-    list_display = ["name", "commercial_name", "country_code"]
+    list_display = [
+        "name",
+        "commercial_name",
+        "country_code",
+        "stations",
+        "bikes",
+    ]
+    list_select_related = ["stats"]
+    inlines = [ContractStatsInline]
+
+    @admin.display(ordering="stats__stations")
+    def stations(self, obj):
+        return obj.stats.stations if hasattr(obj, "stats") else None
+
+    @admin.display(ordering="stats__bikes")
+    def bikes(self, obj):
+        return obj.stats.bikes if hasattr(obj, "stats") else None
+
+
+class AvailabilityInline(admin.StackedInline):
+    model = StationAvailability
+    can_delete = False
+    fieldsets = [
+        (kind.capitalize(), {"fields": StationAvailability.columns(kind)})
+        for kind in StationAvailability.KINDS
+    ]
+    readonly_fields = [
+        column
+        for kind in StationAvailability.KINDS
+        for column in StationAvailability.columns(kind)
+    ]
+
+    def has_add_permission(self, request, obj=None):
+        return False
 
 
 @admin.register(Station)
-class StationAdmin(admin.ModelAdmin):
-    list_display = ["contract", "number", "name", "status", "last_update"]
-    list_filter = ["contract", "status", "banking", "bonus"]
-    search_fields = ["name", "address", "number"]
+class StationAdmin(NaturalKeySearchMixin, PrefixSearchMixin, LargeTableAdmin):
+    list_display = [
+        "contract",
+        "number",
+        "name",
+        "status",
+        "bikes",
+        "stands",
+        "last_update",
+    ]
+    list_filter = [ContractFilter, "status", "banking", "bonus"]
+    list_select_related = ["contract", "availability"]
+    search_fields = ["name", "address"]
+    search_help_text = (
+        "Station key, e.g. lyon-1001, or the start of a name or address."
+    )
+    inlines = [AvailabilityInline]
 
+    @admin.display(ordering="availability__total_bikes")
+    def bikes(self, obj):
+        if not hasattr(obj, "availability"):
+            return None
+        return obj.availability.total_bikes
 
-@admin.register(Stand)
-class StandAdmin(admin.ModelAdmin):
-    list_display = ["station", "kind", "capacity", "bikes", "stands"]
-    list_filter = ["kind"]
-    search_fields = ["station__name"]
+    @admin.display(ordering="availability__total_stands")
+    def stands(self, obj):
+        if not hasattr(obj, "availability"):
+            return None
+        return obj.availability.total_stands
 
 
 @admin.register(Park)
-class ParkAdmin(admin.ModelAdmin):
+class ParkAdmin(NaturalKeySearchMixin, PrefixSearchMixin, admin.ModelAdmin):
     list_display = ["contract", "number", "name", "status"]
-    list_filter = ["contract", "status", "city"]
-    search_fields = ["name", "address", "number"]
+    list_filter = [ContractFilter, "status", "city"]
+    list_select_related = ["contract"]
+    search_fields = ["name", "address"]
+    search_help_text = (
+        "Park key, e.g. lyon-1, or the start of a name or address."
+    )
+
+
+@admin.register(StandSnapshot)
+class StandSnapshotAdmin(NaturalKeySearchMixin, LargeTableAdmin):
+    list_display = ["station", "ts", "bikes", "electrical_bikes", "stands"]
+    list_select_related = ["station"]
+    search_fields = ["station"]
+    search_help_text = "Station key, e.g. lyon-1001."
+    natural_key = "station__"
+    key_only = True
+    raw_id_fields = ["station"]
+    ordering = ["-ts"]
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
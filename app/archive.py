@@ -0,0 +1,361 @@
+"""Compressed columnar day files for raw availability snapshots.
+
+Each UTC day of ``StandSnapshot`` rows is sealed into one file::
+
+    header   magic "VTA1", day start (epoch seconds), station count
+    index    per station: key, block offset, block size, sample count,
+             first and last timestamp (ms since the day start)
+    blocks   per station, zlib compressed: four fixed-width little-endian
+             columns (ts uint32, bikes/electrical_bikes/stands int16),
+             each delta encoded against the previous sample
+
+:class:`DayArchive` memory-maps a file and only decompresses the block of
+the requested station, so series reads never load a whole day.
+"""
+
+import mmap
+import os
+import struct
+import sys
+import threading
+import zlib
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from itertools import accumulate, groupby
+from operator import itemgetter
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+from django.conf import settings
+from django.db import transaction
+
+from .history import bucket_start
+from .models import StandSnapshot, Station
+
+MAGIC = b"VTA1"
+SUFFIX = ".vta"
+_HEADER = struct.Struct("<4sqI")
+_ENTRY = struct.Struct("<QIIII")
+_NAME = struct.Struct("<H")
+# Column name -> array typecode of its deltas.
+COLUMNS = {
+    "ts": "I",
+    "bikes": "h",
+    "electrical_bikes": "h",
+    "stands": "h",
+}
+_VALUES = tuple(COLUMNS)[1:]
+
+# Opened day files an ``Archive`` keeps mapped.
+MAX_OPEN_DAYS = 32
+
+PathLike = Union[str, Path]
+# ``(mtime_ns, size, inode)`` of a day file.
+StatKey = Tuple[int, int, int]
+
+
+def archive_dir() -> Path:
+    return Path(settings.HISTORY_ARCHIVE_DIR)
+
+
+def day_path(directory: PathLike, day: datetime) -> Path:
+    return Path(directory) / f"{day:%Y-%m-%d}{SUFFIX}"
+
+
+def _deltas(values: List[int]) -> List[int]:
+    return [b - a for a, b in zip([0] + values, values)]
+
+
+def _pack(typecode: str, values: List[int]) -> bytes:
+    column = array(typecode, values)
+    if sys.byteorder == "big":
+        column.byteswap()
+    return column.tobytes()
+
+
+def _unpack(typecode: str, data: bytes) -> array:
+    column = array(typecode)
+    column.frombytes(data)
+    if sys.byteorder == "big":
+        column.byteswap()
+    return column
+
+
+@dataclass
+class Series:
+    """Samples of one station, oldest first."""
+
+    ts: List[datetime] = field(default_factory=list)
+    bikes: List[int] = field(default_factory=list)
+    electrical_bikes: List[int] = field(default_factory=list)
+    stands: List[int] = field(default_factory=list)
+
+    def __len__(self) -> int:
+        return len(self.ts)
+
+    def extend(self, other: "Series") -> None:
+        self.ts.extend(other.ts)
+        self.bikes.extend(other.bikes)
+        self.electrical_bikes.extend(other.electrical_bikes)
+        self.stands.extend(other.stands)
+
+
+def encode_block(day: datetime, rows: List[Tuple]) -> Tuple[bytes, int, int]:
+    """Compress ``(ts, bikes, electrical_bikes, stands)`` rows of a station.
+
+    Returns the block and the first and last offsets in ms from ``day``.
+    """
+    start = day.timestamp()
+    offsets = [round((row[0].timestamp() - start) * 1000) for row in rows]
+    parts = [_pack("I", _deltas(offsets))]
+    for i, name in enumerate(_VALUES, start=1):
+        parts.append(_pack(COLUMNS[name], _deltas([row[i] for row in rows])))
+    return zlib.compress(b"".join(parts)), offsets[0], offsets[-1]
+
+
+def write_day(
+    path: PathLike, day: datetime, stations: Dict[str, List[Tuple]]
+) -> int:
+    """Write a day file atomically; return its size in bytes."""
+    names = sorted(stations)
+    blocks = [encode_block(day, stations[name]) for name in names]
+    index_size = sum(
+        _NAME.size + len(name.encode()) + _ENTRY.size for name in names
+    )
+    offset = _HEADER.size + index_size
+    parts = [_HEADER.pack(MAGIC, int(day.timestamp()), len(names))]
+    for name, (block, first, last) in zip(names, blocks):
+        encoded = name.encode()
+        parts.append(_NAME.pack(len(encoded)) + encoded)
+        parts.append(
+            _ENTRY.pack(offset, len(block), len(stations[name]), first, last)
+        )
+        offset += len(block)
+    parts.extend(block for block, _, _ in blocks)
+    path = Path(path)
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "wb") as fh:
+        fh.writelines(parts)
+    os.replace(tmp, path)
+    return offset
+
+
+class DayArchive:
+    """Read-only, memory-mapped view of one sealed day."""
+
+    def __init__(self, path: PathLike):
+        self.path = Path(path)
+        with open(self.path, "rb") as fh:
+            self._mmap = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, day, count = _HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f"{self.path} is not a snapshot archive")
+        self.day = datetime.fromtimestamp(day, tz=timezone.utc)
+        self.index: Dict[str, Tuple[int, int, int, int, int]] = {}
+        pos = _HEADER.size
+        for _ in range(count):
+            (size,) = _NAME.unpack_from(self._mmap, pos)
+            pos += _NAME.size
+            name = self._mmap[pos : pos + size].decode()
+            pos += size
+            self.index[name] = _ENTRY.unpack_from(self._mmap, pos)
+            pos += _ENTRY.size
+
+    def __enter__(self) -> "DayArchive":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._mmap.close()
+
+    @property
+    def stations(self) -> List[str]:
+        return list(self.index)
+
+    def series(
+        self,
+        station_id: str,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+    ) -> Series:
+        """Samples of ``station_id`` with ``start <= ts < end``."""
+        entry = self.index.get(station_id)
+        if entry is None:
+            return Series()
+        offset, size, count, first, last = entry
+        low = 0 if start is None else self._offset(start)
+        high = last + 1 if end is None else self._offset(end)
+        if high <= first or low > last:
+            return Series()
+        data = zlib.decompress(self._mmap[offset : offset + size])
+        columns = []
+        pos = 0
+        for typecode in COLUMNS.values():
+            width = array(typecode).itemsize * count
+            column = _unpack(typecode, data[pos : pos + width])
+            columns.append(list(accumulate(column)))
+            pos += width
+        offsets = columns[0]
+        i, j = bisect_left(offsets, low), bisect_left(offsets, high)
+        return Series(
+            [self.day + timedelta(milliseconds=ms) for ms in offsets[i:j]],
+            *(column[i:j] for column in columns[1:]),
+        )
+
+    def _offset(self, ts: datetime) -> int:
+        return max(0, round((ts - self.day).total_seconds() * 1000))
+
+
+class Archive:
+    """All sealed days in a directory.
+
+    Opened days are kept in a small LRU keyed by path, so repeated series
+    queries decode each day's index once. A cached day is reopened when
+    its file's stat changes, i.e. when the day is sealed again.
+    """
+
+    def __init__(
+        self,
+        directory: Optional[PathLike] = None,
+        max_open: int = MAX_OPEN_DAYS,
+    ):
+        self.directory = Path(directory or archive_dir())
+        self.max_open = max_open
+        self._open: "OrderedDict[Path, Tuple[StatKey, DayArchive]]" = (
+            OrderedDict()
+        )
+        self._lock = threading.Lock()
+
+    def day(self, day: datetime) -> Optional[DayArchive]:
+        """The sealed file of ``day``, or ``None`` if there is none.
+
+        Days dropped from the cache are not closed explicitly, as another
+        thread may still read them; their mapping is released with the
+        last reference.
+        """
+        path = day_path(self.directory, day)
+        try:
+            st = path.stat()
+        except FileNotFoundError:
+            with self._lock:
+                self._open.pop(path, None)
+            return None
+        key = (st.st_mtime_ns, st.st_size, st.st_ino)
+        with self._lock:
+            cached = self._open.get(path)
+            if cached is not None and cached[0] == key:
+                self._open.move_to_end(path)
+                return cached[1]
+            archive = self._open[path] = (key, DayArchive(path))
+            self._open.move_to_end(path)
+            while len(self._open) > self.max_open:
+                self._open.popitem(last=False)
+            return archive[1]
+
+    def days(self) -> List[datetime]:
+        return sorted(
+            datetime.strptime(p.stem, "%Y-%m-%d").replace(tzinfo=timezone.utc)
+            for p in self.directory.glob(f"*{SUFFIX}")
+        )
+
+    def series(
+        self, station_id: str, start: datetime, end: datetime
+    ) -> Series:
+        """Samples of ``station_id`` with ``start <= ts < end``."""
+        result = Series()
+        day = bucket_start(start, 86400)
+        while day < end:
+            archive = self.day(day)
+            if archive is not None:
+                result.extend(archive.series(station_id, start, end))
+            day += timedelta(days=1)
+        return result
+
+
+def seal_day(day: datetime, directory: Optional[PathLike] = None) -> int:
+    """Write the snapshots of ``day`` to its file; return the sample count.
+
+    Stations are stored under their public ``"<contract>-<number>"`` key,
+    so files do not depend on the database's ids. Samples of an existing
+    file for that day are kept and merged with the rows in the database,
+    so sealing a day twice never loses data.
+    """
+    directory = Path(directory or archive_dir())
+    path = day_path(directory, day)
+    stations: Dict[str, Dict[datetime, Tuple]] = {}
+    if path.exists():
+        with DayArchive(path) as archive:
+            for name in archive.stations:
+                s = archive.series(name)
+                stations[name] = {
+                    row[0]: row
+                    for row in zip(
+                        s.ts, s.bikes, s.electrical_bikes, s.stands
+                    )
+                }
+    rows = (
+        StandSnapshot.objects.filter(
+            ts__gte=day, ts__lt=day + timedelta(days=1)
+        )
+        .order_by("station_id", "ts")
+        .values_list("station_id", "ts", *_VALUES)
+    )
+    keys = {
+        pk: Station.make_key(contract, number)
+        for pk, contract, number in Station.objects.values_list(
+            "id", "contract_id", "number"
+        ).iterator(chunk_size=10000)
+    }
+    for station_id, group in groupby(
+        rows.iterator(chunk_size=10000), key=itemgetter(0)
+    ):
+        by_ts = stations.setdefault(keys[station_id], {})
+        for row in group:
+            by_ts[row[1]] = row[1:]
+    if not stations:
+        return 0
+    directory.mkdir(parents=True, exist_ok=True)
+    write_day(
+        path,
+        day,
+        {
+            name: [by_ts[ts] for ts in sorted(by_ts)]
+            for name, by_ts in stations.items()
+        },
+    )
+    return sum(len(by_ts) for by_ts in stations.values())
+
+
+def archive_history(
+    before: datetime, directory: Optional[PathLike] = None
+) -> Iterator[Tuple[datetime, int]]:
+    """Seal every full day before ``before`` and delete its raw rows.
+
+    Yields ``(day, samples in the file)`` per sealed day.
+    """
+    end = bucket_start(before, 86400)
+    first = (
+        StandSnapshot.objects.filter(ts__lt=end)
+        .order_by("ts")
+        .values_list("ts", flat=True)
+        .first()
+    )
+    if first is None:
+        return
+    day = bucket_start(first, 86400)
+    while day < end:
+        next_day = day + timedelta(days=1)
+        with transaction.atomic():
+            samples = seal_day(day, directory)
+            StandSnapshot.objects.filter(
+                ts__gte=day, ts__lt=next_day
+            ).delete()
+        if samples:
+            yield day, samples
+        day = next_day
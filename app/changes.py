@@ -0,0 +1,105 @@
+"""In-process change detection so unchanged stations are never rewritten."""
+
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List
+
+from libs.jcdecauxclient import models as api
+
+from .ingest import NO_STANDS, stands_values
+from .models import Station, StationAvailability
+
+
+def fingerprint(station: api.Station) -> int:
+    """Hash of a station's status and availabilities.
+
+    ``lastUpdate`` is deliberately left out: a station that reports in
+    without any other change is not rewritten.
+    """
+    return hash(
+        (
+            station.status,
+            station.connected,
+            stands_values(station.totalStands),
+            stands_values(station.mainStands),
+            stands_values(station.overflowStands or NO_STANDS),
+        )
+    )
+
+
+@dataclass
+class ChangeSet:
+    """Stations selected for writing and the fingerprints to commit."""
+
+    changed: List[api.Station] = field(default_factory=list)
+    seen: int = 0
+    fingerprints: Dict[str, int] = field(default_factory=dict)
+
+    @property
+    def skipped(self) -> int:
+        return self.seen - len(self.changed)
+
+    @property
+    def skip_ratio(self) -> float:
+        return self.skipped / self.seen if self.seen else 0.0
+
+
+class ChangeDetector:
+    """Remember one fingerprint per station id and filter out repeats.
+
+    Call :meth:`select` before writing and :meth:`commit` once the write
+    succeeded, so a failed write is retried on the next poll.
+    """
+
+    def __init__(self) -> None:
+        self.fingerprints: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.fingerprints)
+
+    def select(self, stations: Iterable[api.Station]) -> ChangeSet:
+        known = self.fingerprints
+        changes = ChangeSet()
+        for station in stations:
+            changes.seen += 1
+            key = Station.make_key(station.contractName, station.number)
+            fp = fingerprint(station)
+            if known.get(key) != fp:
+                changes.changed.append(station)
+                changes.fingerprints[key] = fp
+        return changes
+
+    def commit(self, changes: ChangeSet) -> None:
+        self.fingerprints.update(changes.fingerprints)
+
+    def forget(self, stations: Iterable[api.Station]) -> None:
+        """Drop fingerprints so these stations are selected again."""
+        for station in stations:
+            key = Station.make_key(station.contractName, station.number)
+            self.fingerprints.pop(key, None)
+
+    def warm(self) -> int:
+        """Load fingerprints of the stations already stored in the DB."""
+        size = len(StationAvailability.FIELDS)
+        rows = StationAvailability.objects.values_list(
+            "station__contract_id",
+            "station__number",
+            "station__status",
+            "station__connected",
+            *[
+                column
+                for kind in StationAvailability.KINDS
+                for column in StationAvailability.columns(kind)
+            ],
+        )
+        for contract, number, status, connected, *values in rows.iterator(
+            chunk_size=5000
+        ):
+            key = Station.make_key(contract, number)
+            self.fingerprints[key] = hash(
+                (status, connected)
+                + tuple(
+                    tuple(values[i : i + size])
+                    for i in range(0, len(values), size)
+                )
+            )
+        return len(self.fingerprints)
@@ -0,0 +1,274 @@
+"""Pre-serialized JSON of current availability, served without the ORM.
+
+Each ingestion cycle rewrites one file per changed contract::
+
+    {"etag": ..., "stations": {"<number>": [start, end, etag], ...}}\\n
+    [<station>,<station>,...]
+
+The first line indexes the byte range and ETag of every station inside the
+JSON array that follows. :class:`FeedStore` keeps the parsed files in
+memory and only reloads one when its ``stat`` changes, so requests cost a
+``stat`` call and a dict lookup, and several web workers share the files.
+"""
+
+import hashlib
+import os
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from django.conf import settings
+
+from libs.jcdecauxclient import models as api
+from libs.jcdecauxclient.parsing import get_dumps, get_loads
+
+from .ingest import SyncResult, upsert_stations
+from .models import Contract, Station, StationAvailability
+
+SUFFIX = ".feed"
+# Unknown contract names remembered per FeedStore between publishes.
+MAX_MISSING = 10000
+
+_dumps = get_dumps(fast=True)
+_loads = get_loads(fast=True)
+_AVAILABILITY_FIELDS = (
+    ("bikes", "bikes"),
+    ("stands", "stands"),
+    ("mechanicalBikes", "mechanical_bikes"),
+    ("electricalBikes", "electrical_bikes"),
+    ("electricalInternalBatteryBikes", "electrical_internal_battery_bikes"),
+    ("electricalRemovableBatteryBikes", "electrical_removable_battery_bikes"),
+)
+
+
+def make_etag(body: bytes) -> str:
+    """Strong ETag of a response body."""
+    return f'"{hashlib.blake2b(body, digest_size=12).hexdigest()}"'
+
+
+def feed_dir() -> Path:
+    return Path(settings.API_FEED_DIR)
+
+
+def format_timestamp(value) -> str:
+    return value.isoformat().replace("+00:00", "Z")
+
+
+def stands_dict(
+    availability: Optional[StationAvailability], kind: str
+) -> Optional[dict]:
+    if availability is None:
+        return None
+    return {
+        "availabilities": {
+            key: getattr(availability, f"{kind}_{name}")
+            for key, name in _AVAILABILITY_FIELDS
+        },
+        "capacity": getattr(availability, f"{kind}_capacity"),
+    }
+
+
+def station_dict(
+    station: Station, availability: Optional[StationAvailability]
+) -> dict:
+    """Payload of a stored station, in the JCDecaux API shape."""
+    return {
+        "number": station.number,
+        "contractName": station.contract_id,
+        "name": station.name,
+        "address": station.address,
+        "position": {
+            "latitude": station.position_latitude,
+            "longitude": station.position_longitude,
+        },
+        "banking": station.banking,
+        "bonus": station.bonus,
+        "status": station.status,
+        "lastUpdate": format_timestamp(station.last_update),
+        "connected": station.connected,
+        "overflow": station.overflow,
+        "totalStands": stands_dict(availability, "total"),
+        "mainStands": stands_dict(availability, "main"),
+        "overflowStands": (
+            stands_dict(availability, "overflow")
+            if station.overflow
+            else None
+        ),
+    }
+
+
+def load_stations(contract: str) -> List[dict]:
+    """Payloads of every stored station of ``contract``, by number."""
+    stations = (
+        Station.objects.filter(contract_id=contract)
+        .select_related("availability")
+        .order_by("number")
+    )
+    return [
+        station_dict(station, getattr(station, "availability", None))
+        for station in stations
+    ]
+
+
+def encode_feed(stations: List[dict]) -> bytes:
+    """Serialize station payloads into the indexed feed file format."""
+    parts = []
+    index = {}
+    offset = 1
+    for station in stations:
+        part = _dumps(station)
+        parts.append(part)
+        index[str(station["number"])] = [
+            offset,
+            offset + len(part),
+            make_etag(part),
+        ]
+        offset += len(part) + 1
+    body = b"[" + b",".join(parts) + b"]"
+    header = _dumps({"etag": make_etag(body), "stations": index})
+    return header + b"\n" + body
+
+
+def publish_contract(
+    name: str, directory: Optional[Path] = None
+) -> Optional[int]:
+    """Rewrite the feed of ``name``; return its station count.
+
+    Returns ``None`` without writing anything for unknown contracts.
+    """
+    stations = load_stations(name)
+    if not stations and not Contract.objects.filter(name=name).exists():
+        return None
+    write_feed(name, stations, directory)
+    return len(stations)
+
+
+def write_feed(
+    name: str, stations: List[dict], directory: Optional[Path] = None
+) -> Path:
+    """Atomically replace the feed file of ``name``."""
+    directory = Path(directory or feed_dir())
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f"{name}{SUFFIX}"
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    tmp.write_bytes(encode_feed(stations))
+    os.replace(tmp, path)
+    return path
+
+
+def publish_contracts(
+    names: Iterable[str], directory: Optional[Path] = None
+) -> int:
+    return sum(publish_contract(name, directory) or 0 for name in set(names))
+
+
+def upsert_and_publish(stations: List[api.Station]) -> SyncResult:
+    """Write stations, then refresh the feeds of their contracts."""
+    result = upsert_stations(stations)
+    publish_contracts(station.contractName for station in stations)
+    return result
+
+
+@dataclass(frozen=True)
+class FeedEntry:
+    body: bytes
+    etag: str
+
+
+@dataclass(frozen=True)
+class Feed:
+    """A loaded feed file; ``stat`` changes whenever it is rewritten."""
+
+    stat: Tuple[int, int, int]
+    body: bytes
+    etag: str
+    stations: Dict[str, list]
+
+
+def _stat_key(st: os.stat_result) -> Tuple[int, int, int]:
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+
+class FeedStore:
+    """In-memory view of the feed files, reloaded when they change."""
+
+    def __init__(self, directory: Optional[Path] = None):
+        self._directory = directory
+        self._feeds: Dict[str, Feed] = {}
+        self._missing: Set[str] = set()
+        self._missing_stat: Optional[Tuple[int, int, int]] = None
+
+    @property
+    def directory(self) -> Path:
+        return Path(self._directory or feed_dir())
+
+    def contract(self, name: str) -> Optional[FeedEntry]:
+        feed = self.load(name)
+        if feed is None:
+            return None
+        return FeedEntry(feed.body, feed.etag)
+
+    def station(self, contract: str, number: str) -> Optional[FeedEntry]:
+        feed = self.load(contract)
+        entry = feed and feed.stations.get(number)
+        if not entry:
+            return None
+        start, end, etag = entry
+        return FeedEntry(feed.body[start:end], etag)
+
+    def names(self) -> List[str]:
+        """Contracts that currently have a feed file."""
+        try:
+            entries = os.scandir(self.directory)
+        except FileNotFoundError:
+            return []
+        with entries:
+            return [
+                entry.name[: -len(SUFFIX)]
+                for entry in entries
+                if entry.name.endswith(SUFFIX) and entry.is_file()
+            ]
+
+    def _known_missing(self, name: str) -> bool:
+        """Whether ``name`` was unknown and no feed was published since.
+
+        Publishing replaces a file in the feed directory, which changes
+        the directory's own mtime, so no query is needed to tell.
+        """
+        try:
+            stat = _stat_key(os.stat(self.directory))
+        except FileNotFoundError:
+            stat = None
+        if stat != self._missing_stat:
+            self._missing_stat = stat
+            self._missing.clear()
+        return name in self._missing
+
+    def load(self, name: str) -> Optional[Feed]:
+        path = self.directory / f"{name}{SUFFIX}"
+        try:
+            st = os.stat(path)
+        except (FileNotFoundError, NotADirectoryError):
+            if self._known_missing(name):
+                return None
+            if publish_contract(name, self.directory) is None:
+                if len(self._missing) >= MAX_MISSING:
+                    self._missing.clear()
+                self._missing.add(name)
+                return None
+            st = os.stat(path)
+        feed = self._feeds.get(name)
+        if feed is not None and feed.stat == _stat_key(st):
+            return feed
+        # fstat the open file so the key matches the bytes read even if
+        # the file is replaced meanwhile.
+        with open(path, "rb") as fh:
+            stat = _stat_key(os.fstat(fh.fileno()))
+            data = fh.read()
+        newline = data.index(b"\n")
+        header = _loads(data[:newline])
+        feed = Feed(
+            stat, data[newline + 1 :], header["etag"], header["stations"]
+        )
+        self._feeds[name] = feed
+        return feed
@@ -0,0 +1,365 @@
+"""Short-horizon bike forecasts for every station, scored in one pass.
+
+:class:`Forecaster` keeps a station x hour-of-week matrix built from the
+hourly rollups: the usual bike count of each station at each hour of the
+week. A forecast starts from the usual count at the target time and adds
+the station's current deviation from its usual count, fading with the
+horizon::
+
+    forecast(h) = usual(now + h) + (current - usual(now)) * exp(-h / decay)
+
+``usual`` interpolates linearly between the centres of hourly slots.
+Stations with no history around those times keep their current count.
+All stations are scored with whole-column operations after each ingestion
+cycle (NumPy when installed, plain loops otherwise), and only forecasts
+that changed are written to :class:`~app.models.StationForecast`.
+"""
+
+import logging
+import math
+from array import array
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from django.db.models import Sum
+from django.db.models.functions import ExtractHour, ExtractWeekDay
+from django.utils import timezone as dj_timezone
+
+from libs.jcdecauxclient import models as api
+
+from .history import bucket_start
+from .ingest import natural_key_filter, parse_last_update
+from .models import (
+    HourlyRollup,
+    Station,
+    StationAvailability,
+    StationForecast,
+)
+
+try:  # pragma: no cover - depends on the environment
+    import numpy as np
+except ImportError:  # pragma: no cover - depends on the environment
+    np = None
+
+logger = logging.getLogger(__name__)
+
+HORIZONS = (15, 30, 60)  # minutes, one ``StationForecast`` field each
+FIELDS = tuple(f"bikes_{minutes}" for minutes in HORIZONS)
+SLOTS = 7 * 24
+# 1970-01-01 was a Thursday; slot 0 is Monday 00:00 UTC.
+_EPOCH_OFFSET = 3 * 24
+
+Forecast = Tuple[int, ...]
+
+
+def week_position(ts: datetime) -> float:
+    """Hours since the start of the week (Monday 00:00 UTC)."""
+    return (ts.timestamp() / 3600 + _EPOCH_OFFSET) % SLOTS
+
+
+def _slot_weights(position: float) -> Tuple[int, int, float]:
+    """Slots around ``position`` and the weight of the second one."""
+    centred = position - 0.5
+    low = math.floor(centred)
+    return low % SLOTS, (low + 1) % SLOTS, centred - low
+
+
+class Forecaster:
+    """Current counts and hour-of-week profiles of every station.
+
+    Call :meth:`warm` once, then :meth:`update` with the stations of each
+    ingestion cycle. As time passes, completed hours of rollups are folded
+    into the profile and the hours leaving the ``weeks`` window are taken
+    out, so only the first load reads ``weeks`` of history.
+    """
+
+    def __init__(
+        self,
+        weeks: int = 4,
+        decay_minutes: float = 60.0,
+        clock: Callable[[], datetime] = dj_timezone.now,
+    ):
+        self.weeks = weeks
+        self.decay_minutes = decay_minutes
+        self.clock = clock
+        self.ids: List[int] = []
+        self.index: Dict[int, int] = {}
+        self.keys: Dict[Tuple[str, int], int] = {}
+        self.current: List[float] = []
+        self.capacity: List[float] = []
+        self.since: List[Optional[datetime]] = []
+        self._sums = self._matrix(0)
+        self._counts = self._matrix(0)
+        self._pending = 0
+        self._folded: Optional[datetime] = None
+        self._stored: Dict[int, Forecast] = {}
+
+    @staticmethod
+    def _matrix(rows: int):
+        if np is not None:
+            return np.zeros((rows, SLOTS))
+        return [array("d", bytes(8 * SLOTS)) for _ in range(rows)]
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _row(self, station_id: int) -> int:
+        row = self.index.get(station_id)
+        if row is None:
+            row = self.index[station_id] = len(self.ids)
+            self.ids.append(station_id)
+            self.current.append(0.0)
+            self.capacity.append(0.0)
+            self.since.append(None)
+            self._pending += 1
+        return row
+
+    def _grow(self) -> None:
+        """Give stations seen since the last call their profile rows."""
+        if not self._pending:
+            return
+        if np is not None:
+            extra = self._matrix(self._pending)
+            self._sums = np.vstack([self._sums, extra])
+            self._counts = np.vstack([self._counts, extra])
+        else:
+            self._sums.extend(self._matrix(self._pending))
+            self._counts.extend(self._matrix(self._pending))
+        self._pending = 0
+
+    def _set(
+        self, row: int, bikes: int, stands: int, capacity, since: datetime
+    ) -> None:
+        self.current[row] = float(bikes)
+        self.capacity[row] = float(capacity or bikes + stands)
+        self.since[row] = since
+
+    def _load_keys(
+        self, keys: Optional[List[Tuple[str, int]]] = None
+    ) -> None:
+        """Map ``(contract, number)`` to station ids, for all or ``keys``."""
+        rows = Station.objects.all()
+        if keys is not None:
+            rows = rows.filter(natural_key_filter(keys))
+        for contract, number, station_id in rows.values_list(
+            "contract_id", "number", "id"
+        ).iterator(chunk_size=10000):
+            self.keys[contract, number] = station_id
+
+    def warm(self) -> int:
+        """Load current counts and ``weeks`` of hourly rollups."""
+        self._load_keys()
+        totals = StationAvailability.objects.values_list(
+            "station_id",
+            "total_bikes",
+            "total_stands",
+            "total_capacity",
+            "station__last_update",
+        )
+        for station_id, *state in totals.iterator(chunk_size=10000):
+            self._set(self._row(station_id), *state)
+        self._stored = {
+            row[0]: row[1:]
+            for row in StationForecast.objects.values_list(
+                "station_id", *FIELDS
+            ).iterator(chunk_size=10000)
+        }
+        now = bucket_start(self.clock(), 3600)
+        self.fold(now - timedelta(weeks=self.weeks), now)
+        self._folded = now
+        return len(self.ids)
+
+    def fold(self, start: datetime, end: datetime, sign: int = 1) -> int:
+        """Add the hourly rollups of ``[start, end)`` to the profiles, or
+        take them out with a ``sign`` of -1.
+
+        Rows are summed per station and hour of the week in SQL first,
+        and weighted by the seconds their values held. A station has no
+        rows for the hours since its last report yet, so its current count
+        stands in for them, as it will in the rollups once it reports.
+        """
+        rows = (
+            HourlyRollup.objects.filter(bucket__gte=start, bucket__lt=end)
+            .values(
+                "station_id",
+                weekday=ExtractWeekDay("bucket", tzinfo=timezone.utc),
+                hour=ExtractHour("bucket", tzinfo=timezone.utc),
+            )
+            .annotate(total=Sum("bikes_sum"), seconds=Sum("seconds"))
+            .values_list("station_id", "weekday", "hour", "total", "seconds")
+            .order_by()
+        )
+        stations, slots, totals, weights = [], [], [], []
+        for station_id, weekday, hour, total, seconds in rows.iterator(
+            chunk_size=10000
+        ):
+            # ExtractWeekDay counts from Sunday = 1.
+            stations.append(self._row(station_id))
+            slots.append((weekday + 5) % 7 * 24 + hour)
+            totals.append(total * sign)
+            weights.append(seconds * sign)
+        hour = timedelta(hours=1)
+        for row, since in enumerate(self.since):
+            if since is None:
+                continue
+            held = max(bucket_start(since, 3600) + hour, start)
+            while held < end:
+                stations.append(row)
+                slots.append(int(week_position(held)))
+                totals.append(self.current[row] * 3600 * sign)
+                weights.append(3600 * sign)
+                held += hour
+        self._grow()
+        if np is not None and stations:
+            np.add.at(self._sums, (stations, slots), totals)
+            np.add.at(self._counts, (stations, slots), weights)
+        else:
+            for row, slot, total, seconds in zip(
+                stations, slots, totals, weights
+            ):
+                self._sums[row][slot] += total
+                self._counts[row][slot] += seconds
+        return len(stations)
+
+    def observe(self, stations: Iterable[api.Station]) -> None:
+        """Take in current counts; stations not stored yet are skipped."""
+        stations = list(stations)
+        missing = [
+            (station.contractName, station.number)
+            for station in stations
+            if (station.contractName, station.number) not in self.keys
+        ]
+        if missing:
+            self._load_keys(missing)
+        for station in stations:
+            station_id = self.keys.get((station.contractName, station.number))
+            if station_id is None:
+                continue
+            total = station.totalStands
+            self._set(
+                self._row(station_id),
+                total.bikes,
+                total.stands,
+                total.capacity,
+                parse_last_update(station.lastUpdate),
+            )
+
+    def score(self, now: datetime):
+        """Forecasts of every station, one column per horizon.
+
+        A ``len(self) x len(HORIZONS)`` NumPy array, or a list of rows
+        without NumPy.
+        """
+        self._grow()
+        position = week_position(now)
+        if np is not None:
+            return self._score_numpy(position)
+        return self._score_python(position)
+
+    def _usual_numpy(self, position: float):
+        first, second, weight = _slot_weights(position)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            low = self._sums[:, first] / self._counts[:, first]
+            high = self._sums[:, second] / self._counts[:, second]
+        return low * (1 - weight) + high * weight
+
+    def _score_numpy(self, position: float):
+        current = np.asarray(self.current)
+        capacity = np.asarray(self.capacity)
+        deviation = current - self._usual_numpy(position)
+        columns = []
+        for minutes in HORIZONS:
+            target = self._usual_numpy((position + minutes / 60) % SLOTS)
+            forecast = target + deviation * math.exp(
+                -minutes / self.decay_minutes
+            )
+            forecast = np.where(np.isnan(forecast), current, forecast)
+            columns.append(np.clip(forecast, 0, capacity))
+        return np.column_stack(columns)
+
+    def _usual_python(self, row: int, position: float) -> float:
+        first, second, weight = _slot_weights(position)
+        sums, counts = self._sums[row], self._counts[row]
+        if not counts[first] or not counts[second]:
+            return math.nan
+        return (
+            sums[first] / counts[first] * (1 - weight)
+            + sums[second] / counts[second] * weight
+        )
+
+    def _score_python(self, position: float) -> List[List[float]]:
+        fades = [math.exp(-m / self.decay_minutes) for m in HORIZONS]
+        targets = [(position + m / 60) % SLOTS for m in HORIZONS]
+        result = []
+        for row, current in enumerate(self.current):
+            deviation = current - self._usual_python(row, position)
+            forecasts = []
+            for target, fade in zip(targets, fades):
+                forecast = self._usual_python(row, target) + deviation * fade
+                if math.isnan(forecast):
+                    forecast = current
+                forecasts.append(
+                    min(max(forecast, 0.0), self.capacity[row])
+                )
+            result.append(forecasts)
+        return result
+
+    def store(self, now: datetime, forecasts) -> int:
+        """Write the forecasts that changed since the last write."""
+        if np is not None:
+            forecasts = np.rint(forecasts).astype(int).tolist()
+        else:
+            forecasts = [[round(f) for f in row] for row in forecasts]
+        changed = []
+        for station_id, values in zip(self.ids, forecasts):
+            values = tuple(values)
+            if self._stored.get(station_id) != values:
+                self._stored[station_id] = values
+                changed.append(
+                    StationForecast(
+                        station_id=station_id,
+                        changed_at=now,
+                        **dict(zip(FIELDS, values)),
+                    )
+                )
+        StationForecast.objects.bulk_create(
+            changed,
+            batch_size=2000,
+            update_conflicts=True,
+            unique_fields=["station"],
+            update_fields=["changed_at", *FIELDS],
+        )
+        return len(changed)
+
+    def update(self, stations: Iterable[api.Station] = ()) -> int:
+        """Take in a cycle's stations, rescore everyone, store changes.
+
+        Returns the number of forecasts written.
+        """
+        now = self.clock()
+        if self._folded is None:
+            self.warm()
+        self.observe(stations)
+        hour = bucket_start(now, 3600)
+        if hour > self._folded:
+            window = timedelta(weeks=self.weeks)
+            self.fold(self._folded, hour)
+            self.fold(self._folded - window, hour - window, sign=-1)
+            self._folded = hour
+        return self.store(now, self.score(now))
+
+    def after(self, write: Callable[[List[api.Station]], object]):
+        """Wrap an ingestion ``write`` so each cycle ends with forecasts.
+
+        A failed forecast is logged and does not fail the write.
+        """
+
+        def write_and_forecast(stations: List[api.Station]):
+            result = write(stations)
+            try:
+                self.update(stations)
+            except Exception:
+                logger.exception("Forecasting %d stations failed", len(self))
+            return result
+
+        return write_and_forecast
@@ -0,0 +1,821 @@
+"""Append-only availability history and its 5-minute/hourly rollups.
+
+Rollups are weighted by time: a station's values hold from its snapshot
+until the next one, and the latest values until the end of their bucket.
+Buckets a station spent without reporting get the values it held, so a
+station has a row for every bucket between its first and latest snapshot.
+"""
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple, Type
+
+from django.db import connection, transaction
+from django.db.models import Exists, Max, Min, OuterRef, QuerySet, Subquery
+from django.utils import timezone as dj_timezone
+
+from .models import (
+    AvailabilityRollup,
+    ContractFiveMinuteRollup,
+    ContractHourlyRollup,
+    ContractRollup,
+    ContractStats,
+    FiveMinuteRollup,
+    HourlyRollup,
+    StandSnapshot,
+    Station,
+    StationAvailability,
+)
+
+ROLLUPS: Tuple[Type[AvailabilityRollup], ...] = (
+    FiveMinuteRollup,
+    HourlyRollup,
+)
+CONTRACT_ROLLUPS: Dict[Type[AvailabilityRollup], Type[ContractRollup]] = {
+    FiveMinuteRollup: ContractFiveMinuteRollup,
+    HourlyRollup: ContractHourlyRollup,
+}
+VALUES = ("bikes", "electrical_bikes", "stands")
+AGGREGATES = [
+    f"{name}_{agg}" for name in VALUES for agg in ("min", "max", "sum")
+]
+
+# (station_id, ts, bikes, electrical_bikes, stands)
+Sample = Tuple[int, datetime, int, int, int]
+Key = Tuple[int, datetime]
+
+
+def bucket_start(ts: datetime, seconds: int) -> datetime:
+    """Return the start of the ``seconds`` wide bucket containing ``ts``."""
+    epoch = int(ts.timestamp())
+    return datetime.fromtimestamp(epoch - epoch % seconds, tz=timezone.utc)
+
+
+def _epoch(ts: datetime) -> int:
+    return int(ts.timestamp())
+
+
+def _datetime(epoch: int) -> datetime:
+    return datetime.fromtimestamp(epoch, tz=timezone.utc)
+
+
+@dataclass(slots=True)
+class Bucket:
+    """Running aggregate of one station's values over one bucket.
+
+    ``values`` holds ``[min, max, sum]`` per name in ``VALUES``, where the
+    sum adds each value times the seconds it held, so means are
+    ``sum / seconds`` and buckets merge exactly.
+    """
+
+    samples: int
+    seconds: int
+    values: List[List[int]]
+
+    @classmethod
+    def held(
+        cls, values: Sequence[int], seconds: int, samples: int = 0
+    ) -> "Bucket":
+        """A bucket in which ``values`` held for ``seconds``."""
+        return cls(samples, seconds, [[v, v, v * seconds] for v in values])
+
+    @classmethod
+    def from_row(cls, row: AvailabilityRollup) -> "Bucket":
+        return cls(
+            row.samples,
+            row.seconds,
+            [
+                [
+                    getattr(row, f"{name}_min"),
+                    getattr(row, f"{name}_max"),
+                    getattr(row, f"{name}_sum"),
+                ]
+                for name in VALUES
+            ],
+        )
+
+    def replace(
+        self, old: Sequence[int], new: Sequence[int], seconds: int
+    ) -> None:
+        """Let ``new`` instead of ``old`` hold for the last ``seconds``."""
+        for agg, before, value in zip(self.values, old, new):
+            if value < agg[0]:
+                agg[0] = value
+            if value > agg[1]:
+                agg[1] = value
+            agg[2] += (value - before) * seconds
+
+    def merge(self, other: "Bucket") -> None:
+        self.samples += other.samples
+        self.seconds += other.seconds
+        for agg, add in zip(self.values, other.values):
+            if add[0] < agg[0]:
+                agg[0] = add[0]
+            if add[1] > agg[1]:
+                agg[1] = add[1]
+            agg[2] += add[2]
+
+    def means(self) -> List[float]:
+        return [agg[2] / self.seconds for agg in self.values]
+
+    def to_row(
+        self, model: Type[AvailabilityRollup], key: Key
+    ) -> AvailabilityRollup:
+        fields = {"samples": self.samples, "seconds": self.seconds}
+        for name, (low, high, total) in zip(VALUES, self.values):
+            fields[f"{name}_min"] = low
+            fields[f"{name}_max"] = high
+            fields[f"{name}_sum"] = total
+        return model(station_id=key[0], bucket=key[1], **fields)
+
+
+ROLLUP_UPDATE_FIELDS = ["samples", "seconds", *AGGREGATES]
+
+
+def _spread(
+    buckets: Dict[int, Bucket],
+    values: Sequence[int],
+    begin: int,
+    stop: int,
+    width: int,
+    sample: bool = False,
+) -> None:
+    """Add ``values`` held over ``[begin, stop)`` to ``buckets``.
+
+    Times are epoch seconds, and so are the keys of ``buckets``. With
+    ``sample``, ``begin`` is a snapshot and counts in its bucket even if
+    its values held for no time.
+    """
+    bucket = begin - begin % width
+    parts = [(bucket, Bucket.held(values, 0, samples=1))] if sample else []
+    while bucket < stop:
+        held = min(stop, bucket + width) - max(begin, bucket)
+        if held > 0:
+            parts.append((bucket, Bucket.held(values, held)))
+        bucket += width
+    for key, part in parts:
+        existing = buckets.get(key)
+        if existing is None:
+            buckets[key] = part
+        else:
+            existing.merge(part)
+
+
+def held_buckets(
+    sample: Sample,
+    before: Optional[Sample],
+    width: int,
+    stored: Optional[Bucket] = None,
+) -> Dict[int, Bucket]:
+    """Buckets of one station that ``sample`` changes, by epoch start.
+
+    ``before`` is the station's previous sample, whose values were
+    counted until the end of their bucket, and ``stored`` that bucket's
+    row when ``sample`` falls in it too. The old values now hold until
+    ``sample``, and the new ones until the end of their bucket.
+    """
+    ts = _epoch(sample[1])
+    start = ts - ts % width
+    end = start + width
+    buckets: Dict[int, Bucket] = {}
+    if before is not None:
+        last = _epoch(before[1])
+        passed = last - last % width + width
+        if passed <= start:
+            # The old bucket is complete; fill the gap up to ``sample``.
+            _spread(buckets, before[2:], passed, ts, width)
+        elif stored is not None:
+            stored.samples += 1
+            stored.replace(before[2:], sample[2:], end - ts)
+            return {start: stored}
+        else:
+            _spread(buckets, before[2:], last, ts, width)
+    _spread(buckets, sample[2:], ts, end, width, sample=True)
+    return buckets
+
+
+def merge_rollups(
+    model: Type[AvailabilityRollup],
+    samples: List[Sample],
+    previous: Dict[int, Sample],
+    contracts: Dict[int, str],
+) -> int:
+    """Fold new samples into the stored buckets of ``model``.
+
+    ``previous`` holds the last sample of each station already rolled up.
+    ``contracts`` maps station ids to their contract; the contract rollup
+    of each touched bucket moves by the change of the station's mean.
+    """
+    width = model.BUCKET_SECONDS
+    same = {
+        (sample[0], bucket_start(sample[1], width))
+        for sample in samples
+        if sample[0] in previous
+        and bucket_start(previous[sample[0]][1], width)
+        == bucket_start(sample[1], width)
+    }
+    stored: Dict[Key, Bucket] = {}
+    if same:
+        for row in model.objects.filter(
+            station_id__in={k[0] for k in same},
+            bucket__in={k[1] for k in same},
+        ):
+            key = (row.station_id, row.bucket)
+            if key in same:
+                stored[key] = Bucket.from_row(row)
+    old_means = {key: bucket.means() for key, bucket in stored.items()}
+    buckets: Dict[Key, Bucket] = {}
+    for sample in samples:
+        station_id = sample[0]
+        row = stored.get((station_id, bucket_start(sample[1], width)))
+        changed = held_buckets(sample, previous.get(station_id), width, row)
+        for start, bucket in changed.items():
+            buckets[(station_id, _datetime(start))] = bucket
+    if not buckets:
+        return 0
+    model.objects.bulk_create(
+        [bucket.to_row(model, key) for key, bucket in buckets.items()],
+        update_conflicts=True,
+        unique_fields=["station", "bucket"],
+        update_fields=ROLLUP_UPDATE_FIELDS,
+    )
+
+    # Contract rows count every station; one without a row in a bucket
+    # holds the values of its last sample there.
+    spans: Dict[str, List[datetime]] = {}
+    for station_id, bucket in buckets:
+        span = spans.setdefault(contracts[station_id], [bucket, bucket])
+        span[0] = min(span[0], bucket)
+        span[1] = max(span[1], bucket)
+    at: Dict[Tuple[str, datetime], List[float]] = {}
+    after: Dict[Tuple[str, datetime], List[float]] = {}
+    for sample in samples:
+        key = (sample[0], bucket_start(sample[1], width))
+        before = previous.get(sample[0])
+        held = [1, *before[2:]] if before else [0, 0, 0, 0]
+        old = [1, *old_means[key]] if key in old_means else held
+        new = [1, *buckets[key].means()]
+        now = [1, *sample[2:]]
+        contract_key = (contracts[sample[0]], key[1])
+        _add(at, contract_key, [a - b for a, b in zip(new, old)])
+        _add(after, contract_key, [a - b for a, b in zip(now, held)])
+    merge_contract_rollups(CONTRACT_ROLLUPS[model], spans, at, after)
+    return len(buckets)
+
+
+def _add(totals: Dict, key, delta: List[float]) -> None:
+    total = totals.setdefault(key, [0] * len(delta))
+    for i, change in enumerate(delta):
+        total[i] += change
+
+
+def merge_contract_rollups(
+    model: Type[ContractRollup],
+    spans: Dict[str, List[datetime]],
+    at: Dict[Tuple[str, datetime], List[float]],
+    after: Dict[Tuple[str, datetime], List[float]],
+) -> None:
+    """Apply ``[stations, *VALUES]`` changes to contract rollup buckets.
+
+    ``spans`` holds the first and last station bucket written per
+    contract. Buckets up to the last one that the contract has no row for
+    yet start from its stats before the write, the values its stations
+    last held. ``at`` changes single buckets, and ``after`` every bucket
+    following the one given.
+    """
+    step = timedelta(seconds=model.BUCKET_SECONDS)
+    last = dict(
+        model.objects.filter(contract_id__in=spans)
+        .values("contract_id")
+        .annotate(last=Max("bucket"))
+        .values_list("contract_id", "last")
+        .order_by()
+    )
+    held = {
+        row[0]: list(row[1:])
+        for row in ContractStats.objects.filter(
+            contract_id__in=spans
+        ).values_list("contract_id", "stations", *VALUES)
+    }
+    rows: Dict[str, Dict[datetime, List[float]]] = {c: {} for c in spans}
+    stored = model.objects.filter(
+        contract_id__in=spans,
+        bucket__gte=min(span[0] for span in spans.values()),
+    ).values_list("contract_id", "bucket", "stations", *VALUES)
+    for contract, bucket, *values in stored:
+        rows[contract][bucket] = values
+    objs = []
+    for contract, (first, end) in spans.items():
+        buckets = rows[contract]
+        bucket = last[contract] + step if contract in last else first
+        while bucket <= end:
+            buckets[bucket] = list(held.get(contract, [0, 0, 0, 0]))
+            bucket += step
+        running = [0, 0, 0, 0]
+        for bucket in sorted(buckets):
+            values = buckets[bucket]
+            changes = at.get((contract, bucket), [0, 0, 0, 0])
+            for i, change in enumerate(changes):
+                values[i] += running[i] + change
+            for i, change in enumerate(after.get((contract, bucket), ())):
+                running[i] += change
+            objs.append(
+                model(
+                    contract_id=contract,
+                    bucket=bucket,
+                    stations=round(values[0]),
+                    **dict(zip(VALUES, values[1:])),
+                )
+            )
+    model.objects.bulk_create(
+        objs,
+        batch_size=2000,
+        update_conflicts=True,
+        unique_fields=["contract", "bucket"],
+        update_fields=["stations", *VALUES],
+    )
+
+
+def record_history(
+    stations: List[Station],
+    availabilities: Dict[int, StationAvailability],
+    previous: Dict[int, Sample],
+) -> int:
+    """Append snapshots of stations newer than ``previous`` and roll them up.
+
+    ``availabilities`` and ``previous`` are keyed by station id; the
+    latter holds the last update and values stored before this write, so
+    replaying a poll never records the same sample twice. Must run in the
+    transaction that writes ``stations``.
+    """
+    contracts = {station.id: station.contract_id for station in stations}
+    samples: List[Sample] = []
+    for station in stations:
+        before = previous.get(station.id)
+        if before is not None and station.last_update <= before[1]:
+            continue
+        availability = availabilities[station.id]
+        samples.append(
+            (
+                station.id,
+                station.last_update,
+                availability.total_bikes,
+                availability.total_electrical_bikes,
+                availability.total_stands,
+            )
+        )
+    if not samples:
+        return 0
+    StandSnapshot.objects.bulk_create(
+        [
+            StandSnapshot(
+                station_id=station_id,
+                ts=ts,
+                bikes=bikes,
+                electrical_bikes=electrical,
+                stands=free,
+            )
+            for station_id, ts, bikes, electrical, free in samples
+        ],
+        ignore_conflicts=True,
+    )
+    for model in ROLLUPS:
+        merge_rollups(model, samples, previous, contracts)
+    return len(samples)
+
+
+def rollup_for(seconds: int) -> Type[AvailabilityRollup]:
+    """Coarsest rollup whose buckets tile ``seconds`` wide buckets."""
+    for model in reversed(ROLLUPS):
+        if seconds > 0 and seconds % model.BUCKET_SECONDS == 0:
+            return model
+    raise ValueError(
+        f"bucket must be a multiple of {ROLLUPS[0].BUCKET_SECONDS} seconds"
+    )
+
+
+def _keyset(queryset: QuerySet, page_size: int) -> Iterator[tuple]:
+    """Rows of ``queryset`` ordered by bucket, fetched one page at a time.
+
+    Each page is an indexed range scan starting after the last bucket
+    seen, so deep pages cost the same as the first. The first element of
+    each row must be the bucket, and buckets must be unique.
+    """
+    cursor = None
+    while True:
+        page = queryset if cursor is None else queryset.filter(
+            bucket__gt=cursor
+        )
+        rows = list(page.order_by("bucket")[:page_size])
+        yield from rows
+        if len(rows) < page_size:
+            return
+        cursor = rows[-1][0]
+
+
+def _held_since(
+    station_id: int, after: datetime, end: datetime, width: int
+) -> Iterator[tuple]:
+    """Rollup rows of the buckets after ``after`` and before ``end`` or
+    now in which a station held its current values.
+
+    Rows are only written when a station reports, so a quiet station has
+    none for these buckets yet.
+    """
+    state = (
+        Station.objects.filter(pk=station_id, availability__isnull=False)
+        .values_list(
+            "last_update",
+            "availability__total_bikes",
+            "availability__total_electrical_bikes",
+            "availability__total_stands",
+        )
+        .first()
+    )
+    if state is None:
+        return
+    first = max(_epoch(state[0]), _epoch(after)) + width
+    first -= first % width
+    stop = min(_epoch(end), _epoch(dj_timezone.now()))
+    aggregates = []
+    for value in state[1:]:
+        aggregates += [value, value, value * width]
+    for bucket in range(first, stop, width):
+        yield (_datetime(bucket), 0, width, *aggregates)
+
+
+def station_series(
+    station_id: int,
+    start: datetime,
+    end: datetime,
+    seconds: int,
+    page_size: int = 5000,
+) -> Iterator[Tuple[datetime, Bucket]]:
+    """Min, max and time-weighted sum of a station's values per
+    ``seconds`` wide bucket.
+
+    Merges the rows of :func:`rollup_for` ``(seconds)``, then carries the
+    station's current values through the buckets since its last report.
+    """
+    model = rollup_for(seconds)
+    width = model.BUCKET_SECONDS
+    rows = model.objects.filter(
+        station_id=station_id, bucket__gte=start, bucket__lt=end
+    ).values_list("bucket", "samples", "seconds", *AGGREGATES)
+
+    def series_rows() -> Iterator[tuple]:
+        last = start - timedelta(seconds=1)
+        for row in _keyset(rows, page_size):
+            last = row[0]
+            yield row
+        yield from _held_since(station_id, last, end, width)
+
+    current: Optional[datetime] = None
+    merged: Optional[Bucket] = None
+    for row in series_rows():
+        key = bucket_start(row[0], seconds)
+        bucket = Bucket(
+            row[1], row[2], [list(row[i : i + 3]) for i in (3, 6, 9)]
+        )
+        if key == current:
+            merged.merge(bucket)
+            continue
+        if merged is not None:
+            yield current, merged
+        current, merged = key, bucket
+    if merged is not None:
+        yield current, merged
+
+
+def _contract_held_since(
+    model: Type[ContractRollup], contract: str, after: datetime, end: datetime
+) -> Iterator[tuple]:
+    """Contract rollup rows of the buckets after ``after`` and its last
+    stored bucket, up to ``end`` or now, from its current stats.
+
+    Rows are only written when a station reports, so the buckets since
+    the last report are not stored yet.
+    """
+    last = model.objects.filter(contract_id=contract).aggregate(
+        last=Max("bucket")
+    )["last"]
+    state = (
+        ContractStats.objects.filter(contract_id=contract)
+        .values_list("stations", *VALUES)
+        .first()
+    )
+    if last is None or state is None:
+        return
+    width = model.BUCKET_SECONDS
+    first = _epoch(max(last, after)) + width
+    first -= first % width
+    stop = min(_epoch(end), _epoch(dj_timezone.now()))
+    for bucket in range(first, stop, width):
+        yield (_datetime(bucket), *state)
+
+
+def contract_series(
+    contract: str,
+    start: datetime,
+    end: datetime,
+    seconds: int,
+    page_size: int = 5000,
+) -> Iterator[Tuple[datetime, int, List[float]]]:
+    """Contract-wide availability per ``seconds`` wide bucket.
+
+    Reads the contract rollups, one row per contract and bucket, so the
+    cost does not grow with the number of stations, then carries the
+    current totals through the buckets since the last report. Wider
+    buckets average the totals of their rollup buckets. Yields
+    ``(bucket, stations, [bikes, electrical_bikes, stands])`` where
+    ``stations`` is the most stations counted in any rollup bucket.
+    """
+    model = CONTRACT_ROLLUPS[rollup_for(seconds)]
+    rows = model.objects.filter(
+        contract_id=contract, bucket__gte=start, bucket__lt=end
+    ).values_list("bucket", "stations", *VALUES)
+
+    def series_rows() -> Iterator[tuple]:
+        last = start - timedelta(seconds=1)
+        for row in _keyset(rows, page_size):
+            last = row[0]
+            yield row
+        yield from _contract_held_since(model, contract, last, end)
+
+    current: Optional[datetime] = None
+    parts = 0
+    stations = 0
+    totals: List[float] = []
+    for row in series_rows():
+        key = bucket_start(row[0], seconds)
+        if key == current:
+            parts += 1
+            stations = max(stations, row[1])
+            totals = [a + b for a, b in zip(totals, row[2:])]
+            continue
+        if current is not None:
+            yield current, stations, [t / parts for t in totals]
+        current, parts, stations, totals = key, 1, row[1], list(row[2:])
+    if current is not None:
+        yield current, stations, [t / parts for t in totals]
+
+
+@dataclass
+class RetentionResult:
+    snapshots: int = 0
+    five_minute: int = 0
+    hourly: int = 0
+
+
+def prune_history(
+    raw_days: int,
+    five_minute_days: Optional[int] = None,
+    hourly_days: Optional[int] = None,
+    now: Optional[datetime] = None,
+) -> RetentionResult:
+    """Delete history older than the given number of days.
+
+    ``None`` keeps a table forever. Rollups are maintained as snapshots
+    arrive, so pruning raw rows does not affect them. Contract rollups
+    share the retention of the station rollups of the same width.
+    """
+    now = now or dj_timezone.now()
+    result = RetentionResult()
+    result.snapshots = StandSnapshot.objects.filter(
+        ts__lt=now - timedelta(days=raw_days)
+    ).delete()[0]
+    for model, days, name in (
+        (FiveMinuteRollup, five_minute_days, "five_minute"),
+        (HourlyRollup, hourly_days, "hourly"),
+    ):
+        if days is None:
+            continue
+        cutoff = now - timedelta(days=days)
+        setattr(
+            result,
+            name,
+            model.objects.filter(bucket__lt=cutoff).delete()[0],
+        )
+        CONTRACT_ROLLUPS[model].objects.filter(bucket__lt=cutoff).delete()
+    return result
+
+
+def day_ranges(start: datetime, end: datetime) -> Iterator[Tuple]:
+    """Split ``[start, end)`` into UTC days, the unit of backfill work."""
+    day = bucket_start(start, 86400)
+    while day < end:
+        yield day, day + timedelta(days=1)
+        day += timedelta(days=1)
+
+
+def replay(
+    samples: List[Sample],
+    width: int,
+    start: datetime,
+    until: Optional[datetime] = None,
+    carried: Optional[Sample] = None,
+) -> Dict[int, Bucket]:
+    """Buckets of one station's ``samples`` from ``start`` on.
+
+    ``carried`` is the station's last sample before ``start``. Each
+    sample's values hold until the next one, and the last one's until
+    ``until``, or the end of its bucket when it is the latest.
+    """
+    buckets: Dict[int, Bucket] = {}
+    points = [carried, *samples] if carried else samples
+    for i, point in enumerate(points):
+        ts = _epoch(point[1])
+        if i + 1 < len(points):
+            stop = _epoch(points[i + 1][1])
+        elif until is not None:
+            stop = _epoch(until)
+        else:
+            stop = ts - ts % width + width
+        _spread(
+            buckets,
+            point[2:],
+            max(ts, _epoch(start)),
+            stop,
+            width,
+            sample=point is not carried,
+        )
+    return buckets
+
+
+def _contract_rows(
+    model: Type[ContractRollup],
+    spans: Dict[str, List[Optional[int]]],
+    totals: Dict[Tuple[str, int], List[float]],
+    held: Dict[Tuple[str, int], List[float]],
+) -> List[ContractRollup]:
+    """Contract rows from station means and the values held after them.
+
+    Keys are contracts and epoch bucket starts. ``totals`` sums the
+    ``[stations, *VALUES]`` of station rows, and ``held`` the values
+    stations hold from a bucket on.
+    """
+    width = model.BUCKET_SECONDS
+    objs = []
+    for contract, (first, last) in spans.items():
+        if last is None:
+            continue
+        running = [0, 0, 0, 0]
+        for bucket in range(first, last + width, width):
+            for i, change in enumerate(held.get((contract, bucket), ())):
+                running[i] += change
+            values = totals.get((contract, bucket), [0, 0, 0, 0])
+            values = [a + b for a, b in zip(running, values)]
+            objs.append(
+                model(
+                    contract_id=contract,
+                    bucket=_datetime(bucket),
+                    stations=round(values[0]),
+                    **dict(zip(VALUES, values[1:])),
+                )
+            )
+    return objs
+
+
+def compute_rollups(start: datetime, end: datetime) -> Dict[Type, List]:
+    """Rebuild the station and contract rollup rows of ``[start, end)``.
+
+    Each station's last snapshot before ``start`` carries its values into
+    the range, and the last values in it hold until ``end`` if the
+    station reported again later. Contract rows also count the stations
+    that stopped reporting, with the values they last held.
+    """
+    by_station: Dict[int, List[Sample]] = {}
+    samples = (
+        StandSnapshot.objects.filter(ts__gte=start, ts__lt=end)
+        .order_by("station_id", "ts")
+        .values_list("station_id", "ts", *VALUES)
+    )
+    for sample in samples.iterator(chunk_size=10000):
+        by_station.setdefault(sample[0], []).append(sample)
+    before = StandSnapshot.objects.filter(
+        station=OuterRef("pk"), ts__lt=start
+    ).order_by("-ts")
+    edges = Station.objects.annotate(
+        carried_ts=Subquery(before.values("ts")[:1]),
+        **{
+            f"carried_{name}": Subquery(before.values(name)[:1])
+            for name in VALUES
+        },
+        later=Exists(
+            StandSnapshot.objects.filter(station=OuterRef("pk"), ts__gte=end)
+        ),
+    ).values_list(
+        "id",
+        "contract_id",
+        "carried_ts",
+        *(f"carried_{name}" for name in VALUES),
+        "later",
+    )
+    rows: Dict[Type, List] = {model: [] for model in ROLLUPS}
+    totals = {model: {} for model in ROLLUPS}
+    held = {model: {} for model in ROLLUPS}
+    spans = {model: {} for model in ROLLUPS}
+    for station_id, contract, *carried, later in edges.iterator(
+        chunk_size=10000
+    ):
+        day = by_station.get(station_id, [])
+        if carried[0] is None and not day:
+            continue
+        previous = (station_id, *carried) if carried[0] else None
+        latest = day[-1] if day else previous
+        for model in ROLLUPS:
+            width = model.BUCKET_SECONDS
+            buckets = replay(
+                day, width, start, end if later else None, previous
+            )
+            for key, bucket in buckets.items():
+                rows[model].append(
+                    bucket.to_row(model, (station_id, _datetime(key)))
+                )
+                _add(totals[model], (contract, key), [1, *bucket.means()])
+            first = min(buckets, default=_epoch(start))
+            last = max(buckets, default=None)
+            if not later:
+                tail = first if last is None else last + width
+                _add(held[model], (contract, tail), [1, *latest[2:]])
+            span = spans[model].setdefault(contract, [first, last])
+            span[0] = min(span[0], first)
+            if last is not None and (span[1] is None or last > span[1]):
+                span[1] = last
+    for model in ROLLUPS:
+        rows[CONTRACT_ROLLUPS[model]] = _contract_rows(
+            CONTRACT_ROLLUPS[model],
+            spans[model],
+            totals[model],
+            held[model],
+        )
+    return rows
+
+
+def write_rollups(
+    start: datetime, end: datetime, rows: Dict[Type, List]
+) -> int:
+    """Replace the station and contract rollups of ``[start, end)``.
+
+    Returns the number of station rollups written.
+    """
+    with transaction.atomic():
+        for model, objs in rows.items():
+            model.objects.filter(bucket__gte=start, bucket__lt=end).delete()
+            model.objects.bulk_create(objs, batch_size=2000)
+    return sum(len(rows[model]) for model in ROLLUPS)
+
+
+def rebuild_rollups(
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    workers: int = 4,
+) -> Iterator[Tuple[datetime, int]]:
+    """Rebuild rollups from raw snapshots, one whole UTC day per task.
+
+    Days are read and aggregated by ``workers`` threads, each with its own
+    database connection, while this thread writes the results so there is
+    only ever one writer. Yields ``(day, rows written)`` as days complete.
+
+    Days without snapshots are left alone. By default the range starts at
+    the first full day of raw history, since the day the retention cutoff
+    falls in only has part of its snapshots left.
+    """
+    if start is None or end is None:
+        bounds = StandSnapshot.objects.aggregate(
+            first=Min("ts"), last=Max("ts")
+        )
+        if bounds["first"] is None:
+            return
+        if start is None:
+            start = bucket_start(bounds["first"], 86400)
+            if start < bounds["first"]:
+                start += timedelta(days=1)
+        end = end or bounds["last"] + timedelta(seconds=1)
+    days = list(day_ranges(start, end))
+
+    def write(day: datetime, next_day: datetime, rows) -> int:
+        if not any(rows[model] for model in ROLLUPS):
+            return 0
+        return write_rollups(day, next_day, rows)
+
+    if workers <= 1:
+        for day, next_day in days:
+            yield day, write(day, next_day, compute_rollups(day, next_day))
+        return
+
+    def run(day: datetime, next_day: datetime):
+        try:
+            return compute_rollups(day, next_day)
+        finally:
+            connection.close()
+
+    executor = ThreadPoolExecutor(max_workers=workers)
+    try:
+        futures = {executor.submit(run, *span): span for span in days}
+        for future in as_completed(futures):
+            day, next_day = futures[future]
+            yield day, write(day, next_day, future.result())
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,314 @@
+"""Map JCDecaux client models to database rows and bulk upsert them."""
+
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from itertools import islice
+from typing import (
+    TYPE_CHECKING,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    TypeVar,
+)
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+from libs.jcdecauxclient import models as api
+
+from .history import record_history
+from .models import Contract, Park, Station, StationAvailability
+from .stats import apply_stats_deltas, stats_deltas
+
+if TYPE_CHECKING:  # .changes imports this module
+    from .changes import ChangeDetector
+
+T = TypeVar("T")
+
+CONTRACT_UPDATE_FIELDS = [
+    "commercial_name",
+    "country_code",
+    "cities",
+    "updated",
+]
+STATION_UPDATE_FIELDS = [
+    "name",
+    "address",
+    "position_latitude",
+    "position_longitude",
+    "banking",
+    "bonus",
+    "status",
+    "last_update",
+    "connected",
+    "overflow",
+    "updated",
+]
+PARK_UPDATE_FIELDS = [
+    "name",
+    "status",
+    "position_latitude",
+    "position_longitude",
+    "access_type",
+    "locker_type",
+    "has_surveillance",
+    "is_free",
+    "address",
+    "zip_code",
+    "city",
+    "is_off_street",
+    "has_electric_support",
+    "has_physical_reception",
+    "updated",
+]
+AVAILABILITY_UPDATE_FIELDS = [
+    column
+    for kind in StationAvailability.KINDS
+    for column in StationAvailability.columns(kind)
+]
+
+NO_STANDS = api.Stands(0, 0, 0, 0, 0, 0, None)
+
+
+def batched(items: Iterable[T], size: int) -> Iterator[List[T]]:
+    iterator = iter(items)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def natural_key_filter(keys: Iterable[Tuple[str, int]]) -> Q:
+    """Match stations or parks by ``(contract, number)`` pairs.
+
+    One ``number IN (...)`` clause per contract, each served by the unique
+    ``(contract, number)`` index.
+    """
+    numbers: Dict[str, List[int]] = {}
+    for contract, number in keys:
+        numbers.setdefault(contract, []).append(number)
+    query = Q(pk__in=[])
+    for contract, batch in numbers.items():
+        query |= Q(contract_id=contract, number__in=batch)
+    return query
+
+
+def parse_last_update(value: str) -> datetime:
+    """Return an API ``lastUpdate`` string as an aware datetime."""
+    parsed = parse_datetime(value)
+    if parsed is None:
+        raise ValueError(f"Invalid lastUpdate {value!r}")
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+def contract_row(contract: api.Contract) -> Contract:
+    return Contract(
+        name=contract.name,
+        commercial_name=contract.commercial_name,
+        country_code=contract.country_code,
+        cities=contract.cities,
+    )
+
+
+def park_row(park: api.Park) -> Park:
+    return Park(
+        contract_id=park.contractName,
+        number=park.number,
+        name=park.name,
+        status=park.status,
+        position_latitude=park.position.latitude,
+        position_longitude=park.position.longitude,
+        access_type=park.accessType,
+        locker_type=park.lockerType,
+        has_surveillance=park.hasSurveillance,
+        is_free=park.isFree,
+        address=park.address,
+        zip_code=park.zipCode,
+        city=park.city,
+        is_off_street=park.isOffStreet,
+        has_electric_support=park.hasElectricSupport,
+        has_physical_reception=park.hasPhysicalReception,
+    )
+
+
+def station_row(station: api.Station) -> Station:
+    """Build an unsaved ``Station``; its id is assigned by the upsert."""
+    return Station(
+        number=station.number,
+        contract_id=station.contractName,
+        name=station.name,
+        address=station.address,
+        position_latitude=station.position.latitude,
+        position_longitude=station.position.longitude,
+        banking=station.banking,
+        bonus=station.bonus,
+        status=station.status,
+        last_update=parse_last_update(station.lastUpdate),
+        connected=station.connected,
+        overflow=station.overflow,
+    )
+
+
+def stands_values(stands: api.Stands) -> tuple:
+    """Values of ``stands`` in ``StationAvailability.FIELDS`` order."""
+    return (
+        stands.bikes,
+        stands.stands,
+        stands.mechanicalBikes,
+        stands.electricalBikes,
+        stands.electricalInternalBatteryBikes,
+        stands.electricalRemovableBatteryBikes,
+        stands.capacity,
+    )
+
+
+def availability_row(
+    station: api.Station, station_id: int
+) -> StationAvailability:
+    """Return the current-state row of a station.
+
+    Stations without overflow stands get empty overflow columns.
+    """
+    fields = {}
+    for kind, stands in zip(
+        StationAvailability.KINDS,
+        (
+            station.totalStands,
+            station.mainStands,
+            station.overflowStands or NO_STANDS,
+        ),
+    ):
+        fields.update(
+            zip(StationAvailability.columns(kind), stands_values(stands))
+        )
+    return StationAvailability(station_id=station_id, **fields)
+
+
+@dataclass
+class SyncResult:
+    contracts: int = 0
+    stations: int = 0
+    batches: int = 0
+    skipped: int = 0
+    snapshots: int = 0
+
+    @property
+    def skip_ratio(self) -> float:
+        seen = self.stations + self.skipped
+        return self.skipped / seen if seen else 0.0
+
+
+def upsert_contracts(contracts: Iterable[api.Contract]) -> int:
+    rows = [contract_row(c) for c in contracts]
+    Contract.objects.bulk_create(
+        rows,
+        update_conflicts=True,
+        unique_fields=["name"],
+        update_fields=CONTRACT_UPDATE_FIELDS,
+    )
+    return len(rows)
+
+
+def ensure_contracts(names: Iterable[str]) -> int:
+    """Create placeholder rows for contracts that are not stored yet."""
+    names = set(names)
+    missing = names - set(
+        Contract.objects.filter(name__in=names).values_list("name", flat=True)
+    )
+    Contract.objects.bulk_create(
+        [Contract(name=name, commercial_name=name) for name in missing],
+        ignore_conflicts=True,
+    )
+    return len(missing)
+
+
+def write_stations(
+    stations: List[api.Station], history: bool = True
+) -> SyncResult:
+    """Upsert one batch of stations and their availabilities atomically.
+
+    Each station writes two rows: its ``Station``, matched on
+    ``(contract, number)``, and its ``StationAvailability``. The contract
+    stats move by the difference between the stored and the new state of
+    each station. With ``history``, stations reporting a newer
+    ``lastUpdate`` also get a snapshot appended and folded into the
+    rollups.
+    """
+    station_objs = [station_row(station) for station in stations]
+    keys = [(s.contract_id, s.number) for s in station_objs]
+    with transaction.atomic():
+        contracts = ensure_contracts(s.contract_id for s in station_objs)
+        previous = {}
+        states = {}
+        for station_id, last_update, *state in Station.objects.filter(
+            natural_key_filter(keys), availability__isnull=False
+        ).values_list(
+            "id",
+            "last_update",
+            "status",
+            "availability__total_bikes",
+            "availability__total_electrical_bikes",
+            "availability__total_stands",
+        ):
+            previous[station_id] = (station_id, last_update, *state[1:])
+            states[station_id] = tuple(state)
+        Station.objects.bulk_create(
+            station_objs,
+            update_conflicts=True,
+            unique_fields=["contract", "number"],
+            update_fields=STATION_UPDATE_FIELDS,
+        )
+        availability_objs = [
+            availability_row(station, row.id)
+            for station, row in zip(stations, station_objs)
+        ]
+        StationAvailability.objects.bulk_create(
+            availability_objs,
+            update_conflicts=True,
+            unique_fields=["station"],
+            update_fields=AVAILABILITY_UPDATE_FIELDS,
+        )
+        availabilities = {a.station_id: a for a in availability_objs}
+        snapshots = 0
+        if history:
+            # Before the stats move: new contract rollup buckets start from
+            # the totals the stations held until now.
+            snapshots = record_history(
+                station_objs, availabilities, previous
+            )
+        apply_stats_deltas(stats_deltas(station_objs, availabilities, states))
+    return SyncResult(contracts, len(station_objs), 1, snapshots=snapshots)
+
+
+def upsert_stations(
+    stations: Iterable[api.Station],
+    batch_size: int = 2000,
+    detector: Optional["ChangeDetector"] = None,
+    history: bool = True,
+) -> SyncResult:
+    """Upsert stations in transactions of ``batch_size`` stations.
+
+    A full network refresh costs a few statements per batch instead of
+    several per station. With a ``detector``, stations whose status and
+    availabilities did not change are skipped and counted in ``skipped``.
+    """
+    total = SyncResult()
+    for batch in batched(stations, batch_size):
+        changes = None
+        if detector is not None:
+            changes = detector.select(batch)
+            total.skipped += changes.skipped
+            batch = changes.changed
+        if batch:
+            result = write_stations(batch, history=history)
+            total.contracts += result.contracts
+            total.stations += result.stations
+            total.snapshots += result.snapshots
+            total.batches += 1
+        if changes is not None:
+            detector.commit(changes)
+    return total
@@ -0,0 +1,197 @@
+"""Fan-out of changed-station deltas to Server-Sent Events subscribers.
+
+One :class:`LiveHub` per ASGI process watches the API feed files. When a
+contract's feed is rewritten, stations whose per-station ETag changed are
+cut straight out of the new file, so a delta is serialized once and the
+same bytes go to every subscriber:
+
+* contract subscribers get one ``stations`` event with all changed
+  stations of that contract;
+* bounding-box subscribers get the pre-built per-station events that fall
+  inside their box.
+
+Each subscriber has a bounded queue. A subscriber that falls behind loses
+its backlog and gets a single ``resync`` event telling it to reload the
+REST snapshot, so one slow client never holds memory or the hub back.
+"""
+
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set, Tuple
+
+from libs.jcdecauxclient.parsing import get_loads
+
+from .feed import Feed, FeedStore
+
+logger = logging.getLogger(__name__)
+
+_loads = get_loads(fast=True)
+
+RESYNC = b"event: resync\ndata: {}\n\n"
+KEEPALIVE = b": keepalive\n\n"
+
+BBox = Tuple[float, float, float, float]  # min lon, min lat, max lon, max lat
+
+
+def sse_event(event: str, data: bytes) -> bytes:
+    return b"event: " + event.encode() + b"\ndata: " + data + b"\n\n"
+
+
+@dataclass(slots=True)
+class StationEvent:
+    latitude: float
+    longitude: float
+    event: bytes
+
+
+@dataclass
+class Delta:
+    """Changed stations of one contract, ready to send."""
+
+    contract: str
+    event: bytes
+    stations: List[StationEvent]
+
+
+@dataclass(eq=False)
+class Subscription:
+    """A subscriber's filter and its bounded outgoing queue."""
+
+    contracts: Set[str] = field(default_factory=set)
+    bbox: Optional[BBox] = None
+    max_queue: int = 256
+    dropped: int = 0
+
+    def __post_init__(self) -> None:
+        self.queue: asyncio.Queue = asyncio.Queue(self.max_queue)
+
+    def contains(self, station: StationEvent) -> bool:
+        min_lon, min_lat, max_lon, max_lat = self.bbox
+        return (
+            min_lat <= station.latitude <= max_lat
+            and min_lon <= station.longitude <= max_lon
+        )
+
+    def send(self, chunk: bytes) -> None:
+        try:
+            self.queue.put_nowait(chunk)
+        except asyncio.QueueFull:
+            self.dropped += self.queue.qsize()
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(RESYNC)
+
+
+def build_delta(contract: str, feed: Feed, numbers: List[str]) -> Delta:
+    """Cut the changed stations out of ``feed`` without re-encoding them."""
+    parts = []
+    stations = []
+    for number in numbers:
+        start, end, _ = feed.stations[number]
+        part = feed.body[start:end]
+        parts.append(part)
+        position = _loads(part)["position"]
+        stations.append(
+            StationEvent(
+                position["latitude"],
+                position["longitude"],
+                sse_event("station", part),
+            )
+        )
+    event = sse_event("stations", b"[" + b",".join(parts) + b"]")
+    return Delta(contract, event, stations)
+
+
+class LiveHub:
+    """Watch feed files and push deltas to subscribers.
+
+    The watcher task starts with the first subscriber and checks the feeds
+    every ``poll_every`` seconds in a worker thread.
+    """
+
+    def __init__(self, store: FeedStore, poll_every: float = 1.0):
+        self.store = store
+        self.poll_every = poll_every
+        self.by_contract: Dict[str, Set[Subscription]] = {}
+        self.by_bbox: Set[Subscription] = set()
+        self._etags: Dict[str, Dict[str, str]] = {}
+        self._stats: Dict[str, tuple] = {}
+        self._primed = False
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def subscribers(self) -> int:
+        return len(self.by_bbox) + len(
+            {s for subs in self.by_contract.values() for s in subs}
+        )
+
+    def subscribe(self, subscription: Subscription) -> Subscription:
+        for contract in subscription.contracts:
+            self.by_contract.setdefault(contract, set()).add(subscription)
+        if subscription.bbox is not None:
+            self.by_bbox.add(subscription)
+        self._ensure_running()
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        for contract in subscription.contracts:
+            subs = self.by_contract.get(contract)
+            if subs is not None:
+                subs.discard(subscription)
+                if not subs:
+                    del self.by_contract[contract]
+        self.by_bbox.discard(subscription)
+
+    def publish(self, delta: Delta) -> None:
+        for subscription in self.by_contract.get(delta.contract, ()):
+            subscription.send(delta.event)
+        for subscription in self.by_bbox:
+            inside = [
+                s.event for s in delta.stations if subscription.contains(s)
+            ]
+            if inside:
+                subscription.send(b"".join(inside))
+
+    def check(self) -> List[Delta]:
+        """Diff every changed feed against the last one seen.
+
+        The first call only records a baseline.
+        """
+        deltas = []
+        for name in self.store.names():
+            feed = self.store.load(name)
+            if feed is None or self._stats.get(name) == feed.stat:
+                continue
+            old = self._etags.get(name, {})
+            etags = {
+                number: entry[2] for number, entry in feed.stations.items()
+            }
+            changed = [
+                number
+                for number, etag in etags.items()
+                if old.get(number) != etag
+            ]
+            self._stats[name] = feed.stat
+            self._etags[name] = etags
+            if changed and self._primed:
+                deltas.append(build_delta(name, feed, changed))
+        self._primed = True
+        return deltas
+
+    def _ensure_running(self) -> None:
+        loop = asyncio.get_running_loop()
+        task = self._task
+        if task is None or task.done() or task.get_loop() is not loop:
+            self._task = loop.create_task(self._watch())
+
+    async def _watch(self) -> None:
+        while self.by_contract or self.by_bbox:
+            try:
+                deltas = await asyncio.to_thread(self.check)
+            except Exception:
+                logger.exception("Checking feeds failed")
+                deltas = []
+            for delta in deltas:
+                self.publish(delta)
+            await asyncio.sleep(self.poll_every)
@@ -0,0 +1,43 @@
+"""Move old raw snapshots from the database into sealed day files."""
+
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from ...archive import archive_dir, archive_history
+
+
+class Command(BaseCommand):
+    help = (
+        "Seal every full UTC day of snapshots older than --older-than days "
+        "into a compressed columnar file and delete those rows."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--older-than",
+            type=int,
+            default=2,
+            help="Archive days ending at least this many days ago.",
+        )
+        parser.add_argument(
+            "--dir",
+            dest="directory",
+            default=None,
+            help="Archive directory. Defaults to HISTORY_ARCHIVE_DIR.",
+        )
+
+    def handle(self, *args, older_than, directory, **options):
+        directory = directory or archive_dir()
+        before = timezone.now() - timedelta(days=older_than)
+        days = samples = 0
+        for day, count in archive_history(before, directory):
+            days += 1
+            samples += count
+            self.stdout.write(f"{day:%Y-%m-%d}: {count} samples")
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Archived {days} days ({samples} samples) to {directory}"
+            )
+        )
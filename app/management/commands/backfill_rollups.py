@@ -0,0 +1,56 @@
+"""Rebuild availability rollups from raw snapshots."""
+
+import argparse
+import time
+from datetime import datetime, timezone
+
+from django.core.management.base import BaseCommand
+
+from ...history import rebuild_rollups
+
+
+def parse_day(value: str) -> datetime:
+    try:
+        day = datetime.strptime(value, "%Y-%m-%d")
+    except ValueError as exc:
+        raise argparse.ArgumentTypeError(
+            f"invalid date {value!r}, expected YYYY-MM-DD"
+        ) from exc
+    return day.replace(tzinfo=timezone.utc)
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute 5-minute and hourly rollups from raw snapshots, one "
+        "UTC day per task, reading days in parallel."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--since",
+            type=parse_day,
+            help="First day to rebuild (YYYY-MM-DD). Defaults to the first "
+            "full day of raw snapshots.",
+        )
+        parser.add_argument(
+            "--until",
+            type=parse_day,
+            help="Day to stop before (YYYY-MM-DD). Defaults to the latest "
+            "snapshot.",
+        )
+        parser.add_argument("--workers", type=int, default=4)
+
+    def handle(self, *args, since, until, workers, **options):
+        start = time.perf_counter()
+        days = rows = 0
+        for day, count in rebuild_rollups(since, until, workers=workers):
+            days += 1
+            rows += count
+            if options["verbosity"] > 1:
+                self.stdout.write(f"{day:%Y-%m-%d}: {count} rollups")
+        elapsed = time.perf_counter() - start
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Rebuilt {rows} rollups over {days} days ({elapsed:.1f}s)"
+            )
+        )
@@ -0,0 +1,130 @@
+"""Continuously poll the JCDecaux API and store changed stations."""
+
+import asyncio
+import signal
+
+from asgiref.sync import sync_to_async
+
+from django.core.management.base import BaseCommand, CommandError
+
+from libs.jcdecauxclient import JCDecauxClientAsync
+
+from ...changes import ChangeDetector
+from ...feed import upsert_and_publish
+from ...forecast import Forecaster
+from ...pipeline import WritePipeline
+from ...poller import Poller
+
+
+class Command(BaseCommand):
+    help = (
+        "Poll every contract on an adaptive interval and upsert the "
+        "stations that changed. Stops cleanly on SIGINT/SIGTERM."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--contract",
+            action="append",
+            dest="contracts",
+            help="Only poll this contract (repeatable). Defaults to all.",
+        )
+        parser.add_argument("--min-interval", type=float, default=30.0)
+        parser.add_argument("--max-interval", type=float, default=600.0)
+        parser.add_argument("--concurrency", type=int, default=4)
+        parser.add_argument(
+            "--max-queue",
+            type=int,
+            default=64,
+            help="Changed batches waiting for the writer before polls block.",
+        )
+        parser.add_argument(
+            "--skip-forecasts",
+            action="store_true",
+            help="Do not refresh station forecasts after each write.",
+        )
+        parser.add_argument(
+            "--report-every",
+            type=float,
+            default=60.0,
+            help="Seconds between lag/interval reports.",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            asyncio.run(self.main(**options))
+        except ValueError as exc:
+            raise CommandError(str(exc)) from exc
+
+    async def main(
+        self,
+        contracts,
+        min_interval,
+        max_interval,
+        concurrency,
+        max_queue,
+        skip_forecasts,
+        report_every,
+        **options,
+    ):
+        detector = ChangeDetector()
+        known = await sync_to_async(detector.warm)()
+        self.stdout.write(f"Loaded fingerprints of {known} stations")
+        write = upsert_and_publish
+        if not skip_forecasts:
+            forecaster = Forecaster()
+            known = await sync_to_async(forecaster.warm)()
+            self.stdout.write(f"Loaded forecast profiles of {known} stations")
+            write = forecaster.after(write)
+        pipeline = WritePipeline(
+            write=write, max_queue=max_queue, detector=detector
+        )
+        async with JCDecauxClientAsync() as client, pipeline:
+            if not contracts:
+                contracts = [c.name for c in await client.get_contracts()]
+            poller = Poller(
+                client,
+                contracts,
+                min_interval=min_interval,
+                max_interval=max_interval,
+                concurrency=concurrency,
+                write=pipeline.submit,
+                detector=detector,
+            )
+            loop = asyncio.get_running_loop()
+            for sig in (signal.SIGINT, signal.SIGTERM):
+                loop.add_signal_handler(sig, poller.stop)
+            self.stdout.write(f"Polling {len(contracts)} contracts")
+            reporter = asyncio.create_task(
+                self.report(poller, pipeline, report_every)
+            )
+            try:
+                await poller.run()
+            finally:
+                reporter.cancel()
+                for sig in (signal.SIGINT, signal.SIGTERM):
+                    loop.remove_signal_handler(sig)
+        self.stdout.write(
+            f"Poller stopped, wrote {pipeline.written} stations"
+        )
+
+    async def report(
+        self, poller: Poller, pipeline: WritePipeline, every: float
+    ) -> None:
+        while True:
+            await asyncio.sleep(every)
+            m = pipeline.metrics()
+            self.stdout.write(
+                f"writer: queued={m['queued']} written={m['written']} "
+                f"batches={m['batches']} errors={m['errors']} "
+                f"commit={m['last_commit']:.2f}s "
+                f"max_commit={m['max_commit']:.2f}s"
+            )
+            for name, m in sorted(poller.metrics().items()):
+                self.stdout.write(
+                    f"{name}: interval={m['interval']:.0f}s "
+                    f"lag={m['lag']:.2f}s max_lag={m['max_lag']:.2f}s "
+                    f"polls={m['polls']} changed={m['changed']} "
+                    f"skipped={m['skipped']} ({m['skip_ratio']:.0%}) "
+                    f"errors={m['errors']}"
+                )
@@ -0,0 +1,44 @@
+"""Apply the retention policy to availability history."""
+
+from django.core.management.base import BaseCommand
+
+from ...history import prune_history
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete raw snapshots and rollups older than their retention "
+        "period. Run it daily, e.g. from cron."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--raw-days",
+            type=int,
+            default=7,
+            help="Days of raw snapshots to keep.",
+        )
+        parser.add_argument(
+            "--five-minute-days",
+            type=int,
+            default=90,
+            help="Days of 5-minute rollups to keep.",
+        )
+        parser.add_argument(
+            "--hourly-days",
+            type=int,
+            default=None,
+            help="Days of hourly rollups to keep. Defaults to forever.",
+        )
+
+    def handle(
+        self, *args, raw_days, five_minute_days, hourly_days, **options
+    ):
+        result = prune_history(raw_days, five_minute_days, hourly_days)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Deleted {result.snapshots} snapshots, "
+                f"{result.five_minute} 5-minute and {result.hourly} hourly "
+                "rollups"
+            )
+        )
@@ -0,0 +1,62 @@
+"""Recompute the contract stats from the station tables."""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ...stats import (
+    STAT_FIELDS,
+    compute_contract_stats,
+    rebuild_contract_stats,
+    stored_contract_stats,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute every contract's stats with a full scan and fix the "
+        "stored totals that drifted. With --check, only report them."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--contract",
+            action="append",
+            dest="contracts",
+            help="Only this contract (repeatable). Defaults to all.",
+        )
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Report differences and fail instead of fixing them.",
+        )
+
+    def handle(self, *args, contracts, check, **options):
+        if not check:
+            fixed = rebuild_contract_stats(contracts)
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"Fixed the stats of {len(fixed)} contracts"
+                )
+            )
+            return
+        computed = compute_contract_stats(contracts)
+        stored = stored_contract_stats(computed)
+        wrong = 0
+        for name, expected in sorted(computed.items()):
+            found = stored.get(name)
+            if found == expected:
+                continue
+            wrong += 1
+            if found is None:
+                self.stdout.write(f"{name}: missing")
+                continue
+            diffs = ", ".join(
+                f"{field} {old} != {new}"
+                for field, old, new in zip(STAT_FIELDS, found, expected)
+                if old != new
+            )
+            self.stdout.write(f"{name}: {diffs}")
+        if wrong:
+            raise CommandError(f"Stats of {wrong} contracts are out of date")
+        self.stdout.write(
+            self.style.SUCCESS(f"Stats of {len(computed)} contracts match")
+        )
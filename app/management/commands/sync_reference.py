@@ -0,0 +1,61 @@
+"""Refresh contracts and parks from the JCDecaux API."""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from libs.jcdecauxclient import JCDecauxClient
+
+from ...reference import sync_contracts, sync_parks
+
+
+class Command(BaseCommand):
+    help = (
+        "Refresh contracts and parks, writing only those whose payload "
+        "changed. Contracts without a parks API are remembered and skipped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--contract",
+            action="append",
+            dest="contracts",
+            help="Only refresh parks of this contract (repeatable).",
+        )
+        parser.add_argument(
+            "--skip-parks",
+            action="store_true",
+            help="Only refresh the contract list.",
+        )
+        parser.add_argument(
+            "--retry-unsupported",
+            action="store_true",
+            help="Ask again contracts whose parks API answered 400 before.",
+        )
+
+    def handle(
+        self, *args, contracts, skip_parks, retry_unsupported, **options
+    ):
+        try:
+            client = JCDecauxClient()
+        except ValueError as exc:
+            raise CommandError(str(exc)) from exc
+
+        result = sync_contracts(client.get_contracts())
+        self.stdout.write(
+            f"Synced {result.contracts} contracts "
+            f"({result.contracts_skipped} unchanged)"
+        )
+        if skip_parks:
+            return
+        sync_parks(
+            client,
+            contracts,
+            retry_unsupported=retry_unsupported,
+            result=result,
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Synced {result.parks} parks ({result.parks_skipped} "
+                f"unchanged), {result.unsupported} contracts without parks, "
+                f"{result.errors} errors"
+            )
+        )
@@ -0,0 +1,112 @@
+"""Fetch stations from the JCDecaux API and bulk upsert them."""
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from libs.jcdecauxclient import JCDecauxClient
+
+from ...changes import ChangeDetector
+from ...feed import publish_contracts
+from ...forecast import Forecaster
+from ...ingest import upsert_stations
+from ...reference import sync_contracts
+
+
+class Command(BaseCommand):
+    help = "Fetch stations from the JCDecaux API and upsert them in bulk."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--contract",
+            action="append",
+            dest="contracts",
+            help="Only sync this contract (repeatable). Defaults to all.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=2000,
+            help="Stations written per transaction.",
+        )
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Rewrite every station, even those that did not change.",
+        )
+        parser.add_argument(
+            "--skip-contracts",
+            action="store_true",
+            help="Do not refresh the contract list first.",
+        )
+        parser.add_argument(
+            "--skip-forecasts",
+            action="store_true",
+            help="Do not refresh station forecasts afterwards.",
+        )
+
+    def handle(
+        self,
+        *args,
+        contracts,
+        batch_size,
+        force,
+        skip_contracts,
+        skip_forecasts,
+        **options,
+    ):
+        start = time.perf_counter()
+        try:
+            client = JCDecauxClient()
+        except ValueError as exc:
+            raise CommandError(str(exc)) from exc
+
+        if not skip_contracts:
+            synced = sync_contracts(client.get_contracts())
+            self.stdout.write(
+                f"Synced {synced.contracts} contracts "
+                f"({synced.contracts_skipped} unchanged)"
+            )
+
+        if contracts:
+            stations = []
+            for result in client.list_stations_many(contracts):
+                if result.error is not None:
+                    self.stderr.write(
+                        f"Skipping {result.contract}: {result.error}"
+                    )
+                    continue
+                stations.extend(result.value)
+        else:
+            stations = client.iter_stations()
+
+        detector = None
+        if not force:
+            detector = ChangeDetector()
+            detector.warm()
+        seen = set()
+
+        def track(stations):
+            for station in stations:
+                seen.add(station.contractName)
+                yield station
+
+        result = upsert_stations(
+            track(stations), batch_size=batch_size, detector=detector
+        )
+        publish_contracts(seen)
+        if not skip_forecasts:
+            forecaster = Forecaster()
+            changed = forecaster.update()
+            self.stdout.write(
+                f"Forecast {len(forecaster)} stations ({changed} changed)"
+            )
+        elapsed = time.perf_counter() - start
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Synced {result.stations} stations in {result.batches} "
+                f"batches, skipped "
+                f"{result.skipped} unchanged ({result.skip_ratio:.0%}) "
+                f"({elapsed:.1f}s)"
+            )
+        )
@@ -0,0 +1,146 @@
+# Generated by Django 5.2.3 on 2026-10-18 12:04
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("app", "0003_remove_station_main_capacity_and_more"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="FiveMinuteRollup",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("bucket", models.DateTimeField()),
+                ("samples", models.PositiveIntegerField(default=0)),
+                ("bikes_min", models.PositiveSmallIntegerField()),
+                ("bikes_max", models.PositiveSmallIntegerField()),
+                ("bikes_sum", models.PositiveIntegerField()),
+                ("electrical_bikes_min", models.PositiveSmallIntegerField()),
+                ("electrical_bikes_max", models.PositiveSmallIntegerField()),
+                ("electrical_bikes_sum", models.PositiveIntegerField()),
+                ("stands_min", models.PositiveSmallIntegerField()),
+                ("stands_max", models.PositiveSmallIntegerField()),
+                ("stands_sum", models.PositiveIntegerField()),
+                (
+                    "station",
+                    models.ForeignKey(
+                        db_index=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="app.station",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["bucket"], name="app_fivemin_bucket_e4da7e_idx"
+                    )
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("station", "bucket"), name="unique_rollup_5m"
+                    )
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name="HourlyRollup",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("bucket", models.DateTimeField()),
+                ("samples", models.PositiveIntegerField(default=0)),
+                ("bikes_min", models.PositiveSmallIntegerField()),
+                ("bikes_max", models.PositiveSmallIntegerField()),
+                ("bikes_sum", models.PositiveIntegerField()),
+                ("electrical_bikes_min", models.PositiveSmallIntegerField()),
+                ("electrical_bikes_max", models.PositiveSmallIntegerField()),
+                ("electrical_bikes_sum", models.PositiveIntegerField()),
+                ("stands_min", models.PositiveSmallIntegerField()),
+                ("stands_max", models.PositiveSmallIntegerField()),
+                ("stands_sum", models.PositiveIntegerField()),
+                (
+                    "station",
+                    models.ForeignKey(
+                        db_index=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="app.station",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["bucket"], name="app_hourlyr_bucket_7ec97a_idx"
+                    )
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("station", "bucket"),
+                        name="unique_rollup_hourly",
+                    )
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name="StandSnapshot",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("ts", models.DateTimeField()),
+                ("bikes", models.PositiveSmallIntegerField()),
+                ("electrical_bikes", models.PositiveSmallIntegerField()),
+                ("stands", models.PositiveSmallIntegerField()),
+                (
+                    "station",
+                    models.ForeignKey(
+                        db_index=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="snapshots",
+                        to="app.station",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["ts"], name="app_standsn_ts_803630_idx"
+                    )
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("station", "ts"),
+                        name="unique_snapshot_station_ts",
+                    )
+                ],
+            },
+        ),
+    ]
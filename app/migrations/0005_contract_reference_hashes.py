@@ -0,0 +1,27 @@
+# Generated by Django 5.2.3 on 2026-10-18 12:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("app", "0004_availability_history"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="contract",
+            name="parks_hash",
+            field=models.CharField(blank=True, editable=False, max_length=32),
+        ),
+        migrations.AddField(
+            model_name="contract",
+            name="parks_supported",
+            field=models.BooleanField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name="contract",
+            name="payload_hash",
+            field=models.CharField(blank=True, editable=False, max_length=32),
+        ),
+    ]
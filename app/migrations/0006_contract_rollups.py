@@ -0,0 +1,125 @@
+# Generated by Django 5.2.3 on 2026-10-18 12:26
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, F, FloatField, Sum
+from django.db.models.functions import Cast
+
+VALUES = ("bikes", "electrical_bikes", "stands")
+
+
+def sum_station_rollups(apps, schema_editor):
+    """Fill the contract rollups from the existing station rollups."""
+    for source, target in (
+        ("FiveMinuteRollup", "ContractFiveMinuteRollup"),
+        ("HourlyRollup", "ContractHourlyRollup"),
+    ):
+        rows = (
+            apps.get_model("app", source)
+            .objects.values("station__contract_id", "bucket")
+            .annotate(
+                count=Count("station_id"),
+                **{
+                    f"{name}_total": Sum(
+                        Cast(f"{name}_sum", FloatField()) / F("samples")
+                    )
+                    for name in VALUES
+                },
+            )
+            .order_by()
+        )
+        model = apps.get_model("app", target)
+        model.objects.bulk_create(
+            (
+                model(
+                    contract_id=row["station__contract_id"],
+                    bucket=row["bucket"],
+                    stations=row["count"],
+                    **{name: row[f"{name}_total"] for name in VALUES},
+                )
+                for row in rows.iterator()
+            ),
+            batch_size=2000,
+        )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("app", "0005_contract_reference_hashes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ContractFiveMinuteRollup",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("bucket", models.DateTimeField()),
+                ("stations", models.PositiveIntegerField(default=0)),
+                ("bikes", models.FloatField(default=0)),
+                ("electrical_bikes", models.FloatField(default=0)),
+                ("stands", models.FloatField(default=0)),
+                (
+                    "contract",
+                    models.ForeignKey(
+                        db_index=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="app.contract",
+                    ),
+                ),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("contract", "bucket"),
+                        name="unique_contract_rollup_5m",
+                    )
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name="ContractHourlyRollup",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("bucket", models.DateTimeField()),
+                ("stations", models.PositiveIntegerField(default=0)),
+                ("bikes", models.FloatField(default=0)),
+                ("electrical_bikes", models.FloatField(default=0)),
+                ("stands", models.FloatField(default=0)),
+                (
+                    "contract",
+                    models.ForeignKey(
+                        db_index=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="app.contract",
+                    ),
+                ),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("contract", "bucket"),
+                        name="unique_contract_rollup_hourly",
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(sum_station_rollups, migrations.RunPython.noop),
+    ]
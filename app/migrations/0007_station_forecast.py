@@ -0,0 +1,32 @@
+# Generated by Django 5.2.3 on 2026-10-18 12:29
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("app", "0006_contract_rollups"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="StationForecast",
+            fields=[
+                (
+                    "station",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="forecast",
+                        serialize=False,
+                        to="app.station",
+                    ),
+                ),
+                ("made_at", models.DateTimeField()),
+                ("bikes_15", models.PositiveSmallIntegerField()),
+                ("bikes_30", models.PositiveSmallIntegerField()),
+                ("bikes_60", models.PositiveSmallIntegerField()),
+            ],
+        ),
+    ]
@@ -0,0 +1,83 @@
+# Generated by Django 5.2.3 on 2026-10-18 12:33
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+
+
+def compute_stats(apps, schema_editor):
+    """Fill the stats of every contract from the current stations."""
+    Contract = apps.get_model("app", "Contract")
+    ContractStats = apps.get_model("app", "ContractStats")
+    Station = apps.get_model("app", "Station")
+    is_open = Q(status="OPEN")
+    rows = {
+        row["contract_id"]: row
+        for row in Station.objects.filter(stands__kind="total")
+        .values("contract_id")
+        .annotate(
+            total_stations=Count("id"),
+            total_bikes=Sum("stands__bikes"),
+            total_electrical_bikes=Sum("stands__electrical_bikes"),
+            total_stands=Sum("stands__stands"),
+            empty=Count("id", filter=is_open & Q(stands__bikes=0)),
+            full=Count("id", filter=is_open & Q(stands__stands=0)),
+            closed=Count("id", filter=~is_open),
+        )
+        .order_by()
+    }
+    fields = {
+        "stations": "total_stations",
+        "bikes": "total_bikes",
+        "electrical_bikes": "total_electrical_bikes",
+        "stands": "total_stands",
+        "empty_stations": "empty",
+        "full_stations": "full",
+        "closed_stations": "closed",
+    }
+    objs = []
+    for name in Contract.objects.values_list("name", flat=True):
+        row = rows.get(name, {})
+        objs.append(
+            ContractStats(
+                contract_id=name,
+                **{field: row.get(key, 0) for field, key in fields.items()},
+            )
+        )
+    ContractStats.objects.bulk_create(objs)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("app", "0007_station_forecast"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ContractStats",
+            fields=[
+                (
+                    "contract",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="stats",
+                        serialize=False,
+                        to="app.contract",
+                    ),
+                ),
+                ("stations", models.PositiveIntegerField(default=0)),
+                ("bikes", models.PositiveIntegerField(default=0)),
+                ("electrical_bikes", models.PositiveIntegerField(default=0)),
+                ("stands", models.PositiveIntegerField(default=0)),
+                ("empty_stations", models.PositiveIntegerField(default=0)),
+                ("full_stations", models.PositiveIntegerField(default=0)),
+                ("closed_stations", models.PositiveIntegerField(default=0)),
+                ("updated", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "verbose_name_plural": "contract stats",
+            },
+        ),
+        migrations.RunPython(compute_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.3 on 2026-10-18 12:35
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("app", "0008_contract_stats"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="park",
+            index=models.Index(
+                django.db.models.functions.text.Lower("name"),
+                name="park_name_lower_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="park",
+            index=models.Index(
+                django.db.models.functions.text.Lower("address"),
+                name="park_address_lower_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="station",
+            index=models.Index(
+                django.db.models.functions.text.Lower("name"),
+                name="station_name_lower_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="station",
+            index=models.Index(
+                django.db.models.functions.text.Lower("address"),
+                name="station_address_lower_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,140 @@
+# Generated by Django 5.2.3 on 2026-10-18 12:39
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+KINDS = ("total", "main", "overflow")
+FIELDS = (
+    "bikes",
+    "stands",
+    "mechanical_bikes",
+    "electrical_bikes",
+    "electrical_internal_battery_bikes",
+    "electrical_removable_battery_bikes",
+    "capacity",
+)
+NO_STANDS = (0, 0, 0, 0, 0, 0, None)
+
+
+def copy_stands(apps, schema_editor):
+    """Fold the three ``Stand`` rows of every station into one row."""
+    Stand = apps.get_model("app", "Stand")
+    StationAvailability = apps.get_model("app", "StationAvailability")
+    stands = {}
+    rows = Stand.objects.values_list("station_id", "kind", *FIELDS)
+    for station_id, kind, *values in rows.iterator(chunk_size=5000):
+        stands.setdefault(station_id, {})[kind] = values
+    objs = []
+    for station_id, by_kind in stands.items():
+        fields = {}
+        for kind in KINDS:
+            values = by_kind.get(kind, NO_STANDS)
+            for name, value in zip(FIELDS, values):
+                fields[f"{kind}_{name}"] = value
+        objs.append(StationAvailability(station_id=station_id, **fields))
+    StationAvailability.objects.bulk_create(objs, batch_size=2000)
+
+
+def split_availabilities(apps, schema_editor):
+    """Rebuild one ``Stand`` row per station and kind."""
+    Stand = apps.get_model("app", "Stand")
+    StationAvailability = apps.get_model("app", "StationAvailability")
+    objs = []
+    for availability in StationAvailability.objects.iterator(chunk_size=5000):
+        for kind in KINDS:
+            objs.append(
+                Stand(
+                    station_id=availability.station_id,
+                    kind=kind,
+                    **{
+                        name: getattr(availability, f"{kind}_{name}")
+                        for name in FIELDS
+                    },
+                )
+            )
+    Stand.objects.bulk_create(objs, batch_size=2000)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("app", "0009_name_search_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="StationAvailability",
+            fields=[
+                (
+                    "station",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="availability",
+                        serialize=False,
+                        to="app.station",
+                    ),
+                ),
+                ("total_bikes", models.PositiveSmallIntegerField()),
+                ("total_stands", models.PositiveSmallIntegerField()),
+                ("total_mechanical_bikes", models.PositiveSmallIntegerField()),
+                ("total_electrical_bikes", models.PositiveSmallIntegerField()),
+                (
+                    "total_electrical_internal_battery_bikes",
+                    models.PositiveSmallIntegerField(),
+                ),
+                (
+                    "total_electrical_removable_battery_bikes",
+                    models.PositiveSmallIntegerField(),
+                ),
+                (
+                    "total_capacity",
+                    models.PositiveSmallIntegerField(blank=True, null=True),
+                ),
+                ("main_bikes", models.PositiveSmallIntegerField()),
+                ("main_stands", models.PositiveSmallIntegerField()),
+                ("main_mechanical_bikes", models.PositiveSmallIntegerField()),
+                ("main_electrical_bikes", models.PositiveSmallIntegerField()),
+                (
+                    "main_electrical_internal_battery_bikes",
+                    models.PositiveSmallIntegerField(),
+                ),
+                (
+                    "main_electrical_removable_battery_bikes",
+                    models.PositiveSmallIntegerField(),
+                ),
+                (
+                    "main_capacity",
+                    models.PositiveSmallIntegerField(blank=True, null=True),
+                ),
+                ("overflow_bikes", models.PositiveSmallIntegerField()),
+                ("overflow_stands", models.PositiveSmallIntegerField()),
+                (
+                    "overflow_mechanical_bikes",
+                    models.PositiveSmallIntegerField(),
+                ),
+                (
+                    "overflow_electrical_bikes",
+                    models.PositiveSmallIntegerField(),
+                ),
+                (
+                    "overflow_electrical_internal_battery_bikes",
+                    models.PositiveSmallIntegerField(),
+                ),
+                (
+                    "overflow_electrical_removable_battery_bikes",
+                    models.PositiveSmallIntegerField(),
+                ),
+                (
+                    "overflow_capacity",
+                    models.PositiveSmallIntegerField(blank=True, null=True),
+                ),
+            ],
+            options={
+                "verbose_name_plural": "station availabilities",
+            },
+        ),
+        migrations.RunPython(copy_stands, split_availabilities),
+        migrations.DeleteModel(
+            name="Stand",
+        ),
+    ]
@@ -0,0 +1,138 @@
+# Generated by Django 5.2.3 on 2026-10-18 12:46
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import CharField, OuterRef, Subquery, Value
+from django.db.models.functions import Cast, Concat
+
+# Models whose ``station`` foreign key follows the station ids.
+STATION_REFERENCES = (
+    "StationAvailability",
+    "StandSnapshot",
+    "FiveMinuteRollup",
+    "HourlyRollup",
+    "StationForecast",
+)
+MODELS = (("Station", STATION_REFERENCES), ("Park", ()))
+# Rollups reference stations without a reverse relation, which SQLite skips
+# when ``Station.id`` changes type. Their column is turned into a plain
+# integer around that change and back into a foreign key afterwards, so
+# every backend rebuilds it.
+ROLLUPS = ("fiveminuterollup", "hourlyrollup")
+
+
+def number_rows(apps, schema_editor):
+    """Replace ``"<contract>-<number>"`` keys with ``"1"``, ``"2"``, ...
+
+    Ids follow ``(contract, number)`` order. They are written as text into
+    the string keys and every foreign key column, so the ``AlterField``
+    operations below copy them into integer columns unchanged.
+    """
+    for name, references in MODELS:
+        model = apps.get_model("app", name)
+        rows = list(model.objects.order_by("contract", "number").only("pk"))
+        for surrogate, row in enumerate(rows, 1):
+            row.surrogate = surrogate
+        model.objects.bulk_update(rows, ["surrogate"], batch_size=2000)
+        for reference in references:
+            apps.get_model("app", reference).objects.update(
+                station_id=Cast(
+                    Subquery(
+                        model.objects.filter(
+                            pk=OuterRef("station_id")
+                        ).values("surrogate")[:1]
+                    ),
+                    CharField(),
+                )
+            )
+        model.objects.update(id=Cast("surrogate", CharField()))
+
+
+def restore_keys(apps, schema_editor):
+    """Turn integer ids back into ``"<contract>-<number>"`` keys."""
+    for name, references in MODELS:
+        model = apps.get_model("app", name)
+        key = Concat(
+            "contract_id",
+            Value("-"),
+            Cast("number", CharField()),
+            output_field=CharField(),
+        )
+        for reference in references:
+            apps.get_model("app", reference).objects.update(
+                station_id=Subquery(
+                    model.objects.filter(pk=OuterRef("station_id"))
+                    .annotate(key=key)
+                    .values("key")[:1]
+                )
+            )
+        model.objects.update(id=key)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("app", "0010_station_availability"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="station",
+            name="surrogate",
+            field=models.BigIntegerField(null=True),
+        ),
+        migrations.AddField(
+            model_name="park",
+            name="surrogate",
+            field=models.BigIntegerField(null=True),
+        ),
+        migrations.RunPython(number_rows, restore_keys),
+        migrations.RemoveField(
+            model_name="station",
+            name="surrogate",
+        ),
+        migrations.RemoveField(
+            model_name="park",
+            name="surrogate",
+        ),
+        *[
+            migrations.AlterField(
+                model_name=name,
+                name="station",
+                field=models.BigIntegerField(db_column="station_id"),
+            )
+            for name in ROLLUPS
+        ],
+        migrations.AlterField(
+            model_name="park",
+            name="id",
+            field=models.BigAutoField(
+                auto_created=True,
+                primary_key=True,
+                serialize=False,
+                verbose_name="ID",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="station",
+            name="id",
+            field=models.BigAutoField(
+                auto_created=True,
+                primary_key=True,
+                serialize=False,
+                verbose_name="ID",
+            ),
+        ),
+        *[
+            migrations.AlterField(
+                model_name=name,
+                name="station",
+                field=models.ForeignKey(
+                    db_index=False,
+                    on_delete=django.db.models.deletion.CASCADE,
+                    related_name="+",
+                    to="app.station",
+                ),
+            )
+            for name in ROLLUPS
+        ],
+    ]
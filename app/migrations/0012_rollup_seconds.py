@@ -0,0 +1,52 @@
+# Generated by Django 5.2.3 on 2026-10-18 13:12
+
+from django.db import migrations, models
+from django.db.models import F
+
+VALUES = ("bikes", "electrical_bikes", "stands")
+WIDTHS = {"FiveMinuteRollup": 300, "HourlyRollup": 3600}
+
+
+def weight_by_time(apps, schema_editor):
+    """Treat the mean of each old bucket as holding for the whole bucket."""
+    for name, width in WIDTHS.items():
+        apps.get_model("app", name).objects.filter(samples__gt=0).update(
+            seconds=width,
+            **{
+                f"{value}_sum": F(f"{value}_sum") * width / F("samples")
+                for value in VALUES
+            },
+        )
+
+
+def weight_by_samples(apps, schema_editor):
+    """Turn time-weighted sums back into sums of samples."""
+    for name in WIDTHS:
+        model = apps.get_model("app", name)
+        model.objects.filter(samples=0).delete()
+        model.objects.update(
+            **{
+                f"{value}_sum": F(f"{value}_sum") * F("samples") / F("seconds")
+                for value in VALUES
+            },
+        )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("app", "0011_integer_keys"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="fiveminuterollup",
+            name="seconds",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="hourlyrollup",
+            name="seconds",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(weight_by_time, weight_by_samples),
+    ]
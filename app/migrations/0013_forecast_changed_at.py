@@ -0,0 +1,17 @@
+# Generated by Django 5.2.3 on 2026-10-18 13:22
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("app", "0012_rollup_seconds"),
+    ]
+
+    operations = [
+        migrations.RenameField(
+            model_name="stationforecast",
+            old_name="made_at",
+            new_name="changed_at",
+        ),
+    ]
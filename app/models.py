@@ -1,6 +1,9 @@
 """Database models for the core application."""
 
+from typing import List, Tuple
+
 from django.db import models
+from django.db.models.functions import Lower
 
 
 class TimeStampedModel(models.Model):
@@ -20,6 +23,11 @@ class Contract(TimeStampedModel):
     commercial_name = models.CharField(max_length=255)
     country_code = models.CharField(max_length=10)
     cities = models.JSONField(default=list)
+    # Hashes of the last contract and parks payloads written, and whether
+    # the parks API answered (None until first asked).
+    payload_hash = models.CharField(max_length=32, blank=True, editable=False)
+    parks_hash = models.CharField(max_length=32, blank=True, editable=False)
+    parks_supported = models.BooleanField(null=True, editable=False)
 
     class Meta:
         ordering = ["name"]
@@ -29,9 +37,12 @@ class Contract(TimeStampedModel):
 
 
 class Station(TimeStampedModel):
-    """Represent a bike station returned by the JCDecaux API."""
+    """Represent a bike station returned by the JCDecaux API.
+
+    Rows are keyed by a compact integer id; ``(contract, number)`` is the
+    natural key, exposed publicly as ``"<contract>-<number>"``.
+    """
 
-    id = models.CharField(max_length=155, primary_key=True, editable=False)
     number = models.PositiveIntegerField()
     contract = models.ForeignKey(
         Contract,
@@ -52,50 +63,116 @@ class Station(TimeStampedModel):
 
     class Meta:
         ordering = ["contract", "number"]
-        indexes = [models.Index(fields=["contract", "number"])]
+        indexes = [
+            models.Index(fields=["contract", "number"]),
+            # Serve the admin's case-insensitive prefix searches, matched
+            # as ranges on ``LOWER(field)``.
+            models.Index(Lower("name"), name="station_name_lower_idx"),
+            models.Index(Lower("address"), name="station_address_lower_idx"),
+        ]
         unique_together = ("contract", "number")
 
-    def save(self, *args, **kwargs):
-        """Set the primary key based on contract and station number."""
-        self.id = f"{self.contract_id}-{self.number}"
-        super().save(*args, **kwargs)
+    @staticmethod
+    def make_key(contract_id: str, number: int) -> str:
+        """Return the public identifier of a station of ``contract_id``."""
+        return f"{contract_id}-{number}"
+
+    @staticmethod
+    def parse_key(key: str) -> Tuple[str, int]:
+        """Split a public identifier into contract name and number.
+
+        Raises ``ValueError`` if ``key`` is not ``"<contract>-<number>"``.
+        """
+        contract, _, number = key.rpartition("-")
+        if not contract or not number.isdigit():
+            raise ValueError(f"Invalid station key {key!r}")
+        return contract, int(number)
+
+    @property
+    def key(self) -> str:
+        return self.make_key(self.contract_id, self.number)
 
     def __str__(self) -> str:  # pragma: no cover - trivial
         return f"{self.contract_id} {self.number} - {self.name}"
 
 
-class Stand(TimeStampedModel):
-    """Availability and capacity information for a station."""
+class StationAvailability(models.Model):
+    """Current total, main and overflow stands of a station on one row.
 
-    class Kind(models.TextChoices):
-        TOTAL = "total", "Total"
-        MAIN = "main", "Main"
-        OVERFLOW = "overflow", "Overflow"
+    Written with the station by every ingestion cycle, so reading a
+    station's availabilities is one primary key lookup. Stations without
+    overflow stands store zeros and a null overflow capacity.
+    """
 
-    station = models.ForeignKey(
-        Station, on_delete=models.CASCADE, related_name="stands"
+    KINDS = ("total", "main", "overflow")
+    FIELDS = (
+        "bikes",
+        "stands",
+        "mechanical_bikes",
+        "electrical_bikes",
+        "electrical_internal_battery_bikes",
+        "electrical_removable_battery_bikes",
+        "capacity",
+    )
+
+    station = models.OneToOneField(
+        Station,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="availability",
+    )
+    total_bikes = models.PositiveSmallIntegerField()
+    total_stands = models.PositiveSmallIntegerField()
+    total_mechanical_bikes = models.PositiveSmallIntegerField()
+    total_electrical_bikes = models.PositiveSmallIntegerField()
+    total_electrical_internal_battery_bikes = (
+        models.PositiveSmallIntegerField()
+    )
+    total_electrical_removable_battery_bikes = (
+        models.PositiveSmallIntegerField()
+    )
+    total_capacity = models.PositiveSmallIntegerField(null=True, blank=True)
+    main_bikes = models.PositiveSmallIntegerField()
+    main_stands = models.PositiveSmallIntegerField()
+    main_mechanical_bikes = models.PositiveSmallIntegerField()
+    main_electrical_bikes = models.PositiveSmallIntegerField()
+    main_electrical_internal_battery_bikes = models.PositiveSmallIntegerField()
+    main_electrical_removable_battery_bikes = (
+        models.PositiveSmallIntegerField()
+    )
+    main_capacity = models.PositiveSmallIntegerField(null=True, blank=True)
+    overflow_bikes = models.PositiveSmallIntegerField()
+    overflow_stands = models.PositiveSmallIntegerField()
+    overflow_mechanical_bikes = models.PositiveSmallIntegerField()
+    overflow_electrical_bikes = models.PositiveSmallIntegerField()
+    overflow_electrical_internal_battery_bikes = (
+        models.PositiveSmallIntegerField()
+    )
+    overflow_electrical_removable_battery_bikes = (
+        models.PositiveSmallIntegerField()
+    )
+    overflow_capacity = models.PositiveSmallIntegerField(
+        null=True, blank=True
     )
-    kind = models.CharField(max_length=8, choices=Kind.choices)
-    bikes = models.PositiveIntegerField()
-    stands = models.PositiveIntegerField()
-    mechanical_bikes = models.PositiveIntegerField()
-    electrical_bikes = models.PositiveIntegerField()
-    electrical_internal_battery_bikes = models.PositiveIntegerField()
-    electrical_removable_battery_bikes = models.PositiveIntegerField()
-    capacity = models.PositiveIntegerField(null=True, blank=True)
 
     class Meta:
-        unique_together = ("station", "kind")
-        indexes = [models.Index(fields=["station", "kind"])]
+        verbose_name_plural = "station availabilities"
+
+    @classmethod
+    def columns(cls, kind: str) -> List[str]:
+        """Column names of one kind of stands, in ``FIELDS`` order."""
+        return [f"{kind}_{name}" for name in cls.FIELDS]
+
+    def values(self, kind: str) -> tuple:
+        return tuple(getattr(self, column) for column in self.columns(kind))
 
     def __str__(self) -> str:  # pragma: no cover - trivial
-        return f"{self.station_id} {self.kind}"
+        return f"{self.station_id} availability"
 
 
 class Park(TimeStampedModel):
     """Bike park returned by the JCDecaux API."""
 
-    id = models.CharField(max_length=155, primary_key=True, editable=False)
     contract = models.ForeignKey(
         Contract,
         on_delete=models.CASCADE,
@@ -120,13 +197,219 @@ class Park(TimeStampedModel):
 
     class Meta:
         ordering = ["contract", "number"]
-        indexes = [models.Index(fields=["contract", "number"])]
+        indexes = [
+            models.Index(fields=["contract", "number"]),
+            # Serve the admin's case-insensitive prefix searches, matched
+            # as ranges on ``LOWER(field)``.
+            models.Index(Lower("name"), name="park_name_lower_idx"),
+            models.Index(Lower("address"), name="park_address_lower_idx"),
+        ]
         unique_together = ("contract", "number")
 
-    def save(self, *args, **kwargs):
-        self.id = f"{self.contract_id}-{self.number}"
-        super().save(*args, **kwargs)
-
     def __str__(self) -> str:  # pragma: no cover - trivial
         return f"{self.contract_id} {self.number} - {self.name}"
 
+
+
+class StandSnapshot(models.Model):
+    """Total availabilities of a station at one ``lastUpdate``.
+
+    Rows are append-only and only written when a station reports a newer
+    ``lastUpdate`` with changed availabilities.
+    """
+
+    station = models.ForeignKey(
+        Station,
+        on_delete=models.CASCADE,
+        related_name="snapshots",
+        db_index=False,
+    )
+    ts = models.DateTimeField()
+    bikes = models.PositiveSmallIntegerField()
+    electrical_bikes = models.PositiveSmallIntegerField()
+    stands = models.PositiveSmallIntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["station", "ts"], name="unique_snapshot_station_ts"
+            )
+        ]
+        indexes = [models.Index(fields=["ts"])]
+
+    def __str__(self) -> str:  # pragma: no cover - trivial
+        return f"{self.station_id} {self.ts:%Y-%m-%d %H:%M:%S}"
+
+
+class AvailabilityRollup(models.Model):
+    """Min, max and time-weighted sum of station values per time bucket.
+
+    ``seconds`` is how much of the bucket the values are known for, and
+    each sum adds a value times the seconds it held. Sums are kept instead
+    of means so buckets can be merged exactly as snapshots arrive;
+    ``<value>_mean`` divides by ``seconds``.
+    """
+
+    BUCKET_SECONDS = 0
+
+    station = models.ForeignKey(
+        Station, on_delete=models.CASCADE, related_name="+", db_index=False
+    )
+    bucket = models.DateTimeField()
+    samples = models.PositiveIntegerField(default=0)
+    seconds = models.PositiveIntegerField(default=0)
+    bikes_min = models.PositiveSmallIntegerField()
+    bikes_max = models.PositiveSmallIntegerField()
+    bikes_sum = models.PositiveIntegerField()
+    electrical_bikes_min = models.PositiveSmallIntegerField()
+    electrical_bikes_max = models.PositiveSmallIntegerField()
+    electrical_bikes_sum = models.PositiveIntegerField()
+    stands_min = models.PositiveSmallIntegerField()
+    stands_max = models.PositiveSmallIntegerField()
+    stands_sum = models.PositiveIntegerField()
+
+    class Meta:
+        abstract = True
+
+    @property
+    def bikes_mean(self) -> float:
+        return self.bikes_sum / self.seconds
+
+    @property
+    def electrical_bikes_mean(self) -> float:
+        return self.electrical_bikes_sum / self.seconds
+
+    @property
+    def stands_mean(self) -> float:
+        return self.stands_sum / self.seconds
+
+    def __str__(self) -> str:  # pragma: no cover - trivial
+        return f"{self.station_id} {self.bucket:%Y-%m-%d %H:%M}"
+
+
+class FiveMinuteRollup(AvailabilityRollup):
+    BUCKET_SECONDS = 300
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["station", "bucket"], name="unique_rollup_5m"
+            )
+        ]
+        indexes = [models.Index(fields=["bucket"])]
+
+
+class HourlyRollup(AvailabilityRollup):
+    BUCKET_SECONDS = 3600
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["station", "bucket"], name="unique_rollup_hourly"
+            )
+        ]
+        indexes = [models.Index(fields=["bucket"])]
+
+
+class ContractRollup(models.Model):
+    """Availability of a whole contract per time bucket.
+
+    Each value is the sum over the contract's stations of their mean in
+    the bucket, kept in step with the station rollups of the same width.
+    Stations without a row in the bucket count with the values they last
+    held.
+    """
+
+    BUCKET_SECONDS = 0
+
+    contract = models.ForeignKey(
+        Contract, on_delete=models.CASCADE, related_name="+", db_index=False
+    )
+    bucket = models.DateTimeField()
+    stations = models.PositiveIntegerField(default=0)
+    bikes = models.FloatField(default=0)
+    electrical_bikes = models.FloatField(default=0)
+    stands = models.FloatField(default=0)
+
+    class Meta:
+        abstract = True
+
+    def __str__(self) -> str:  # pragma: no cover - trivial
+        return f"{self.contract_id} {self.bucket:%Y-%m-%d %H:%M}"
+
+
+class ContractFiveMinuteRollup(ContractRollup):
+    BUCKET_SECONDS = 300
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["contract", "bucket"],
+                name="unique_contract_rollup_5m",
+            )
+        ]
+
+
+class ContractHourlyRollup(ContractRollup):
+    BUCKET_SECONDS = 3600
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["contract", "bucket"],
+                name="unique_contract_rollup_hourly",
+            )
+        ]
+
+
+class StationForecast(models.Model):
+    """Bikes expected at a station 15, 30 and 60 minutes from now.
+
+    Refreshed by :mod:`app.forecast` after each ingestion cycle. Rows are
+    only rewritten when a value changes, so ``changed_at`` is when the
+    forecast last changed, not when it was last computed.
+    """
+
+    station = models.OneToOneField(
+        Station,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="forecast",
+    )
+    changed_at = models.DateTimeField()
+    bikes_15 = models.PositiveSmallIntegerField()
+    bikes_30 = models.PositiveSmallIntegerField()
+    bikes_60 = models.PositiveSmallIntegerField()
+
+    def __str__(self) -> str:  # pragma: no cover - trivial
+        return f"{self.station_id} {self.changed_at:%Y-%m-%d %H:%M}"
+
+
+class ContractStats(models.Model):
+    """Current availability totals of a contract.
+
+    Maintained by :mod:`app.stats` from the change of every station written,
+    so reading them is a primary key lookup. Empty and full counts only
+    include open stations.
+    """
+
+    contract = models.OneToOneField(
+        Contract,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="stats",
+    )
+    stations = models.PositiveIntegerField(default=0)
+    bikes = models.PositiveIntegerField(default=0)
+    electrical_bikes = models.PositiveIntegerField(default=0)
+    stands = models.PositiveIntegerField(default=0)
+    empty_stations = models.PositiveIntegerField(default=0)
+    full_stations = models.PositiveIntegerField(default=0)
+    closed_stations = models.PositiveIntegerField(default=0)
+    updated = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = "contract stats"
+
+    def __str__(self) -> str:  # pragma: no cover - trivial
+        return f"{self.contract_id} stats"
@@ -0,0 +1,132 @@
+"""Bounded queue between polling and a single database writer."""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+
+from asgiref.sync import sync_to_async
+
+from libs.jcdecauxclient.models import Station
+
+from .changes import ChangeDetector
+from .feed import upsert_and_publish
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+@dataclass
+class WritePipeline:
+    """Collect changed stations from many producers and write them serially.
+
+    Producers ``await submit(stations)``, which only blocks while
+    ``max_queue`` batches are already waiting, so polling carries on during
+    slow commits. One writer task drains everything queued (up to
+    ``max_batch`` stations, keeping the newest copy of each station) into a
+    single ``write`` call, which runs in a worker thread. The default
+    ``write`` also republishes the API feeds of the contracts it touched.
+
+    If a write fails and a ``detector`` is given, the fingerprints of the
+    lost stations are forgotten so the next poll writes them again.
+    """
+
+    write: Callable[[List[Station]], object] = upsert_and_publish
+    max_queue: int = 64
+    max_batch: int = 20000
+    detector: Optional[ChangeDetector] = None
+    clock: Callable[[], float] = time.monotonic
+
+    def __post_init__(self) -> None:
+        self.queue: asyncio.Queue = asyncio.Queue(self.max_queue)
+        self.submitted = 0
+        self.written = 0
+        self.batches = 0
+        self.errors = 0
+        self.last_commit = 0.0
+        self.max_commit = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    async def __aenter__(self) -> "WritePipeline":
+        self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self.close()
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._drain())
+
+    async def submit(self, stations: List[Station]) -> None:
+        if stations:
+            self.submitted += len(stations)
+            await self.queue.put(stations)
+
+    async def flush(self) -> None:
+        """Wait until everything submitted so far has been written."""
+        await self.queue.join()
+
+    async def close(self) -> None:
+        """Write what is still queued, then stop the writer."""
+        if self._task is None:
+            return
+        await self.queue.put(_STOP)
+        await self._task
+        self._task = None
+
+    def metrics(self) -> dict:
+        return {
+            "queued": self.queue.qsize(),
+            "submitted": self.submitted,
+            "written": self.written,
+            "batches": self.batches,
+            "errors": self.errors,
+            "last_commit": self.last_commit,
+            "max_commit": self.max_commit,
+        }
+
+    async def _drain(self) -> None:
+        stopping = False
+        while not stopping:
+            item = await self.queue.get()
+            taken = 1
+            pending: Dict[Tuple[str, int], Station] = {}
+            while True:
+                if item is _STOP:
+                    stopping = True
+                else:
+                    for station in item:
+                        key = (station.contractName, station.number)
+                        pending[key] = station
+                if (
+                    stopping
+                    or len(pending) >= self.max_batch
+                    or self.queue.empty()
+                ):
+                    break
+                item = self.queue.get_nowait()
+                taken += 1
+            try:
+                if pending:
+                    await self._write(list(pending.values()))
+            finally:
+                for _ in range(taken):
+                    self.queue.task_done()
+
+    async def _write(self, stations: List[Station]) -> None:
+        started = self.clock()
+        try:
+            await sync_to_async(self.write)(stations)
+        except Exception:
+            self.errors += 1
+            logger.exception("Writing %d stations failed", len(stations))
+            if self.detector is not None:
+                self.detector.forget(stations)
+            return
+        self.last_commit = self.clock() - started
+        self.max_commit = max(self.max_commit, self.last_commit)
+        self.written += len(stations)
+        self.batches += 1
@@ -0,0 +1,189 @@
+"""Continuous, per-contract adaptive polling of the JCDecaux API."""
+
+import asyncio
+import heapq
+import logging
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional
+
+from asgiref.sync import sync_to_async
+
+from libs.jcdecauxclient import JCDecauxClientAsync, PollResult
+from libs.jcdecauxclient.models import Station
+
+from .changes import ChangeDetector
+from .ingest import upsert_stations
+
+logger = logging.getLogger(__name__)
+
+Writer = Callable[[List[Station]], Awaitable[object]]
+
+
+@dataclass
+class ContractSchedule:
+    """Polling state and metrics of one contract.
+
+    The interval shrinks by ``speedup`` after a poll that saw changes and
+    grows by ``backoff`` after one that did not, within
+    ``[min_interval, max_interval]``.
+    """
+
+    contract: str
+    interval: float
+    min_interval: float
+    max_interval: float
+    speedup: float = 0.5
+    backoff: float = 1.5
+    next_due: float = 0.0
+    polls: int = 0
+    changed: int = 0
+    skipped: int = 0
+    skip_ratio: float = 0.0
+    errors: int = 0
+    last_poll: Optional[float] = None
+    last_lag: float = 0.0
+    max_lag: float = 0.0
+
+    def record(self, changed: int) -> None:
+        self.polls += 1
+        self.changed += changed
+        factor = self.speedup if changed else self.backoff
+        self.interval = min(
+            self.max_interval,
+            max(self.min_interval, self.interval * factor),
+        )
+
+    def record_skipped(self, skipped: int, seen: int) -> None:
+        self.skipped += skipped
+        self.skip_ratio = skipped / seen if seen else 0.0
+
+    def record_lag(self, lag: float) -> None:
+        self.last_lag = lag
+        self.max_lag = max(self.max_lag, lag)
+
+
+async def write_changes(stations: List[Station]) -> object:
+    return await sync_to_async(upsert_stations)(stations)
+
+
+@dataclass
+class Poller:
+    """Poll each contract on its own adaptive schedule.
+
+    Due contracts are taken from a heap ordered by ``next_due``; every
+    reschedule adds up to ``jitter`` (a fraction of the interval) of random
+    delay, and the first polls are spread over ``min_interval`` so requests
+    do not all fire at once. At most ``concurrency`` polls run together.
+
+    With a ``detector``, stations whose status and availabilities match
+    what was last written are dropped before ``write``.
+    """
+
+    client: JCDecauxClientAsync
+    contracts: Iterable[str]
+    min_interval: float = 30.0
+    max_interval: float = 600.0
+    concurrency: int = 4
+    jitter: float = 0.1
+    write: Writer = write_changes
+    detector: Optional[ChangeDetector] = None
+    clock: Callable[[], float] = time.monotonic
+    schedules: Dict[str, ContractSchedule] = field(default_factory=dict)
+
+    def __post_init__(self) -> None:
+        now = self.clock()
+        self._heap: List = []
+        self._stopping = asyncio.Event()
+        for name in self.contracts:
+            schedule = ContractSchedule(
+                name,
+                interval=self.min_interval,
+                min_interval=self.min_interval,
+                max_interval=self.max_interval,
+                next_due=now + random.uniform(0, self.min_interval),
+            )
+            self.schedules[name] = schedule
+            heapq.heappush(self._heap, (schedule.next_due, name))
+
+    def stop(self) -> None:
+        """Ask :meth:`run` to return once in-flight polls are done."""
+        self._stopping.set()
+
+    def metrics(self) -> Dict[str, dict]:
+        now = self.clock()
+        return {
+            name: {
+                "interval": s.interval,
+                "polls": s.polls,
+                "changed": s.changed,
+                "skipped": s.skipped,
+                "skip_ratio": s.skip_ratio,
+                "errors": s.errors,
+                "lag": s.last_lag,
+                "max_lag": s.max_lag,
+                "age": None if s.last_poll is None else now - s.last_poll,
+            }
+            for name, s in self.schedules.items()
+        }
+
+    async def poll(self, schedule: ContractSchedule) -> None:
+        started = self.clock()
+        schedule.record_lag(max(0.0, started - schedule.next_due))
+        try:
+            result: PollResult = await self.client.poll_stations(
+                schedule.contract
+            )
+            changed = result.changed
+            changes = None
+            if self.detector is not None and changed:
+                changes = self.detector.select(changed)
+                changed = changes.changed
+            if changed:
+                await self.write(changed)
+            if changes is not None:
+                self.detector.commit(changes)
+                schedule.record_skipped(changes.skipped, changes.seen)
+        except Exception:
+            schedule.errors += 1
+            schedule.record(changed=0)
+            logger.exception("Polling %s failed", schedule.contract)
+        else:
+            schedule.record(len(changed))
+        schedule.last_poll = self.clock()
+        delay = schedule.interval * (1 + random.uniform(0, self.jitter))
+        schedule.next_due = schedule.last_poll + delay
+        heapq.heappush(self._heap, (schedule.next_due, schedule.contract))
+
+    async def run(self) -> None:
+        semaphore = asyncio.Semaphore(self.concurrency)
+        tasks = set()
+
+        async def guarded(schedule: ContractSchedule) -> None:
+            async with semaphore:
+                await self.poll(schedule)
+
+        while not self._stopping.is_set():
+            if not self._heap:
+                await self._sleep(self.min_interval)
+                continue
+            due, name = self._heap[0]
+            wait = due - self.clock()
+            if wait > 0:
+                # Polls finishing meanwhile are never due sooner than
+                # min_interval, so waking up that often cannot miss them.
+                await self._sleep(min(wait, self.min_interval))
+                continue
+            heapq.heappop(self._heap)
+            task = asyncio.create_task(guarded(self.schedules[name]))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _sleep(self, seconds: float) -> None:
+        try:
+            await asyncio.wait_for(self._stopping.wait(), timeout=seconds)
+        except asyncio.TimeoutError:
+            pass
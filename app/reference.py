@@ -0,0 +1,119 @@
+"""Refresh contracts and parks, skipping payloads that did not change."""
+
+import hashlib
+import json
+from dataclasses import dataclass
+from typing import Iterable, List, Optional
+
+from django.db import transaction
+
+from libs.jcdecauxclient import JCDecauxClient, ParksNotSupportedError
+from libs.jcdecauxclient import models as api
+
+from .ingest import (
+    CONTRACT_UPDATE_FIELDS,
+    PARK_UPDATE_FIELDS,
+    contract_row,
+    park_row,
+)
+from .models import Contract, Park
+
+
+def payload_hash(data) -> str:
+    """Stable digest of a JSON-compatible payload."""
+    encoded = json.dumps(data, sort_keys=True, separators=(",", ":"))
+    return hashlib.blake2b(encoded.encode(), digest_size=16).hexdigest()
+
+
+@dataclass
+class ReferenceResult:
+    contracts: int = 0
+    contracts_skipped: int = 0
+    parks: int = 0
+    parks_skipped: int = 0
+    unsupported: int = 0
+    errors: int = 0
+
+
+def sync_contracts(
+    contracts: Iterable[api.Contract],
+    result: Optional[ReferenceResult] = None,
+) -> ReferenceResult:
+    """Upsert the contracts whose payload hash changed since the last sync."""
+    result = result or ReferenceResult()
+    known = dict(Contract.objects.values_list("name", "payload_hash"))
+    rows = []
+    for contract in contracts:
+        digest = payload_hash(contract.to_dict())
+        if known.get(contract.name) == digest:
+            result.contracts_skipped += 1
+            continue
+        row = contract_row(contract)
+        row.payload_hash = digest
+        rows.append(row)
+    Contract.objects.bulk_create(
+        rows,
+        update_conflicts=True,
+        unique_fields=["name"],
+        update_fields=CONTRACT_UPDATE_FIELDS + ["payload_hash"],
+    )
+    result.contracts += len(rows)
+    return result
+
+
+def write_parks(contract: str, parks: List[api.Park], digest: str) -> int:
+    """Replace the parks of ``contract`` and record the payload hash."""
+    rows = [park_row(park) for park in parks]
+    with transaction.atomic():
+        Park.objects.bulk_create(
+            rows,
+            update_conflicts=True,
+            unique_fields=["contract", "number"],
+            update_fields=PARK_UPDATE_FIELDS,
+        )
+        Park.objects.filter(contract_id=contract).exclude(
+            number__in=[row.number for row in rows]
+        ).delete()
+        Contract.objects.filter(name=contract).update(
+            parks_hash=digest, parks_supported=True
+        )
+    return len(rows)
+
+
+def sync_parks(
+    client: JCDecauxClient,
+    contracts: Optional[Iterable[str]] = None,
+    retry_unsupported: bool = False,
+    workers: Optional[int] = None,
+    result: Optional[ReferenceResult] = None,
+) -> ReferenceResult:
+    """Fetch parks of every stored contract and write the changed ones.
+
+    Contracts whose parks API answered 400 are flagged and left out of
+    later syncs unless ``retry_unsupported`` is set.
+    """
+    result = result or ReferenceResult()
+    stored = Contract.objects.all()
+    if contracts is not None:
+        stored = stored.filter(name__in=list(contracts))
+    if not retry_unsupported:
+        stored = stored.exclude(parks_supported=False)
+    hashes = dict(stored.values_list("name", "parks_hash"))
+    unsupported = []
+    for fetched in client.list_parks_many(hashes, workers=workers):
+        if isinstance(fetched.error, ParksNotSupportedError):
+            unsupported.append(fetched.contract)
+            continue
+        if fetched.error is not None:
+            result.errors += 1
+            continue
+        digest = payload_hash([park.to_dict() for park in fetched.value])
+        if hashes[fetched.contract] == digest:
+            result.parks_skipped += len(fetched.value)
+            continue
+        result.parks += write_parks(fetched.contract, fetched.value, digest)
+    Contract.objects.filter(name__in=unsupported).update(
+        parks_supported=False
+    )
+    result.unsupported = len(unsupported)
+    return result
@@ -0,0 +1,285 @@
+"""In-memory grid index over current station positions.
+
+Stations are bucketed in square cells of ``cell_deg`` degrees. Nearest
+queries scan rings of cells around the query point and stop as soon as the
+next ring cannot hold anything closer than the k-th match, so only a few
+dozen stations are looked at in dense cities.
+"""
+
+import math
+import time
+from dataclasses import dataclass
+from heapq import nsmallest
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from libs.jcdecauxclient.parsing import get_loads
+
+from .feed import FeedStore
+
+EARTH_RADIUS = 6_371_008.8
+METERS_PER_DEGREE = EARTH_RADIUS * math.pi / 180
+DEFAULT_CELL_DEG = 0.005
+MAX_RADIUS = 20_000.0
+
+_loads = get_loads(fast=True)
+
+Cell = Tuple[int, int]
+
+# Stations without availabilities yet are indexed as empty.
+NO_AVAILABILITIES = {"bikes": 0, "electricalBikes": 0, "stands": 0}
+
+
+@dataclass(slots=True)
+class Point:
+    """Position and availabilities of one station."""
+
+    key: str
+    contract: str
+    number: int
+    name: str
+    latitude: float
+    longitude: float
+    status: str
+    bikes: int
+    electrical_bikes: int
+    stands: int
+
+    @classmethod
+    def from_payload(cls, data: dict) -> "Point":
+        position = data["position"]
+        total = data["totalStands"]
+        total = total["availabilities"] if total else NO_AVAILABILITIES
+        return cls(
+            f"{data['contractName']}-{data['number']}",
+            data["contractName"],
+            data["number"],
+            data["name"],
+            position["latitude"],
+            position["longitude"],
+            data["status"],
+            total["bikes"],
+            total["electricalBikes"],
+            total["stands"],
+        )
+
+
+@dataclass(frozen=True)
+class Availability:
+    """Predicate on a station's current availabilities."""
+
+    min_bikes: int = 0
+    min_electrical_bikes: int = 0
+    min_stands: int = 0
+    open_only: bool = True
+
+    def __call__(self, point: Point) -> bool:
+        return (
+            point.bikes >= self.min_bikes
+            and point.electrical_bikes >= self.min_electrical_bikes
+            and point.stands >= self.min_stands
+            and (not self.open_only or point.status == "OPEN")
+        )
+
+
+Predicate = Callable[[Point], bool]
+
+
+def distance(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Great-circle distance in meters (haversine)."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = (
+        math.sin(dphi / 2) ** 2
+        + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS * math.asin(min(1.0, math.sqrt(a)))
+
+
+class GridIndex:
+    """Stations bucketed by ``(lat, lon)`` grid cell, updated in place."""
+
+    def __init__(self, cell_deg: float = DEFAULT_CELL_DEG):
+        self.cell_deg = cell_deg
+        self._cells: Dict[Cell, Dict[str, Point]] = {}
+        self._points: Dict[str, Tuple[Cell, Point]] = {}
+        self._contracts: Dict[str, set] = {}
+
+    def __len__(self) -> int:
+        return len(self._points)
+
+    def cell(self, latitude: float, longitude: float) -> Cell:
+        return (
+            math.floor(latitude / self.cell_deg),
+            math.floor(longitude / self.cell_deg),
+        )
+
+    def upsert(self, point: Point) -> None:
+        cell = self.cell(point.latitude, point.longitude)
+        old = self._points.get(point.key)
+        if old is not None and old[0] != cell:
+            self._discard(point.key, old[0])
+        self._cells.setdefault(cell, {})[point.key] = point
+        self._points[point.key] = (cell, point)
+        self._contracts.setdefault(point.contract, set()).add(point.key)
+
+    def remove(self, key: str) -> None:
+        old = self._points.pop(key, None)
+        if old is not None:
+            self._discard(key, old[0])
+            self._contracts.get(old[1].contract, set()).discard(key)
+
+    def replace_contract(self, contract: str, points: Iterable[Point]) -> None:
+        """Make ``points`` the only stations indexed for ``contract``."""
+        stale = set(self._contracts.get(contract, ()))
+        for point in points:
+            stale.discard(point.key)
+            self.upsert(point)
+        for key in stale:
+            self.remove(key)
+
+    def drop_contract(self, contract: str) -> None:
+        for key in list(self._contracts.pop(contract, ())):
+            self.remove(key)
+
+    def _discard(self, key: str, cell: Cell) -> None:
+        points = self._cells.get(cell)
+        if points is not None:
+            points.pop(key, None)
+            if not points:
+                del self._cells[cell]
+
+    def _ring(self, center: Cell, radius: int) -> Iterable[Dict[str, Point]]:
+        """Non-empty cells at Chebyshev distance ``radius`` from ``center``."""
+        cells = self._cells
+        row, col = center
+        if radius == 0:
+            found = cells.get(center)
+            return [found] if found else []
+        ring = []
+        for r in range(row - radius, row + radius + 1):
+            step = 1 if r in (row - radius, row + radius) else 2 * radius
+            for c in range(col - radius, col + radius + 1, step):
+                found = cells.get((r, c))
+                if found:
+                    ring.append(found)
+        return ring
+
+    def _ring_distance(self, latitude: float, radius: int) -> float:
+        """Lower bound of the distance to any cell of ring ``radius``."""
+        if radius <= 1:
+            return 0.0
+        span = (radius - 1) * self.cell_deg
+        shrink = math.cos(math.radians(min(89.9, abs(latitude) + span + 1)))
+        return span * METERS_PER_DEGREE * shrink
+
+    def nearest(
+        self,
+        latitude: float,
+        longitude: float,
+        k: int = 5,
+        radius: float = MAX_RADIUS,
+        predicate: Optional[Predicate] = None,
+    ) -> List[Tuple[float, Point]]:
+        """Up to ``k`` matching stations within ``radius`` meters, nearest
+        first, as ``(distance, point)`` pairs."""
+        center = self.cell(latitude, longitude)
+        found: List[Tuple[float, Point]] = []
+        ring = 0
+        while self._ring_distance(latitude, ring) <= radius:
+            if len(found) >= k and self._ring_distance(
+                latitude, ring
+            ) > found[k - 1][0]:
+                break
+            added = False
+            for points in self._ring(center, ring):
+                for point in points.values():
+                    if predicate is not None and not predicate(point):
+                        continue
+                    meters = distance(
+                        latitude, longitude, point.latitude, point.longitude
+                    )
+                    if meters <= radius:
+                        found.append((meters, point))
+                        added = True
+            if added:
+                found = nsmallest(k, found, key=lambda item: item[0])
+            ring += 1
+            if ring > self._max_ring(latitude, radius):
+                break
+        return found
+
+    def within(
+        self,
+        latitude: float,
+        longitude: float,
+        radius: float,
+        predicate: Optional[Predicate] = None,
+    ) -> List[Tuple[float, Point]]:
+        """Every matching station within ``radius`` meters, nearest first."""
+        return self.nearest(
+            latitude, longitude, len(self._points), radius, predicate
+        )
+
+    def _max_ring(self, latitude: float, radius: float) -> int:
+        """Rings needed to cover ``radius`` meters around ``latitude``."""
+        shrink = math.cos(math.radians(min(89.9, abs(latitude) + 1)))
+        degrees = radius / (METERS_PER_DEGREE * max(shrink, 1e-3))
+        return int(degrees / self.cell_deg) + 1
+
+
+class FeedSpatialIndex:
+    """A :class:`GridIndex` kept in sync with the API feed files.
+
+    At most every ``refresh_every`` seconds, contracts whose feed file was
+    rewritten are re-indexed and contracts whose file disappeared are
+    dropped; other contracts are left untouched.
+    """
+
+    def __init__(
+        self,
+        store: FeedStore,
+        cell_deg: float = DEFAULT_CELL_DEG,
+        refresh_every: float = 1.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.store = store
+        self.grid = GridIndex(cell_deg)
+        self.refresh_every = refresh_every
+        self.clock = clock
+        self._versions: Dict[str, tuple] = {}
+        self._checked: Optional[float] = None
+
+    def refresh(self, force: bool = False) -> int:
+        """Re-index changed contracts; return how many were updated."""
+        now = self.clock()
+        if (
+            not force
+            and self._checked is not None
+            and now - self._checked < self.refresh_every
+        ):
+            return 0
+        self._checked = now
+        names = set(self.store.names())
+        updated = 0
+        for name in names:
+            feed = self.store.load(name)
+            if feed is None or self._versions.get(name) == feed.stat:
+                continue
+            self.grid.replace_contract(
+                name, map(Point.from_payload, _loads(feed.body))
+            )
+            self._versions[name] = feed.stat
+            updated += 1
+        for name in set(self._versions) - names:
+            self.grid.drop_contract(name)
+            del self._versions[name]
+        return updated
+
+    def nearest(self, *args, **kwargs) -> List[Tuple[float, Point]]:
+        self.refresh()
+        return self.grid.nearest(*args, **kwargs)
+
+    def within(self, *args, **kwargs) -> List[Tuple[float, Point]]:
+        self.refresh()
+        return self.grid.within(*args, **kwargs)
@@ -0,0 +1,181 @@
+"""Per-contract availability totals kept up to date during ingestion.
+
+Every station contributes a fixed vector to its contract's
+:class:`~app.models.ContractStats` row (one station, its bikes, e-bikes and
+free stands, and whether it is empty, full or closed). When a batch is
+written, the old vector of each station is subtracted and the new one
+added, so no write ever scans the whole contract.
+:func:`compute_contract_stats` recomputes everything from the tables to
+check or repair the running totals.
+"""
+
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.db.models import Count, F, Q, Sum
+from django.utils import timezone
+
+from .models import Contract, ContractStats, Station, StationAvailability
+
+STAT_FIELDS = (
+    "stations",
+    "bikes",
+    "electrical_bikes",
+    "stands",
+    "empty_stations",
+    "full_stations",
+    "closed_stations",
+)
+OPEN = "OPEN"
+
+# (status, bikes, electrical_bikes, stands) of a station's total stands
+StationState = Tuple[str, int, int, int]
+Stats = List[int]
+
+
+def station_stats(state: StationState) -> Tuple[int, ...]:
+    """Contribution of one station, in ``STAT_FIELDS`` order."""
+    status, bikes, electrical_bikes, stands = state
+    is_open = status == OPEN
+    return (
+        1,
+        bikes,
+        electrical_bikes,
+        stands,
+        int(is_open and bikes == 0),
+        int(is_open and stands == 0),
+        int(not is_open),
+    )
+
+
+def stats_deltas(
+    stations: Iterable[Station],
+    availabilities: Dict[int, StationAvailability],
+    previous: Dict[int, StationState],
+) -> Dict[str, Stats]:
+    """Change of each contract's stats when ``stations`` are written.
+
+    ``availabilities`` holds the new availabilities by station id and
+    ``previous`` the stored state of stations that already existed.
+    """
+    deltas: Dict[str, Stats] = {}
+    for station in stations:
+        availability = availabilities[station.id]
+        new = station_stats(
+            (
+                station.status,
+                availability.total_bikes,
+                availability.total_electrical_bikes,
+                availability.total_stands,
+            )
+        )
+        old = previous.get(station.id)
+        if old is not None:
+            old_stats = station_stats(old)
+            if old_stats == new:
+                continue
+            new = [a - b for a, b in zip(new, old_stats)]
+        delta = deltas.setdefault(station.contract_id, [0] * len(STAT_FIELDS))
+        for i, change in enumerate(new):
+            delta[i] += change
+    return deltas
+
+
+def apply_stats_deltas(deltas: Dict[str, Stats]) -> int:
+    """Add ``deltas`` to the stored stats; run in the writing transaction.
+
+    Rows are moved with ``SET field = field + delta`` instead of being read
+    and written back, so concurrent writers never lose each other's
+    changes. Contracts without a row get an empty one first.
+    """
+    if not deltas:
+        return 0
+    ContractStats.objects.bulk_create(
+        [ContractStats(contract_id=contract) for contract in deltas],
+        ignore_conflicts=True,
+    )
+    now = timezone.now()
+    for contract, delta in deltas.items():
+        ContractStats.objects.filter(contract_id=contract).update(
+            updated=now,
+            **{
+                name: F(name) + change
+                for name, change in zip(STAT_FIELDS, delta)
+                if change
+            },
+        )
+    return len(deltas)
+
+
+def compute_contract_stats(
+    contracts: Optional[Iterable[str]] = None,
+) -> Dict[str, Tuple[int, ...]]:
+    """Stats of every contract (or of ``contracts``) from a full scan."""
+    names = Contract.objects.all()
+    if contracts is not None:
+        names = names.filter(name__in=list(contracts))
+    result = {
+        name: (0,) * len(STAT_FIELDS)
+        for name in names.values_list("name", flat=True)
+    }
+    is_open = Q(station__status=OPEN)
+    availabilities = StationAvailability.objects.all()
+    if contracts is not None:
+        availabilities = availabilities.filter(
+            station__contract_id__in=list(result)
+        )
+    rows = (
+        availabilities.values("station__contract_id")
+        .annotate(
+            stations=Count("pk"),
+            bikes=Sum("total_bikes"),
+            electrical_bikes=Sum("total_electrical_bikes"),
+            stands=Sum("total_stands"),
+            empty_stations=Count("pk", filter=is_open & Q(total_bikes=0)),
+            full_stations=Count("pk", filter=is_open & Q(total_stands=0)),
+            closed_stations=Count("pk", filter=~is_open),
+        )
+        .values_list("station__contract_id", *STAT_FIELDS)
+        .order_by()
+    )
+    for row in rows:
+        result[row[0]] = tuple(row[1:])
+    return result
+
+
+def stored_contract_stats(
+    contracts: Optional[Iterable[str]] = None,
+) -> Dict[str, Tuple[int, ...]]:
+    rows = ContractStats.objects.all()
+    if contracts is not None:
+        rows = rows.filter(contract_id__in=list(contracts))
+    return {
+        row[0]: tuple(row[1:])
+        for row in rows.values_list("contract_id", *STAT_FIELDS)
+    }
+
+
+def rebuild_contract_stats(
+    contracts: Optional[Iterable[str]] = None,
+) -> Dict[str, Tuple[int, ...]]:
+    """Replace the stored stats with a full recompute.
+
+    Returns the contracts whose stored stats were wrong or missing, with
+    their corrected values.
+    """
+    computed = compute_contract_stats(contracts)
+    stored = stored_contract_stats(computed)
+    fixed = {
+        name: stats
+        for name, stats in computed.items()
+        if stored.get(name) != stats
+    }
+    ContractStats.objects.bulk_create(
+        [
+            ContractStats(contract_id=name, **dict(zip(STAT_FIELDS, stats)))
+            for name, stats in fixed.items()
+        ],
+        update_conflicts=True,
+        unique_fields=["contract"],
+        update_fields=[*STAT_FIELDS, "updated"],
+    )
+    return fixed
@@ -0,0 +1,43 @@
+from django.urls import path
+
+from . import views
+
+urlpatterns = [
+    path(
+        "contracts/<str:name>/stations",
+        views.contract_stations,
+        name="contract-stations",
+    ),
+    path(
+        "contracts/<str:name>/history",
+        views.contract_history,
+        name="contract-history",
+    ),
+    path(
+        "contracts/<str:name>/forecast",
+        views.contract_forecast,
+        name="contract-forecast",
+    ),
+    path(
+        "contracts/<str:name>/stats",
+        views.contract_stats,
+        name="contract-stats",
+    ),
+    path("stations/nearby", views.nearby_stations, name="nearby-stations"),
+    path("stations/live", views.live_stations, name="live-stations"),
+    path(
+        "stations/<str:station_id>",
+        views.station_detail,
+        name="station-detail",
+    ),
+    path(
+        "stations/<str:station_id>/history",
+        views.station_history,
+        name="station-history",
+    ),
+    path(
+        "stations/<str:station_id>/forecast",
+        views.station_forecast,
+        name="station-forecast",
+    ),
+]
@@ -1 +1,424 @@
-# Create your views here.
+"""Read-only JSON API serving pre-serialized current availability."""
+
+import asyncio
+from datetime import timedelta, timezone
+from itertools import islice
+from typing import List, Optional
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import (
+    HttpResponse,
+    HttpResponseNotModified,
+    StreamingHttpResponse,
+)
+from django.utils import timezone as dj_timezone
+from django.utils.dateparse import parse_datetime
+from django.utils.http import parse_etags
+from django.views.decorators.http import require_safe
+
+from libs.jcdecauxclient.parsing import get_dumps
+
+from .feed import FeedEntry, FeedStore, format_timestamp
+from .forecast import FIELDS, HORIZONS
+from .history import (
+    bucket_start,
+    contract_series,
+    rollup_for,
+    station_series,
+)
+from .live import KEEPALIVE, LiveHub, Subscription
+from .models import Contract, ContractStats, Station, StationForecast
+from .spatial import MAX_RADIUS, Availability, FeedSpatialIndex
+
+store = FeedStore()
+spatial = FeedSpatialIndex(store)
+hub = LiveHub(FeedStore())
+
+NOT_FOUND = b'{"detail":"Not found."}'
+MAX_RESULTS = 200
+KEEPALIVE_SECONDS = 15.0
+MAX_HISTORY_BUCKETS = 10000
+HISTORY_CHUNK = 500
+
+_dumps = get_dumps(fast=True)
+
+
+def json_response(data, status: int = 200) -> HttpResponse:
+    return HttpResponse(
+        _dumps(data), status=status, content_type="application/json"
+    )
+
+
+def feed_response(request, entry: FeedEntry) -> HttpResponse:
+    """Serve ``entry`` with a strong ETag, honouring ``If-None-Match``.
+
+    ``If-None-Match`` uses the weak comparison (RFC 9110, 13.1.2), so a
+    ``W/`` tag sent back by a cache still matches.
+    """
+    if entry is None:
+        return HttpResponse(
+            NOT_FOUND, status=404, content_type="application/json"
+        )
+    cache_control = f"public, max-age={settings.API_CACHE_MAX_AGE}"
+    if_none_match = request.headers.get("If-None-Match")
+    if if_none_match:
+        etags = {tag.removeprefix("W/") for tag in parse_etags(if_none_match)}
+        if entry.etag in etags or "*" in etags:
+            response = HttpResponseNotModified()
+            response["ETag"] = entry.etag
+            response["Cache-Control"] = cache_control
+            return response
+    response = HttpResponse(entry.body, content_type="application/json")
+    response["ETag"] = entry.etag
+    response["Cache-Control"] = cache_control
+    return response
+
+
+@require_safe
+def contract_stations(request, name: str) -> HttpResponse:
+    return feed_response(request, store.contract(name))
+
+
+@require_safe
+def station_detail(request, station_id: str) -> HttpResponse:
+    try:
+        contract, number = Station.parse_key(station_id)
+    except ValueError:
+        return feed_response(request, None)
+    return feed_response(request, store.station(contract, str(number)))
+
+
+def _number(params, name, cast, default, low, high):
+    value = params.get(name)
+    if value is None:
+        return default
+    try:
+        value = cast(value)
+    except ValueError:
+        raise ValueError(f"{name} must be a number") from None
+    if not low <= value <= high:
+        raise ValueError(f"{name} must be between {low} and {high}")
+    return value
+
+
+@require_safe
+def nearby_stations(request) -> HttpResponse:
+    """Nearest stations to ``lat``/``lon`` matching availability filters.
+
+    ``k`` (default 5) limits the count; ``radius`` (meters) limits the
+    distance. With ``radius`` and no ``k``, every station in range is
+    returned, up to ``MAX_RESULTS``.
+    """
+    params = request.GET
+    try:
+        if "lat" not in params or "lon" not in params:
+            raise ValueError("lat and lon are required")
+        latitude = _number(params, "lat", float, None, -90, 90)
+        longitude = _number(params, "lon", float, None, -180, 180)
+        radius = _number(params, "radius", float, MAX_RADIUS, 0, MAX_RADIUS)
+        k = _number(params, "k", int, None, 1, MAX_RESULTS)
+        predicate = Availability(
+            min_bikes=_number(params, "min_bikes", int, 0, 0, 1000),
+            min_electrical_bikes=_number(
+                params, "min_electrical_bikes", int, 0, 0, 1000
+            ),
+            min_stands=_number(params, "min_stands", int, 0, 0, 1000),
+            open_only=params.get("open_only", "1") not in ("0", "false"),
+        )
+    except ValueError as exc:
+        return json_response({"detail": str(exc)}, status=400)
+
+    if k is None and "radius" in params:
+        found = spatial.within(latitude, longitude, radius, predicate)
+        found = found[:MAX_RESULTS]
+    else:
+        found = spatial.nearest(latitude, longitude, k or 5, radius, predicate)
+    return json_response(
+        [
+            {
+                "contractName": point.contract,
+                "number": point.number,
+                "name": point.name,
+                "distance": round(meters, 1),
+                "position": {
+                    "latitude": point.latitude,
+                    "longitude": point.longitude,
+                },
+                "status": point.status,
+                "bikes": point.bikes,
+                "electricalBikes": point.electrical_bikes,
+                "stands": point.stands,
+            }
+            for meters, point in found
+        ]
+    )
+
+
+def _bbox(value: str):
+    try:
+        bbox = tuple(float(part) for part in value.split(","))
+    except ValueError:
+        bbox = ()
+    if len(bbox) != 4 or bbox[0] > bbox[2] or bbox[1] > bbox[3]:
+        raise ValueError("bbox must be min_lon,min_lat,max_lon,max_lat")
+    return bbox
+
+
+async def _events(subscription: Subscription):
+    try:
+        yield b": subscribed\n\n"
+        while True:
+            try:
+                yield await asyncio.wait_for(
+                    subscription.queue.get(), KEEPALIVE_SECONDS
+                )
+            except asyncio.TimeoutError:
+                yield KEEPALIVE
+    finally:
+        hub.unsubscribe(subscription)
+
+
+@require_safe
+async def live_stations(request) -> HttpResponse:
+    """Server-Sent Events stream of changed stations.
+
+    Subscribe with one or more ``contract`` parameters and/or a ``bbox``
+    (``min_lon,min_lat,max_lon,max_lat``). Contract subscribers receive
+    ``stations`` events (a JSON array per ingestion cycle), bounding box
+    subscribers ``station`` events, and everyone a ``resync`` event after
+    falling too far behind.
+    """
+    contracts = set(request.GET.getlist("contract"))
+    try:
+        bbox = _bbox(request.GET["bbox"]) if "bbox" in request.GET else None
+    except ValueError as exc:
+        return json_response({"detail": str(exc)}, status=400)
+    if not contracts and bbox is None:
+        return json_response(
+            {"detail": "contract or bbox is required"}, status=400
+        )
+    subscription = hub.subscribe(Subscription(contracts, bbox))
+    response = StreamingHttpResponse(
+        _events(subscription), content_type="text/event-stream"
+    )
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
+def _datetime(params, name, default):
+    value = params.get(name)
+    if value is None:
+        return default
+    parsed = parse_datetime(value)
+    if parsed is None:
+        raise ValueError(f"{name} must be an ISO 8601 datetime")
+    if dj_timezone.is_naive(parsed):
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+def _history_params(params):
+    """``(start, end, bucket seconds, limit)`` of a history request."""
+    seconds = _number(params, "bucket", int, 3600, 300, 31 * 86400)
+    rollup_for(seconds)
+    limit = _number(params, "limit", int, 1000, 1, MAX_HISTORY_BUCKETS)
+    end = _datetime(params, "end", dj_timezone.now())
+    start = _datetime(params, "start", end - timedelta(days=1))
+    if start >= end:
+        raise ValueError("start must be before end")
+    return bucket_start(start, seconds), end, seconds, limit
+
+
+def _mean(total: int, seconds: int) -> float:
+    return round(total / seconds, 2)
+
+
+def _station_item(bucket, values) -> dict:
+    item = {"bucket": format_timestamp(bucket), "samples": values.samples}
+    for key, (low, high, total) in zip(
+        ("bikes", "electricalBikes", "stands"), values.values
+    ):
+        item[key] = {
+            "min": low,
+            "max": high,
+            "mean": _mean(total, values.seconds),
+        }
+    return item
+
+
+def _contract_item(bucket, stations, totals) -> dict:
+    bikes, electrical, stands = (round(total, 2) for total in totals)
+    return {
+        "bucket": format_timestamp(bucket),
+        "stations": stations,
+        "bikes": bikes,
+        "electricalBikes": electrical,
+        "stands": stands,
+    }
+
+
+def _history_chunks(request, seconds, limit, series, item):
+    """Encode ``series`` as a JSON page, ``HISTORY_CHUNK`` items a chunk.
+
+    Reads one bucket past ``limit`` to know whether a next page exists;
+    its start becomes the ``start`` of the ``next`` link.
+    """
+    yield b'{"bucket":%d,"results":[' % seconds
+    series = iter(series)
+    count = 0
+    first = True
+    while count < limit:
+        chunk = list(islice(series, min(HISTORY_CHUNK, limit - count)))
+        if not chunk:
+            break
+        count += len(chunk)
+        body = b",".join(_dumps(item(*entry)) for entry in chunk)
+        yield body if first else b"," + body
+        first = False
+    following = next(series, None) if count == limit else None
+    link = None
+    if following is not None:
+        query = request.GET.copy()
+        query["start"] = format_timestamp(following[0])
+        link = request.build_absolute_uri(
+            f"{request.path}?{query.urlencode()}"
+        )
+    yield b'],"next":' + _dumps(link) + b"}"
+
+
+async def _aiterate(iterator):
+    """Drive a sync generator that queries the database from async code.
+
+    Django buffers sync iterators entirely when serving ASGI, and async
+    ones under WSGI; pulling one chunk at a time keeps the memory bound of
+    the generator.
+    """
+    sentinel = object()
+    pull = sync_to_async(next)
+    while True:
+        chunk = await pull(iterator, sentinel)
+        if chunk is sentinel:
+            return
+        yield chunk
+
+
+def _history_response(request, find, series, item) -> HttpResponse:
+    try:
+        start, end, seconds, limit = _history_params(request.GET)
+    except ValueError as exc:
+        return json_response({"detail": str(exc)}, status=400)
+    key = find()
+    if key is None:
+        return feed_response(request, None)
+    chunks = _history_chunks(
+        request, seconds, limit, series(key, start, end, seconds), item
+    )
+    if isinstance(request, ASGIRequest):
+        chunks = _aiterate(chunks)
+    return StreamingHttpResponse(chunks, content_type="application/json")
+
+
+def _station_pk(key: str) -> Optional[int]:
+    """Id of the station with public key ``key``, if stored."""
+    try:
+        contract, number = Station.parse_key(key)
+    except ValueError:
+        return None
+    return (
+        Station.objects.filter(contract_id=contract, number=number)
+        .values_list("id", flat=True)
+        .first()
+    )
+
+
+@require_safe
+def station_history(request, station_id: str) -> HttpResponse:
+    """Availability of one station per ``bucket`` seconds.
+
+    Takes ``start``/``end`` (ISO 8601, default: the last day), ``bucket``
+    (a multiple of 300, default 3600) and ``limit`` buckets per page.
+    """
+    return _history_response(
+        request,
+        lambda: _station_pk(station_id),
+        station_series,
+        _station_item,
+    )
+
+
+@require_safe
+def contract_history(request, name: str) -> HttpResponse:
+    """Contract-wide availability per ``bucket`` seconds.
+
+    Same parameters as :func:`station_history`; values are the total mean
+    availability over the contract's stations.
+    """
+    return _history_response(
+        request,
+        lambda: name if Contract.objects.filter(name=name).exists() else None,
+        contract_series,
+        _contract_item,
+    )
+
+
+def _forecasts(**filters) -> List[dict]:
+    rows = (
+        StationForecast.objects.filter(**filters)
+        .order_by("station__number")
+        .values_list(
+            "station__contract_id", "station__number", "changed_at", *FIELDS
+        )
+    )
+    return [
+        {
+            "station": Station.make_key(row[0], row[1]),
+            "changedAt": format_timestamp(row[2]),
+            "bikes": dict(zip(map(str, HORIZONS), row[3:])),
+        }
+        for row in rows
+    ]
+
+
+@require_safe
+def station_forecast(request, station_id: str) -> HttpResponse:
+    """Bikes expected at a station in 15, 30 and 60 minutes."""
+    try:
+        contract, number = Station.parse_key(station_id)
+    except ValueError:
+        return feed_response(request, None)
+    found = _forecasts(station__contract_id=contract, station__number=number)
+    if not found:
+        return feed_response(request, None)
+    return json_response(found[0])
+
+
+@require_safe
+def contract_forecast(request, name: str) -> HttpResponse:
+    found = _forecasts(station__contract_id=name)
+    if not found and not Contract.objects.filter(name=name).exists():
+        return feed_response(request, None)
+    return json_response(found)
+
+
+@require_safe
+def contract_stats(request, name: str) -> HttpResponse:
+    """Current totals of a contract, maintained during ingestion."""
+    stats = ContractStats.objects.filter(contract_id=name).first()
+    if stats is None:
+        return feed_response(request, None)
+    return json_response(
+        {
+            "contract": name,
+            "stations": stats.stations,
+            "bikes": stats.bikes,
+            "electricalBikes": stats.electrical_bikes,
+            "stands": stats.stands,
+            "emptyStations": stats.empty_stations,
+            "fullStations": stats.full_stations,
+            "closedStations": stats.closed_stations,
+            "updated": format_timestamp(stats.updated),
+        }
+    )
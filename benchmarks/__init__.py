@@ -0,0 +1,4 @@
+"""Standalone performance benchmarks.
+
+Run one with ``python -m benchmarks.<name>``.
+"""
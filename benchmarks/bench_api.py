@@ -0,0 +1,60 @@
+"""Requests per second of the pre-serialized availability API.
+
+Run with ``python -m benchmarks.bench_api [stations]``. Requests go through
+Django's test client: the full middleware stack in one process, without a
+network server.
+"""
+
+import sys
+import tempfile
+import time
+
+from libs.jcdecauxclient.parsing import parse_stations
+
+from .bench_e2e import setup_django
+from .synthetic import network_payload
+
+
+def rate(client, path: str, seconds: float = 1.0, **headers) -> float:
+    count = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        for _ in range(100):
+            client.get(path, headers=headers)
+        count += 100
+    return count / seconds
+
+
+def main() -> None:
+    stations = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    setup_django()
+    from django.db import connection
+    from django.test import Client, override_settings
+    from django.test.utils import CaptureQueriesContext
+
+    from app.feed import publish_contracts
+    from app.ingest import upsert_stations
+
+    upsert_stations(parse_stations(network_payload(stations, contracts=1)))
+    with tempfile.TemporaryDirectory() as tmp, override_settings(
+        API_FEED_DIR=tmp, ALLOWED_HOSTS=["testserver"]
+    ):
+        publish_contracts(["contract0"])
+        client = Client()
+        contract = "/api/contracts/contract0/stations"
+        station = "/api/stations/contract0-1"
+        etag = client.get(station)["ETag"]
+        print(f"{stations} stations in one contract")
+        with CaptureQueriesContext(connection) as queries:
+            for name, path, headers in (
+                ("contract list (200)", contract, {}),
+                ("station (200)", station, {}),
+                ("station (304)", station, {"if-none-match": etag}),
+            ):
+                per_second = rate(client, path, **headers)
+                print(f"{name:<24}{per_second:>10,.0f} req/s")
+        print(f"ORM queries while serving: {len(queries)}")
+
+
+if __name__ == "__main__":
+    main()
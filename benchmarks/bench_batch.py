@@ -0,0 +1,65 @@
+"""Compare per-object loops with ``StationBatch`` aggregations.
+
+Run with ``python -m benchmarks.bench_batch [stations]``.
+"""
+
+import sys
+import time
+from collections import defaultdict
+
+from libs.jcdecauxclient import batch as batch_module
+from libs.jcdecauxclient.batch import StationBatch
+from libs.jcdecauxclient.parsing import parse_stations
+
+from .synthetic import network_payload
+
+
+def loop_aggregates(stations):
+    bikes = defaultdict(int)
+    electrical = defaultdict(int)
+    empty = defaultdict(int)
+    count = defaultdict(int)
+    for s in stations:
+        name = s.contractName
+        bikes[name] += s.totalStands.bikes
+        electrical[name] += s.totalStands.electricalBikes
+        empty[name] += s.totalStands.bikes == 0
+        count[name] += 1
+    return bikes, electrical, {k: empty[k] / count[k] for k in count}
+
+
+def batch_aggregates(batch):
+    return (
+        batch.group_sum("total_bikes"),
+        batch.group_sum("total_electrical_bikes"),
+        batch.group_ratio(batch["total_bikes"] == 0),
+    )
+
+
+def best(func, arg, repeat: int = 20) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(arg)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main(count: int = 30000) -> None:
+    data = network_payload(count, contracts=25)
+    stations = parse_stations(data)
+    batch = StationBatch.from_api(data)
+    backend = "numpy" if batch_module.np is not None else "array"
+
+    print(f"{count} stations, {backend} columns")
+    build = best(StationBatch.from_api, data, 3)
+    print(f"  build batch: {build * 1e3:.1f} ms")
+    print(f"  Python loop: {best(loop_aggregates, stations) * 1e6:,.0f} us")
+    if batch_module.np is None:
+        print("  StationBatch: install numpy for vectorized aggregates")
+        return
+    print(f" StationBatch: {best(batch_aggregates, batch) * 1e6:,.0f} us")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 30000)
@@ -0,0 +1,234 @@
+"""End-to-end throughput of the clients and ingestion against a fake API.
+
+Run with ``python -m benchmarks.bench_e2e [--stations N] [--contracts N]``.
+Each scenario reports requests/s, stations parsed/s, database rows
+written/s and the peak Python memory measured by ``tracemalloc``.
+"""
+
+import argparse
+import asyncio
+import os
+import time
+import tracemalloc
+from dataclasses import dataclass
+from typing import Callable, List
+
+from libs.jcdecauxclient import JCDecauxClient, JCDecauxClientAsync
+from libs.jcdecauxclient import models as api
+
+from .fake_server import FakeJCDecauxServer
+
+
+@dataclass
+class Counts:
+    requests: int = 0
+    stations: int = 0
+    rows: int = 0
+
+
+@dataclass
+class Scenario:
+    name: str
+    run: Callable[[], Counts]
+
+
+def setup_django() -> None:
+    """Configure Django against a throwaway in-memory test database."""
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+    os.environ.setdefault("SECRET_KEY", "benchmark")
+    import django
+    from django.db import connection
+
+    django.setup()
+    connection.creation.create_test_db(verbosity=0)
+
+
+def ingest(stations) -> int:
+    """Persist stations one row at a time; return rows written."""
+    from app.models import Contract, Station, StationAvailability
+
+    rows = 0
+    contracts = set(Contract.objects.values_list("name", flat=True))
+    for s in stations:
+        if s.contractName not in contracts:
+            Contract.objects.create(
+                name=s.contractName, commercial_name=s.contractName
+            )
+            contracts.add(s.contractName)
+            rows += 1
+        station, _ = Station.objects.update_or_create(
+            contract_id=s.contractName,
+            number=s.number,
+            defaults={
+                "name": s.name,
+                "address": s.address,
+                "position_latitude": s.position.latitude,
+                "position_longitude": s.position.longitude,
+                "banking": s.banking,
+                "bonus": s.bonus,
+                "status": s.status,
+                "last_update": s.lastUpdate,
+                "connected": s.connected,
+                "overflow": s.overflow,
+            },
+        )
+        rows += 1
+        defaults = {}
+        for kind, stands in zip(
+            StationAvailability.KINDS,
+            (s.totalStands, s.mainStands, s.overflowStands),
+        ):
+            if stands is None:
+                stands = api.Stands(0, 0, 0, 0, 0, 0, None)
+            defaults.update(
+                {
+                    f"{kind}_bikes": stands.bikes,
+                    f"{kind}_stands": stands.stands,
+                    f"{kind}_mechanical_bikes": stands.mechanicalBikes,
+                    f"{kind}_electrical_bikes": stands.electricalBikes,
+                    f"{kind}_electrical_internal_battery_bikes": (
+                        stands.electricalInternalBatteryBikes
+                    ),
+                    f"{kind}_electrical_removable_battery_bikes": (
+                        stands.electricalRemovableBatteryBikes
+                    ),
+                    f"{kind}_capacity": stands.capacity,
+                }
+            )
+        StationAvailability.objects.update_or_create(
+            station=station, defaults=defaults
+        )
+        rows += 1
+    return rows
+
+
+def scenarios(server: FakeJCDecauxServer, rounds: int) -> List[Scenario]:
+    contracts = server.network.contracts
+
+    def sync_bulk() -> Counts:
+        client = JCDecauxClient(api_key="bench", base_url=server.url)
+        counts = Counts()
+        for _ in range(rounds):
+            counts.stations += len(client.list_stations())
+            counts.requests += 1
+        return counts
+
+    def sync_per_contract() -> Counts:
+        client = JCDecauxClient(api_key="bench", base_url=server.url)
+        counts = Counts()
+        for _ in range(rounds):
+            for name in contracts:
+                counts.stations += len(client.list_stations(name))
+                counts.requests += 1
+        return counts
+
+    def sync_stream() -> Counts:
+        client = JCDecauxClient(api_key="bench", base_url=server.url)
+        counts = Counts()
+        for _ in range(rounds):
+            counts.stations += sum(1 for _ in client.iter_stations())
+            counts.requests += 1
+        return counts
+
+    def sync_poll() -> Counts:
+        client = JCDecauxClient(api_key="bench", base_url=server.url)
+        counts = Counts()
+        for _ in range(rounds):
+            server.network.tick()
+            counts.stations += len(client.poll_stations().changed)
+            counts.requests += 1
+        return counts
+
+    def async_fan_out() -> Counts:
+        async def run() -> Counts:
+            counts = Counts()
+            async with JCDecauxClientAsync(
+                api_key="bench", base_url=server.url
+            ) as client:
+                for _ in range(rounds):
+                    async for result in client.list_stations_many(contracts):
+                        counts.requests += 1
+                        counts.stations += len(result.value or ())
+            return counts
+
+        return asyncio.run(run())
+
+    def django_ingest() -> Counts:
+        client = JCDecauxClient(api_key="bench", base_url=server.url)
+        stations = client.list_stations()
+        return Counts(
+            requests=1, stations=len(stations), rows=ingest(stations)
+        )
+
+    def django_bulk_ingest() -> Counts:
+        from app.ingest import upsert_stations
+
+        client = JCDecauxClient(api_key="bench", base_url=server.url)
+        result = upsert_stations(client.iter_stations())
+        return Counts(
+            requests=1,
+            stations=result.stations,
+            rows=result.stations * 2,
+        )
+
+    return [
+        Scenario("sync list_stations (all)", sync_bulk),
+        Scenario("sync list_stations (per contract)", sync_per_contract),
+        Scenario("sync iter_stations (all)", sync_stream),
+        Scenario("sync poll_stations (deltas)", sync_poll),
+        Scenario("async list_stations_many", async_fan_out),
+        Scenario("django ingestion (per row)", django_ingest),
+        Scenario("django ingestion (bulk upsert)", django_bulk_ingest),
+    ]
+
+
+def measure(scenario: Scenario):
+    start = time.perf_counter()
+    counts = scenario.run()
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    scenario.run()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return counts, elapsed, peak
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--stations", type=int, default=5000)
+    parser.add_argument("--contracts", type=int, default=20)
+    parser.add_argument("--churn", type=float, default=0.05)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    setup_django()
+    server = FakeJCDecauxServer(
+        stations=args.stations,
+        contracts=args.contracts,
+        churn=args.churn,
+        tick=None,
+        latency=args.latency,
+    )
+    with server:
+        print(
+            f"{args.stations} stations in {args.contracts} contracts, "
+            f"churn {args.churn:.0%}, latency {args.latency * 1e3:.0f} ms"
+        )
+        print(
+            f"{'scenario':<36}{'req/s':>10}{'stations/s':>14}"
+            f"{'rows/s':>12}{'peak MB':>10}"
+        )
+        for scenario in scenarios(server, args.rounds):
+            counts, elapsed, peak = measure(scenario)
+            print(
+                f"{scenario.name:<36}"
+                f"{counts.requests / elapsed:>10,.1f}"
+                f"{counts.stations / elapsed:>14,.0f}"
+                f"{counts.rows / elapsed:>12,.0f}"
+                f"{peak / 1e6:>10.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
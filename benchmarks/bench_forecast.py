@@ -0,0 +1,105 @@
+"""Time to score and store forecasts for a whole network.
+
+Run with ``python -m benchmarks.bench_forecast [stations]``. Profiles are
+noisy daily waves with a random phase per station. Scoring is timed with
+NumPy and with the pure Python fallback, and storing is timed for a first
+cycle (every row) and for the next one (changed rows only).
+"""
+
+import math
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
+
+from .bench_e2e import setup_django
+
+NOW = datetime(2024, 5, 6, 8, 2, tzinfo=timezone.utc)
+
+
+def build(stations: int, rng: random.Random):
+    from app import forecast
+    from app.models import Contract, Station
+
+    Contract.objects.create(name="bench", commercial_name="bench")
+    Station.objects.bulk_create(
+        (
+            Station(
+                id=n + 1,
+                contract_id="bench",
+                number=n,
+                name=str(n),
+                address="",
+                position_latitude=0,
+                position_longitude=0,
+                banking=False,
+                bonus=False,
+                status="OPEN",
+                last_update=NOW,
+                connected=True,
+                overflow=False,
+            )
+            for n in range(stations)
+        ),
+        batch_size=5000,
+    )
+    forecaster = forecast.Forecaster(clock=lambda: NOW)
+    for n in range(stations):
+        row = forecaster._row(n + 1)
+        forecaster.capacity[row] = 20.0
+        forecaster.current[row] = float(rng.randint(0, 20))
+    forecaster._grow()
+    for row in range(stations):
+        phase = rng.uniform(0, 2 * math.pi)
+        sums, counts = forecaster._sums[row], forecaster._counts[row]
+        for slot in range(forecast.SLOTS):
+            usual = 10 + 8 * math.sin(2 * math.pi * slot / 24 + phase)
+            counts[slot] = 48
+            sums[slot] = 48 * (usual + rng.gauss(0, 1))
+    forecaster._folded = NOW
+    return forecaster
+
+
+def timed(label: str, run):
+    start = time.perf_counter()
+    result = run()
+    print(f"{label:<32}{(time.perf_counter() - start) * 1000:>9,.0f} ms")
+    return result
+
+
+def main() -> None:
+    stations = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    setup_django()
+    from app import forecast
+
+    if forecast.np is None:
+        print("NumPy is not installed; only the fallback is timed")
+    forecaster = build(stations, random.Random(0))
+    print(f"{stations} stations x {forecast.SLOTS} hour-of-week slots")
+
+    scores = timed("score (vectorized)", lambda: forecaster.score(NOW))
+    if forecast.np is not None:
+        with patch.object(forecast, "np", None):
+            forecaster._sums = forecaster._sums.tolist()
+            forecaster._counts = forecaster._counts.tolist()
+            timed("score (pure Python)", lambda: forecaster.score(NOW))
+    written = timed(
+        "store, first cycle", lambda: forecaster.store(NOW, scores)
+    )
+    print(f"  {written} rows written")
+    later = NOW + timedelta(minutes=5)
+    for row in range(0, stations, 10):
+        forecaster.current[row] = max(0.0, forecaster.current[row] - 3)
+    if forecast.np is not None:
+        forecaster._sums = forecast.np.asarray(forecaster._sums)
+        forecaster._counts = forecast.np.asarray(forecaster._counts)
+    written = timed(
+        "score + store, next cycle",
+        lambda: forecaster.store(later, forecaster.score(later)),
+    )
+    print(f"  {written} rows written")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""Latency of month-long history queries served from the rollups.
+
+Run with ``python -m benchmarks.bench_history [stations]``. Fills a month
+of hourly and 5-minute rollups for the stations of one contract, then
+times the history endpoints through Django's test client.
+"""
+
+import asyncio
+import json
+import random
+import sys
+import time
+from datetime import datetime, timezone
+
+from .bench_e2e import setup_django
+
+DAYS = 30
+
+
+def fill(stations: int, rng: random.Random) -> None:
+    from django.db import connection, transaction
+    from django.db.models import Count, F, FloatField, Sum
+    from django.db.models.functions import Cast
+
+    from app.history import CONTRACT_ROLLUPS, VALUES
+    from app.models import (
+        Contract,
+        FiveMinuteRollup,
+        HourlyRollup,
+        Station,
+    )
+
+    Contract.objects.create(name="bench", commercial_name="bench")
+    Station.objects.bulk_create(
+        Station(
+            id=n + 1,
+            contract_id="bench",
+            number=n,
+            name=str(n),
+            address="",
+            position_latitude=0,
+            position_longitude=0,
+            banking=False,
+            bonus=False,
+            status="OPEN",
+            last_update=datetime(2024, 1, 1, tzinfo=timezone.utc),
+            connected=True,
+            overflow=False,
+        )
+        for n in range(stations)
+    )
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    first = int(start.timestamp())
+    for model in (HourlyRollup, FiveMinuteRollup):
+        step = model.BUCKET_SECONDS
+        samples = step // 60
+        table = model._meta.db_table
+        sql = (
+            f"INSERT INTO {table} (station_id, bucket, samples, seconds, "
+            "bikes_min, bikes_max, bikes_sum, electrical_bikes_min, "
+            "electrical_bikes_max, electrical_bikes_sum, stands_min, "
+            "stands_max, stands_sum) VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?)"
+        )
+        buckets = [
+            datetime.fromtimestamp(ts, tz=timezone.utc).isoformat(" ")
+            for ts in range(first, first + DAYS * 86400, step)
+        ]
+        with transaction.atomic(), connection.cursor() as cursor:
+            for n in range(stations):
+                rows = []
+                for bucket in buckets:
+                    bikes = rng.randint(0, 20)
+                    ebikes = rng.randint(0, bikes)
+                    rows.append(
+                        (
+                            n + 1,
+                            bucket,
+                            samples,
+                            step,
+                            bikes,
+                            bikes,
+                            bikes * step,
+                            ebikes,
+                            ebikes,
+                            ebikes * step,
+                            0,
+                            0,
+                            0,
+                        )
+                    )
+                cursor.executemany(sql, rows)
+        # Every station has a row in every bucket, so the contract totals
+        # are plain sums of station means.
+        contract_model = CONTRACT_ROLLUPS[model]
+        totals = (
+            model.objects.values("bucket")
+            .annotate(
+                count=Count("station_id"),
+                **{
+                    name: Sum(Cast(f"{name}_sum", FloatField()) / F("seconds"))
+                    for name in VALUES
+                },
+            )
+            .order_by()
+        )
+        contract_model.objects.bulk_create(
+            [
+                contract_model(
+                    contract_id="bench",
+                    bucket=row["bucket"],
+                    stations=row["count"],
+                    **{name: row[name] for name in VALUES},
+                )
+                for row in totals
+            ],
+            batch_size=2000,
+        )
+
+
+def main() -> None:
+    stations = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    setup_django()
+    from django.test import AsyncClient, override_settings
+
+    start = time.perf_counter()
+    fill(stations, random.Random(0))
+    print(
+        f"filled {DAYS} days x {stations} stations of rollups in "
+        f"{time.perf_counter() - start:.1f}s"
+    )
+
+    client = AsyncClient()
+    month = {
+        "start": "2024-01-01T00:00:00Z",
+        "end": f"2024-01-{DAYS + 1:02d}T00:00:00Z",
+        "limit": 10000,
+    }
+
+    async def fetch(path, params):
+        response = await client.get(path, params)
+        body = b"".join([c async for c in response.streaming_content])
+        return len(json.loads(body)["results"])
+
+    for name, path, bucket in (
+        ("station, 15 min", "/api/stations/bench-0/history", 900),
+        ("contract, hourly", "/api/contracts/bench/history", 3600),
+        ("contract, daily", "/api/contracts/bench/history", 86400),
+        ("contract, 15 min", "/api/contracts/bench/history", 900),
+    ):
+        start = time.perf_counter()
+        with override_settings(ALLOWED_HOSTS=["testserver"]):
+            count = asyncio.run(fetch(path, {**month, "bucket": bucket}))
+        elapsed = time.perf_counter() - start
+        print(f"{name:<20}{count:>7} buckets{elapsed * 1000:>9,.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
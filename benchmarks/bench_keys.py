@@ -0,0 +1,139 @@
+"""Size and join speed of a history table keyed by text or integer ids.
+
+Run with ``python -m benchmarks.bench_keys [stations] [days]``. Builds the
+same hourly rollup table twice in SQLite, once referencing stations by
+their former ``"<contract>-<number>"`` keys and once by integer ids, then
+reports the size of the table and its indexes and times a contract-wide
+join and a run of single-station lookups on each.
+"""
+
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+CONTRACTS = (
+    "lyon",
+    "marseille",
+    "toulouse",
+    "nantes",
+    "bruxelles",
+    "luxembourg",
+    "valence",
+    "vilnius",
+)
+# Column type of ``station.id`` and of the rollup's reference to it.
+SCHEMA = {
+    "text": ("varchar(255) NOT NULL PRIMARY KEY", "varchar(255)"),
+    "integer": ("integer NOT NULL PRIMARY KEY AUTOINCREMENT", "bigint"),
+}
+
+
+def build(path: str, key: str, stations: int, days: int):
+    db = sqlite3.connect(path)
+    primary_key, reference = SCHEMA[key]
+    db.executescript(
+        f"""
+        CREATE TABLE station (
+            id {primary_key},
+            contract varchar(255) NOT NULL,
+            number integer NOT NULL
+        );
+        CREATE UNIQUE INDEX station_key ON station (contract, number);
+        CREATE TABLE rollup (
+            id integer NOT NULL PRIMARY KEY AUTOINCREMENT,
+            station_id {reference} NOT NULL REFERENCES station (id),
+            bucket datetime NOT NULL,
+            samples integer NOT NULL,
+            bikes_sum integer NOT NULL
+        );
+        CREATE UNIQUE INDEX rollup_station_bucket
+            ON rollup (station_id, bucket);
+        CREATE INDEX rollup_bucket ON rollup (bucket);
+        """
+    )
+    ids = []
+    for n in range(stations):
+        contract = CONTRACTS[n % len(CONTRACTS)]
+        number = 1000 + n // len(CONTRACTS)
+        text_key = f"{contract}-{number}"
+        cursor = db.execute(
+            "INSERT INTO station (id, contract, number) VALUES (?, ?, ?)",
+            (text_key if key == "text" else None, contract, number),
+        )
+        ids.append(text_key if key == "text" else cursor.lastrowid)
+    rng = random.Random(0)
+    hours = [
+        f"2024-{1 + h // 24 // 28:02d}-{1 + h // 24 % 28:02d} "
+        f"{h % 24:02d}:00:00"
+        for h in range(24 * days)
+    ]
+    for station_id in ids:
+        db.executemany(
+            "INSERT INTO rollup (station_id, bucket, samples, bikes_sum) "
+            "VALUES (?, ?, 12, ?)",
+            [(station_id, hour, rng.randint(0, 240)) for hour in hours],
+        )
+    db.commit()
+    db.execute("VACUUM")
+    return db, ids
+
+
+def sizes(db) -> dict:
+    return dict(
+        db.execute(
+            "SELECT name, SUM(pgsize) FROM dbstat "
+            "WHERE name LIKE 'rollup%' GROUP BY name"
+        )
+    )
+
+
+def timed(label: str, run, repeat: int = 3) -> None:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - start)
+    print(f"  {label:<28}{best * 1000:>9,.0f} ms")
+
+
+def main() -> None:
+    stations = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    days = int(sys.argv[2]) if len(sys.argv) > 2 else 28
+    print(f"{stations} stations x {days} days of hourly rollups")
+    with tempfile.TemporaryDirectory() as tmp:
+        for key in SCHEMA:
+            db, ids = build(
+                os.path.join(tmp, f"{key}.sqlite3"), key, stations, days
+            )
+            print(f"{key} keys")
+            for name, size in sorted(sizes(db).items()):
+                print(f"  {name:<28}{size / 2**20:>9,.1f} MB")
+            timed(
+                "contract totals, one week",
+                lambda: db.execute(
+                    "SELECT s.contract, SUM(r.bikes_sum) FROM rollup r "
+                    "JOIN station s ON s.id = r.station_id "
+                    "WHERE r.bucket >= '2024-01-08' "
+                    "AND r.bucket < '2024-01-15' GROUP BY s.contract"
+                ).fetchall(),
+            )
+            sample = random.Random(1).sample(ids, min(len(ids), 500))
+            timed(
+                f"{len(sample)} station lookups",
+                lambda: [
+                    db.execute(
+                        "SELECT bucket, bikes_sum FROM rollup "
+                        "WHERE station_id = ? AND bucket >= '2024-01-08'",
+                        (station_id,),
+                    ).fetchall()
+                    for station_id in sample
+                ],
+            )
+            db.close()
+
+
+if __name__ == "__main__":
+    main()
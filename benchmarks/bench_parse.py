@@ -0,0 +1,117 @@
+"""Compare the slotted ``from_api`` parser with the former closure parser.
+
+Run with ``python -m benchmarks.bench_parse [stations]``.
+"""
+
+import json
+import sys
+import time
+import tracemalloc
+from dataclasses import fields, make_dataclass
+
+from libs.jcdecauxclient import parsing
+from libs.jcdecauxclient.models import Position, Stands, Station
+
+from .synthetic import network_payload
+
+
+def _legacy(cls):
+    """Rebuild ``cls`` as the plain, dict-backed dataclass it used to be."""
+    return make_dataclass(
+        f"Legacy{cls.__name__}",
+        [(f.name, f.type, f) for f in fields(cls)],
+    )
+
+
+LegacyPosition = _legacy(Position)
+LegacyStands = _legacy(Stands)
+LegacyStation = _legacy(Station)
+
+
+def legacy_parse_station(data: dict):
+    pos = LegacyPosition(**data["position"])
+
+    def make_stands(obj):
+        av = obj["availabilities"]
+        return LegacyStands(**av, capacity=obj.get("capacity"))
+
+    total = make_stands(data["totalStands"])
+    main = make_stands(data["mainStands"])
+    overflow = None
+    if data.get("overflowStands"):
+        overflow = make_stands(data["overflowStands"])
+    return LegacyStation(
+        number=data["number"],
+        contractName=data["contractName"],
+        name=data["name"],
+        address=data["address"],
+        position=pos,
+        banking=data["banking"],
+        bonus=data["bonus"],
+        status=data["status"],
+        lastUpdate=data["lastUpdate"],
+        connected=data["connected"],
+        overflow=data["overflow"],
+        totalStands=total,
+        mainStands=main,
+        overflowStands=overflow,
+    )
+
+
+def legacy_parse(data):
+    return [legacy_parse_station(s) for s in data]
+
+
+def rate(func, arg, count: int, repeat: int = 5) -> float:
+    """Return the best items-per-second over ``repeat`` runs."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(arg)
+        best = min(best, time.perf_counter() - start)
+    return count / best
+
+
+def retained(func, arg):
+    """Return (allocated blocks, bytes) still held by the result."""
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    result = func(arg)
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    stats = after.compare_to(before, "filename")
+    del result
+    blocks = sum(s.count_diff for s in stats)
+    size = sum(s.size_diff for s in stats)
+    return blocks, size
+
+
+def main(count: int = 30000) -> None:
+    data = network_payload(count, contracts=25)
+    body = json.dumps(data).encode()
+
+    print(f"{count} stations, {len(body) / 1e6:.1f} MB payload")
+    for label, func in [
+        ("legacy", legacy_parse),
+        ("from_api", parsing.parse_stations),
+    ]:
+        blocks, size = retained(func, data)
+        print(
+            f"{label:>10}: {rate(func, data, count):>10,.0f} stations/s "
+            f"{blocks / count:5.1f} blocks/station "
+            f"{size / count:6.0f} B/station"
+        )
+
+    for label, fast in [("json", False), ("orjson", True)]:
+        loads = parsing.get_loads(fast)
+        if fast and loads is json.loads:
+            print(f"{label:>10}: not installed")
+            continue
+        print(
+            f"{label:>10}: "
+            f"{rate(loads, body, count):>10,.0f} stations/s decoded"
+        )
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 30000)
@@ -0,0 +1,86 @@
+"""Latency of nearest-station queries on the in-memory grid index.
+
+Run with ``python -m benchmarks.bench_spatial [stations]``. Stations are
+spread over 25 city-sized clusters; queries land inside the clusters.
+"""
+
+import random
+import sys
+import time
+
+from .bench_e2e import setup_django
+
+
+def build(stations: int, rng: random.Random):
+    from app.spatial import Point
+
+    cities = [
+        (rng.uniform(40, 55), rng.uniform(-5, 20)) for _ in range(25)
+    ]
+    points = []
+    for number in range(stations):
+        lat, lon = cities[number % len(cities)]
+        points.append(
+            Point(
+                f"city{number % len(cities)}-{number}",
+                f"city{number % len(cities)}",
+                number,
+                str(number),
+                lat + rng.gauss(0, 0.03),
+                lon + rng.gauss(0, 0.04),
+                "OPEN",
+                rng.randint(0, 20),
+                rng.randint(0, 5),
+                rng.randint(0, 20),
+            )
+        )
+    return cities, points
+
+
+def main() -> None:
+    stations = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    setup_django()
+    from app.spatial import Availability, GridIndex
+
+    rng = random.Random(0)
+    cities, points = build(stations, rng)
+
+    grid = GridIndex()
+    start = time.perf_counter()
+    for point in points:
+        grid.upsert(point)
+    elapsed = time.perf_counter() - start
+    print(f"indexed {stations} stations in {elapsed:.2f}s")
+
+    queries = [
+        (lat + rng.gauss(0, 0.02), lon + rng.gauss(0, 0.02))
+        for lat, lon in rng.choices(cities, k=2000)
+    ]
+    for name, run in (
+        ("5 nearest", lambda q: grid.nearest(*q, k=5)),
+        (
+            "5 nearest, >= 2 e-bikes",
+            lambda q: grid.nearest(
+                *q, k=5, predicate=Availability(min_electrical_bikes=2)
+            ),
+        ),
+        ("within 500 m", lambda q: grid.within(*q, 500)),
+        (
+            "brute force 5 nearest",
+            lambda q: sorted(
+                points,
+                key=lambda p: (p.latitude - q[0]) ** 2
+                + (p.longitude - q[1]) ** 2,
+            )[:5],
+        ),
+    ):
+        sample = queries if "brute" not in name else queries[:20]
+        start = time.perf_counter()
+        for query in sample:
+            run(query)
+        per_query = (time.perf_counter() - start) / len(sample)
+        print(f"{name:<28}{per_query * 1e6:>10,.0f} us/query")
+
+
+if __name__ == "__main__":
+    main()
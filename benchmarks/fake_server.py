@@ -0,0 +1,293 @@
+"""Local stand-in for the JCDecaux API serving a synthetic network.
+
+The server mimics ``/vls/v3/contracts``, ``/vls/v3/stations`` and the
+parking endpoints, honours ``If-None-Match`` and gzip, and can inject
+latency and 429 responses::
+
+    with FakeJCDecauxServer(stations=5000, contracts=20) as server:
+        client = JCDecauxClient(api_key="bench", base_url=server.url)
+
+A fraction ``churn`` of the stations gets new availabilities and a new
+``lastUpdate`` every ``tick`` seconds (or on each :meth:`FakeNetwork.tick`
+call when ``tick`` is ``None``).
+"""
+
+import gzip
+import json
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from .synthetic import (
+    contract_payload,
+    park_payload,
+    station_payload,
+    stands_payload,
+)
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec="milliseconds")
+
+
+class FakeNetwork:
+    """Synthetic contracts, stations and parks with versioned bodies.
+
+    Contracts with an odd index do not support the parks API.
+    """
+
+    def __init__(
+        self,
+        stations: int = 1000,
+        contracts: int = 10,
+        churn: float = 0.05,
+        parks_per_contract: int = 5,
+        seed: int = 0,
+    ):
+        self.rng = random.Random(seed)
+        self.churn = churn
+        self.contracts = [f"contract{i}" for i in range(contracts)]
+        self.stations: Dict[str, List[dict]] = {c: [] for c in self.contracts}
+        last_update = _now()
+        for number in range(stations):
+            contract = self.contracts[number % contracts]
+            self.stations[contract].append(
+                station_payload(self.rng, contract, number, last_update)
+            )
+        self.parks: Dict[str, List[dict]] = {
+            c: [
+                park_payload(self.rng, c, n)
+                for n in range(parks_per_contract)
+            ]
+            for i, c in enumerate(self.contracts)
+            if i % 2 == 0
+        }
+        self.versions = {c: 0 for c in self.contracts}
+        self.version = 0
+        self._bodies: Dict[Tuple, bytes] = {}
+        self.lock = threading.Lock()
+
+    def tick(self) -> int:
+        """Churn the network once; return the number of changed stations."""
+        with self.lock:
+            everything = [s for group in self.stations.values() for s in group]
+            count = round(len(everything) * self.churn)
+            last_update = _now()
+            for station in self.rng.sample(everything, count):
+                capacity = station["totalStands"]["capacity"]
+                stands = stands_payload(self.rng, capacity)
+                station["totalStands"] = stands
+                station["mainStands"] = dict(stands)
+                station["lastUpdate"] = last_update
+                self.versions[station["contractName"]] += 1
+            if count:
+                self.version += 1
+                self._bodies.clear()
+            return count
+
+    def stations_body(
+        self, contract: Optional[str], compress: bool
+    ) -> Tuple[str, bytes]:
+        """Return the ETag and (maybe gzipped) body of a stations list."""
+        with self.lock:
+            if contract:
+                version = self.versions[contract]
+                etag = f'"{contract}-{version}"'
+            else:
+                etag = f'"all-{self.version}"'
+            key = (contract, compress)
+            body = self._bodies.get(key)
+            if body is None:
+                if contract:
+                    data = self.stations[contract]
+                else:
+                    data = [s for g in self.stations.values() for s in g]
+                body = json.dumps(data).encode()
+                if compress:
+                    body = gzip.compress(body, compresslevel=1)
+                self._bodies[key] = body
+            return etag, body
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: "_Server"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        fake = self.server.fake
+        fake.count_request()
+        if fake.latency:
+            time.sleep(fake.latency)
+        if fake.should_throttle():
+            retry_after = str(fake.retry_after)
+            self._send(429, b"", headers={"Retry-After": retry_after})
+            return
+        fake.maybe_tick()
+
+        url = urlsplit(self.path)
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+        parts = [p for p in url.path.split("/") if p]
+        network = fake.network
+        if parts == ["vls", "v3", "contracts"]:
+            self._json([contract_payload(c) for c in network.contracts])
+        elif parts == ["vls", "v3", "stations"]:
+            self._stations(query.get("contract"))
+        elif parts[:3] == ["vls", "v3", "stations"] and len(parts) == 4:
+            contract = query.get("contract")
+            number = int(parts[3])
+            for station in network.stations.get(contract, []):
+                if station["number"] == number:
+                    self._json(station)
+                    return
+            self._send(404, b"")
+        elif parts[:3] == ["parking", "v1", "contracts"] and len(parts) >= 5:
+            parks = network.parks.get(parts[3])
+            if parks is None:
+                self._send(400, b"")
+            elif len(parts) == 5:
+                self._json(parks)
+            elif int(parts[5]) < len(parks):
+                self._json(parks[int(parts[5])])
+            else:
+                self._send(404, b"")
+        else:
+            self._send(404, b"")
+
+    def _stations(self, contract: Optional[str]) -> None:
+        network = self.server.fake.network
+        if contract and contract not in network.stations:
+            self._json([])
+            return
+        compress = "gzip" in self.headers.get("Accept-Encoding", "")
+        etag, body = network.stations_body(contract, compress)
+        if self.headers.get("If-None-Match") == etag:
+            self._send(304, b"", headers={"ETag": etag})
+            return
+        headers = {"ETag": etag, "Content-Type": "application/json"}
+        if compress:
+            headers["Content-Encoding"] = "gzip"
+        self._send(200, body, headers=headers)
+
+    def _json(self, data) -> None:
+        body = json.dumps(data).encode()
+        self._send(200, body, headers={"Content-Type": "application/json"})
+
+    def _send(self, status: int, body: bytes, headers=None) -> None:
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    fake: "FakeJCDecauxServer"
+
+
+class FakeJCDecauxServer:
+    """Serve a :class:`FakeNetwork` over HTTP on a local ephemeral port.
+
+    ``latency`` delays every response; ``rate_limit`` (requests per second)
+    and ``throttle_ratio`` (random share of requests) answer 429 with a
+    ``Retry-After`` of ``retry_after`` seconds.
+    """
+
+    def __init__(
+        self,
+        stations: int = 1000,
+        contracts: int = 10,
+        churn: float = 0.05,
+        tick: Optional[float] = 1.0,
+        latency: float = 0.0,
+        rate_limit: Optional[float] = None,
+        throttle_ratio: float = 0.0,
+        retry_after: int = 1,
+        parks_per_contract: int = 5,
+        seed: int = 0,
+    ):
+        self.network = FakeNetwork(
+            stations, contracts, churn, parks_per_contract, seed
+        )
+        self.tick = tick
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.throttle_ratio = throttle_ratio
+        self.retry_after = retry_after
+        self.requests = 0
+        self.throttled = 0
+        self._rng = random.Random(seed)
+        self._allowance = rate_limit or 0.0
+        self._checked = self._last_tick = time.monotonic()
+        self._lock = threading.Lock()
+        self._httpd: Optional[_Server] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def count_request(self) -> None:
+        with self._lock:
+            self.requests += 1
+
+    def should_throttle(self) -> bool:
+        with self._lock:
+            throttle = self._rng.random() < self.throttle_ratio
+            if self.rate_limit:
+                now = time.monotonic()
+                self._allowance = min(
+                    self.rate_limit,
+                    self._allowance + (now - self._checked) * self.rate_limit,
+                )
+                self._checked = now
+                if self._allowance < 1:
+                    throttle = True
+                else:
+                    self._allowance -= 1
+            if throttle:
+                self.throttled += 1
+            return throttle
+
+    def maybe_tick(self) -> None:
+        if not self.tick:
+            return
+        with self._lock:
+            now = time.monotonic()
+            due = int((now - self._last_tick) / self.tick)
+            if due:
+                self._last_tick += due * self.tick
+        if due:
+            self.network.tick()
+
+    def start(self) -> "FakeJCDecauxServer":
+        self._httpd = _Server(("127.0.0.1", 0), _Handler)
+        self._httpd.fake = self
+        self._thread = threading.Thread(
+            target=self._httpd.serve_forever,
+            kwargs={"poll_interval": 0.05},
+            daemon=True,
+        )
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+
+    def __enter__(self) -> "FakeJCDecauxServer":
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.stop()
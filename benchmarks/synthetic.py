@@ -0,0 +1,93 @@
+"""Deterministic synthetic JCDecaux payloads for benchmarks."""
+
+import random
+from typing import List
+
+
+def stands_payload(rng: random.Random, capacity: int) -> dict:
+    bikes = rng.randint(0, capacity)
+    electrical = rng.randint(0, bikes)
+    internal = rng.randint(0, electrical)
+    return {
+        "availabilities": {
+            "bikes": bikes,
+            "stands": capacity - bikes,
+            "mechanicalBikes": bikes - electrical,
+            "electricalBikes": electrical,
+            "electricalInternalBatteryBikes": internal,
+            "electricalRemovableBatteryBikes": electrical - internal,
+        },
+        "capacity": capacity,
+    }
+
+
+def station_payload(
+    rng: random.Random, contract: str, number: int, last_update: str
+) -> dict:
+    capacity = rng.randint(10, 40)
+    return {
+        "number": number,
+        "contractName": contract,
+        "name": f"{number:05d} - STATION {number}",
+        "address": f"{number} Rue de la Gare",
+        "position": {
+            "latitude": 45.0 + rng.random(),
+            "longitude": 4.0 + rng.random(),
+        },
+        "banking": rng.random() < 0.5,
+        "bonus": False,
+        "status": "OPEN" if rng.random() < 0.97 else "CLOSED",
+        "lastUpdate": last_update,
+        "connected": True,
+        "overflow": False,
+        "shape": None,
+        "totalStands": stands_payload(rng, capacity),
+        "mainStands": stands_payload(rng, capacity),
+        "overflowStands": None,
+    }
+
+
+def network_payload(
+    stations: int,
+    contracts: int = 1,
+    seed: int = 0,
+    last_update: str = "2025-01-01T00:00:00.000+00:00",
+) -> List[dict]:
+    """Return ``stations`` station payloads spread over ``contracts``."""
+    rng = random.Random(seed)
+    return [
+        station_payload(rng, f"contract{i % contracts}", i, last_update)
+        for i in range(stations)
+    ]
+
+
+def contract_payload(name: str) -> dict:
+    return {
+        "name": name,
+        "commercial_name": name.upper(),
+        "country_code": "FR",
+        "cities": [name.capitalize()],
+    }
+
+
+def park_payload(rng: random.Random, contract: str, number: int) -> dict:
+    return {
+        "contractName": contract,
+        "name": f"PARK {number}",
+        "number": number,
+        "status": "OPEN",
+        "position": {
+            "latitude": 45.0 + rng.random(),
+            "longitude": 4.0 + rng.random(),
+        },
+        "accessType": "FREE",
+        "lockerType": "NONE",
+        "hasSurveillance": rng.random() < 0.5,
+        "isFree": True,
+        "address": f"{number} Place du Parc",
+        "zipCode": "69000",
+        "city": contract.capitalize(),
+        "isOffStreet": True,
+        "hasElectricSupport": False,
+        "hasPhysicalReception": False,
+    }
@@ -80,10 +80,29 @@ WSGI_APPLICATION = "config.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
+# WAL lets readers run while the ingestion writer commits, NORMAL sync is
+# durable across application crashes in WAL mode, and IMMEDIATE transactions
+# take the write lock up front so busy_timeout applies instead of a
+# "database is locked" error halfway through a transaction.
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "busy_timeout": 20000,
+    "mmap_size": 256 * 1024 * 1024,
+    "temp_store": "MEMORY",
+}
+
 DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": BASE_DIR / "db.sqlite3",
+        "OPTIONS": {
+            "init_command": ";".join(
+                f"PRAGMA {name}={value}"
+                for name, value in SQLITE_PRAGMAS.items()
+            ),
+            "transaction_mode": "IMMEDIATE",
+        },
     }
 }
 
@@ -128,3 +147,15 @@ STATIC_URL = "static/"
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
+
+# Pre-serialized API responses (see app/feed.py), rewritten after each
+# ingestion cycle and shared by every web worker.
+
+API_FEED_DIR = Path(os.environ.get("API_FEED_DIR", BASE_DIR / "feed"))
+API_CACHE_MAX_AGE = 30
+
+# Sealed day files of raw availability snapshots (see app/archive.py).
+
+HISTORY_ARCHIVE_DIR = Path(
+    os.environ.get("HISTORY_ARCHIVE_DIR", BASE_DIR / "archive")
+)
@@ -1,9 +1,15 @@
 """Public interface for JCDecaux API clients and data models."""
 
 from .async_client import JCDecauxClientAsync
+from .batch import StationBatch
+from .cache import StationCache
 from .client import JCDecauxClient
 from .constants import API_BASE_URL
+from .exceptions import ParksNotSupportedError
+from .fanout import ContractResult
 from .models import Contract, Park, Position, Stands, Station
+from .polling import PollResult
+from .ratelimit import CircuitOpenError, RequestPolicy, TokenBucket
 
 __all__ = [
     "JCDecauxClient",
@@ -13,5 +19,13 @@ __all__ = [
     "Position",
     "Station",
     "Stands",
+    "StationBatch",
+    "PollResult",
+    "ContractResult",
+    "StationCache",
+    "RequestPolicy",
+    "TokenBucket",
+    "CircuitOpenError",
+    "ParksNotSupportedError",
     "API_BASE_URL",
 ]
@@ -1,27 +1,60 @@
 """Asynchronous client for interacting with the JCDecaux API."""
 
+import asyncio
 import os
-from typing import List, Optional
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Union
 from dotenv import load_dotenv
 
 import httpx
 
+from .batch import StationBatch
+from .cache import StationCache
 from .constants import API_BASE_URL
-from .models import Contract, Park, Position, Stands, Station
+from .exceptions import ParksNotSupportedError
+from .fanout import ContractResult, iter_completed
+from .models import Contract, Park, Station
+from .parsing import get_loads, parse_contracts, parse_parks, parse_stations
+from .polling import PollResult, StationSnapshot
+from .ratelimit import RequestPolicy
+from .streaming import JSONArrayDecoder
 
 load_dotenv()
 
+DEFAULT_LIMITS = httpx.Limits(
+    max_connections=32, max_keepalive_connections=32, keepalive_expiry=60.0
+)
+
 
 class JCDecauxClientAsync:
-    """Asynchronous wrapper around the JCDecaux REST API using httpx."""
-    def __init__(self, api_key: Optional[str] = None):
+    """Asynchronous wrapper around the JCDecaux REST API using httpx.
+
+    All calls share one connection pool sized by ``limits``; ``http2``
+    multiplexes them over a single connection and requires ``httpx[http2]``.
+    """
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        fast_json: bool = False,
+        cache: Optional[StationCache] = None,
+        policy: Optional[RequestPolicy] = None,
+        base_url: str = API_BASE_URL,
+        limits: httpx.Limits = DEFAULT_LIMITS,
+        http2: bool = False,
+    ):
         api_key = api_key or os.environ.get("API_KEY")
         if not api_key:
             raise ValueError(
                 "API key must be provided either via argument or API_KEY env var"
             )
         self.api_key = api_key
-        self.client = httpx.AsyncClient(params={"apiKey": api_key})
+        self.base_url = base_url.rstrip("/")
+        self._loads = get_loads(fast_json)
+        self.cache = cache
+        self.policy = policy
+        self.client = httpx.AsyncClient(
+            params={"apiKey": api_key}, limits=limits, http2=http2
+        )
+        self._snapshots: Dict[Optional[str], StationSnapshot] = {}
 
     async def close(self) -> None:
         await self.client.aclose()
@@ -32,101 +65,206 @@ class JCDecauxClientAsync:
     async def __aexit__(self, exc_type, exc, tb) -> None:
         await self.close()
 
+    async def _get(
+        self, endpoint: str, url: str, stream: bool = False, **kwargs
+    ) -> httpx.Response:
+        """Send a GET request, paced and retried by ``self.policy``.
+
+        With ``stream`` the body is not read and the caller must close the
+        response.
+        """
+        policy = self.policy
+        attempt = 0
+        while True:
+            if policy is not None:
+                wait = policy.before_request(endpoint)
+                if wait:
+                    await asyncio.sleep(wait)
+            try:
+                if stream:
+                    request = self.client.build_request("GET", url, **kwargs)
+                    resp = await self.client.send(request, stream=True)
+                else:
+                    resp = await self.client.get(url, **kwargs)
+            except httpx.TransportError:
+                if policy is None:
+                    raise
+                delay = policy.after_error(endpoint, attempt)
+                if delay is None:
+                    raise
+            else:
+                if policy is None:
+                    return resp
+                delay = policy.after_response(
+                    endpoint,
+                    resp.status_code,
+                    resp.headers.get("Retry-After"),
+                    attempt,
+                )
+                if delay is None:
+                    return resp
+                await resp.aclose()
+            await asyncio.sleep(delay)
+            attempt += 1
+
     async def get_contracts(self) -> List[Contract]:
-        url = f"{API_BASE_URL}/vls/v3/contracts"
-        resp = await self.client.get(url)
+        if self.cache is not None:
+            contracts = self.cache.get_contracts()
+            if contracts is not None:
+                return contracts
+        url = f"{self.base_url}/vls/v3/contracts"
+        resp = await self._get("contracts", url)
         resp.raise_for_status()
-        data = resp.json()
-        return [Contract(**c) for c in data]
+        contracts = parse_contracts(self._loads(resp.content))
+        if self.cache is not None:
+            self.cache.store_contracts(contracts)
+        return contracts
 
     async def get_station(self, station_number: int, contract_name: str) -> Station:
-        url = f"{API_BASE_URL}/vls/v3/stations/{station_number}"
+        """Return one station.
+
+        With a cache, the station is served from the contract snapshot,
+        which is loaded in bulk through :meth:`list_stations` on a miss.
+        """
+        if self.cache is not None:
+            return await self._get_cached_station(
+                station_number, contract_name
+            )
+        url = f"{self.base_url}/vls/v3/stations/{station_number}"
         params = {"contract": contract_name}
-        resp = await self.client.get(url, params=params)
+        resp = await self._get("station", url, params=params)
         if resp.status_code == 404:
             raise ValueError(
                 f"Station {station_number} not found in contract {contract_name}"
             )
         resp.raise_for_status()
-        s = resp.json()
-        return self._parse_station(s)
+        return Station.from_api(self._loads(resp.content))
+
+    async def _get_cached_station(
+        self, station_number: int, contract_name: str
+    ) -> Station:
+        station = self.cache.get_station(contract_name, station_number)
+        if station is not None:
+            return station
+        if not self.cache.has_contract(contract_name):
+            for station in await self.list_stations(contract_name):
+                if station.number == station_number:
+                    return station
+        raise ValueError(
+            f"Station {station_number} not found in contract {contract_name}"
+        )
+
+    async def list_stations(
+        self, contract_name: Optional[str] = None, as_batch: bool = False
+    ) -> Union[List[Station], StationBatch]:
+        """Return the stations of one contract, or of all of them.
 
-    async def list_stations(self, contract_name: Optional[str] = None) -> List[Station]:
-        url = f"{API_BASE_URL}/vls/v3/stations"
+        ``as_batch`` returns a columnar :class:`StationBatch` built straight
+        from the payload instead; the cache is not updated in that case.
+        """
+        url = f"{self.base_url}/vls/v3/stations"
         params = {}
         if contract_name:
             params["contract"] = contract_name
-        resp = await self.client.get(url, params=params)
+        resp = await self._get("stations", url, params=params)
         resp.raise_for_status()
-        data = resp.json()
-        return [self._parse_station(s) for s in data]
+        data = self._loads(resp.content)
+        if as_batch:
+            return StationBatch.from_api(data)
+        stations = parse_stations(data)
+        if self.cache is not None:
+            self.cache.store_stations(stations, contract_name)
+        return stations
+
+    async def iter_stations(
+        self, contract_name: Optional[str] = None, chunk_size: int = 65536
+    ) -> AsyncIterator[Station]:
+        """Yield stations one at a time while the response is downloaded.
+
+        Unlike :meth:`list_stations` the body is never held in memory as a
+        whole, which keeps memory flat for the all-contracts feed.
+        """
+        url = f"{self.base_url}/vls/v3/stations"
+        params = {}
+        if contract_name:
+            params["contract"] = contract_name
+        resp = await self._get("stations", url, params=params, stream=True)
+        try:
+            resp.raise_for_status()
+            decoder = JSONArrayDecoder()
+            async for chunk in resp.aiter_bytes(chunk_size):
+                for data in decoder.feed(chunk):
+                    yield Station.from_api(data)
+            for data in decoder.close():
+                yield Station.from_api(data)
+        finally:
+            await resp.aclose()
+
+    async def poll_stations(
+        self, contract_name: Optional[str] = None
+    ) -> PollResult:
+        """Fetch stations conditionally and return only those that changed.
+
+        ETag/Last-Modified validators and station fingerprints are kept per
+        ``contract_name`` so successive calls only report deltas.
+        """
+        url = f"{self.base_url}/vls/v3/stations"
+        params = {}
+        if contract_name:
+            params["contract"] = contract_name
+        snapshot = self._snapshots.setdefault(contract_name, StationSnapshot())
+        resp = await self._get(
+            "stations", url, params=params, headers=snapshot.request_headers()
+        )
+        if resp.status_code != 304:
+            resp.raise_for_status()
+        result = snapshot.update(
+            resp.status_code,
+            resp.headers,
+            resp.content,
+            Station.from_api,
+            self._loads,
+        )
+        if self.cache is not None:
+            self.cache.merge_stations(result.changed, result.removed)
+        return result
 
     async def list_parks(self, contract_name: str) -> List[Park]:
-        url = f"{API_BASE_URL}/parking/v1/contracts/{contract_name}/parks"
-        resp = await self.client.get(url)
+        url = f"{self.base_url}/parking/v1/contracts/{contract_name}/parks"
+        resp = await self._get("parks", url)
         if resp.status_code == 400:
-            raise ValueError(
-                f"Contract {contract_name} not found or does not support parks API"
-            )
+            raise ParksNotSupportedError(contract_name)
         resp.raise_for_status()
-        data = resp.json()
-        return [self._parse_park(p) for p in data]
+        return parse_parks(self._loads(resp.content))
+
+    def list_stations_many(
+        self, contracts: Iterable[str], max_concurrency: int = 8
+    ) -> AsyncIterator[ContractResult[List[Station]]]:
+        """Fetch several contracts' stations concurrently.
+
+        Results are yielded as each contract completes; errors are reported
+        per contract without cancelling the others.
+        """
+        return iter_completed(self.list_stations, contracts, max_concurrency)
+
+    def list_parks_many(
+        self, contracts: Iterable[str], max_concurrency: int = 8
+    ) -> AsyncIterator[ContractResult[List[Park]]]:
+        """Fetch several contracts' parks concurrently.
+
+        Behaves like :meth:`list_stations_many`.
+        """
+        return iter_completed(self.list_parks, contracts, max_concurrency)
 
     async def get_park(self, contract_name: str, park_number: int) -> Park:
-        url = f"{API_BASE_URL}/parking/v1/contracts/{contract_name}/parks/{park_number}"
-        resp = await self.client.get(url)
+        url = (
+            f"{self.base_url}/parking/v1/contracts/{contract_name}"
+            f"/parks/{park_number}"
+        )
+        resp = await self._get("park", url)
         if resp.status_code == 404:
             raise ValueError(
                 f"Park {park_number} not found in contract {contract_name}"
             )
         resp.raise_for_status()
-        return self._parse_park(resp.json())
-
-    def _parse_station(self, data: dict) -> Station:
-        pos = Position(**data["position"])
-
-        def make_stands(obj):
-            av = obj["availabilities"]
-            return Stands(**av, capacity=obj.get("capacity"))
-
-        total = make_stands(data["totalStands"])
-        main = make_stands(data["mainStands"])
-        overflow = None
-        if data.get("overflowStands"):
-            overflow = make_stands(data["overflowStands"])
-        return Station(
-            number=data["number"],
-            contractName=data["contractName"],
-            name=data["name"],
-            address=data["address"],
-            position=pos,
-            banking=data["banking"],
-            bonus=data["bonus"],
-            status=data["status"],
-            lastUpdate=data["lastUpdate"],
-            connected=data["connected"],
-            overflow=data["overflow"],
-            totalStands=total,
-            mainStands=main,
-            overflowStands=overflow,
-        )
-
-    def _parse_park(self, data: dict) -> Park:
-        pos = Position(**data["position"])
-        return Park(
-            contractName=data["contractName"],
-            name=data["name"],
-            number=data["number"],
-            status=data["status"],
-            position=pos,
-            accessType=data["accessType"],
-            lockerType=data["lockerType"],
-            hasSurveillance=data["hasSurveillance"],
-            isFree=data["isFree"],
-            address=data["address"],
-            zipCode=data["zipCode"],
-            city=data["city"],
-            isOffStreet=data["isOffStreet"],
-            hasElectricSupport=data["hasElectricSupport"],
-            hasPhysicalReception=data["hasPhysicalReception"],
-        )
+        return Park.from_api(self._loads(resp.content))
@@ -0,0 +1,215 @@
+"""Columnar representation of many stations for network-wide analytics.
+
+Columns are NumPy arrays when NumPy is installed, so comparisons, filters
+and group-by aggregations run vectorized. Without NumPy they fall back to
+``array.array`` columns and plain Python loops with the same results.
+"""
+
+from array import array
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Sequence
+
+try:  # pragma: no cover - depends on the environment
+    import numpy as np
+except ImportError:  # pragma: no cover - depends on the environment
+    np = None
+
+STAND_FIELDS = (
+    ("bikes", "bikes"),
+    ("stands", "stands"),
+    ("mechanical_bikes", "mechanicalBikes"),
+    ("electrical_bikes", "electricalBikes"),
+    ("electrical_internal_battery_bikes", "electricalInternalBatteryBikes"),
+    ("electrical_removable_battery_bikes", "electricalRemovableBatteryBikes"),
+)
+STAND_KINDS = (
+    ("total", "totalStands"),
+    ("main", "mainStands"),
+    ("overflow", "overflowStands"),
+)
+
+# Column name -> array typecode (NumPy dtypes are derived from it).
+COLUMNS: Dict[str, str] = {
+    "contract": "i",
+    "number": "l",
+    "latitude": "d",
+    "longitude": "d",
+    "last_update": "d",
+    "open": "b",
+    "connected": "b",
+    "banking": "b",
+    "bonus": "b",
+}
+for _kind, _ in STAND_KINDS:
+    for _name, _ in STAND_FIELDS:
+        COLUMNS[f"{_kind}_{_name}"] = "l"
+    COLUMNS[f"{_kind}_capacity"] = "l"
+
+_DTYPES = {"i": "int32", "l": "int64", "d": "float64", "b": "bool"}
+
+
+def parse_timestamp(value: str) -> float:
+    """Return an API ``lastUpdate`` string as seconds since the epoch."""
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+class StationBatch:
+    """Stations stored column by column.
+
+    ``contract`` holds an index into ``contracts``; each availability field
+    exists for the ``total``, ``main`` and ``overflow`` stands, e.g.
+    ``total_bikes`` or ``overflow_capacity``. Missing overflow stands and
+    capacities are stored as 0, ``open`` is ``status == "OPEN"`` and
+    ``last_update`` is an epoch timestamp.
+    """
+
+    __slots__ = ("contracts", "columns")
+
+    def __init__(self, contracts: List[str], columns: Dict[str, Sequence]):
+        self.contracts = contracts
+        self.columns = columns
+
+    @classmethod
+    def from_api(cls, data: Iterable[dict]) -> "StationBatch":
+        """Build a batch straight from decoded station payloads."""
+        contracts: Dict[str, int] = {}
+        lists: Dict[str, list] = {name: [] for name in COLUMNS}
+        append = {name: values.append for name, values in lists.items()}
+        empty = {"availabilities": {}, "capacity": 0}
+        stand_appends = [
+            (
+                key,
+                [
+                    (append[f"{kind}_{name}"], api_name)
+                    for name, api_name in STAND_FIELDS
+                ],
+                append[f"{kind}_capacity"],
+            )
+            for kind, key in STAND_KINDS
+        ]
+        for s in data:
+            code = contracts.setdefault(s["contractName"], len(contracts))
+            position = s["position"]
+            append["contract"](code)
+            append["number"](s["number"])
+            append["latitude"](position["latitude"])
+            append["longitude"](position["longitude"])
+            append["last_update"](parse_timestamp(s["lastUpdate"]))
+            append["open"](s["status"] == "OPEN")
+            append["connected"](bool(s["connected"]))
+            append["banking"](bool(s["banking"]))
+            append["bonus"](bool(s["bonus"]))
+            for key, fields, append_capacity in stand_appends:
+                stands = s.get(key) or empty
+                av = stands["availabilities"]
+                for append_field, api_name in fields:
+                    append_field(av.get(api_name, 0))
+                append_capacity(stands.get("capacity") or 0)
+        return cls(list(contracts), _to_columns(lists))
+
+    @classmethod
+    def from_stations(cls, stations: Iterable) -> "StationBatch":
+        """Build a batch from :class:`~.models.Station` objects."""
+        return cls.from_api(s.to_dict() for s in stations)
+
+    def __len__(self) -> int:
+        return len(self.columns["number"])
+
+    def __getitem__(self, name: str) -> Sequence:
+        return self.columns[name]
+
+    def filter(self, mask: Sequence[bool]) -> "StationBatch":
+        """Return the stations where ``mask`` is true."""
+        if np is not None:
+            mask = np.asarray(mask, dtype=bool)
+            return StationBatch(
+                self.contracts,
+                {name: col[mask] for name, col in self.columns.items()},
+            )
+        keep = [i for i, flag in enumerate(mask) if flag]
+        return StationBatch(
+            self.contracts,
+            {
+                name: array(col.typecode, [col[i] for i in keep])
+                for name, col in self.columns.items()
+            },
+        )
+
+    def contract_mask(self, contract_name: str) -> Sequence[bool]:
+        try:
+            code = self.contracts.index(contract_name)
+        except ValueError:
+            code = -1
+        codes = self.columns["contract"]
+        if np is not None:
+            return codes == code
+        return [c == code for c in codes]
+
+    def total(self, column: str) -> float:
+        values = self.columns[column]
+        if np is not None:
+            return values.sum().item()
+        return sum(values)
+
+    def mean(self, column: str) -> Optional[float]:
+        if not len(self):
+            return None
+        return self.total(column) / len(self)
+
+    def group_count(
+        self, mask: Optional[Sequence[bool]] = None
+    ) -> Dict[str, int]:
+        """Number of stations per contract, optionally where ``mask``."""
+        counts = self._group_sums(mask)
+        return {name: int(count) for name, count in counts.items()}
+
+    def group_sum(self, column: str) -> Dict[str, float]:
+        """Sum of ``column`` per contract."""
+        return self._group_sums(self.columns[column])
+
+    def group_mean(self, column: str) -> Dict[str, float]:
+        sums = self.group_sum(column)
+        counts = self.group_count()
+        return {
+            name: sums[name] / count for name, count in counts.items() if count
+        }
+
+    def group_ratio(self, mask: Sequence[bool]) -> Dict[str, float]:
+        """Share of each contract's stations where ``mask`` is true."""
+        hits = self.group_count(mask)
+        counts = self.group_count()
+        return {
+            name: hits[name] / count for name, count in counts.items() if count
+        }
+
+    def _group_sums(self, weights: Optional[Sequence]) -> Dict[str, float]:
+        codes = self.columns["contract"]
+        if np is not None:
+            sums = np.bincount(
+                codes,
+                weights=None if weights is None else np.asarray(weights),
+                minlength=len(self.contracts),
+            )
+            return dict(zip(self.contracts, sums.tolist()))
+        sums = [0] * len(self.contracts)
+        if weights is None:
+            for code in codes:
+                sums[code] += 1
+        else:
+            for code, weight in zip(codes, weights):
+                sums[code] += weight
+        return dict(zip(self.contracts, sums))
+
+
+def _to_columns(lists: Dict[str, list]) -> Dict[str, Sequence]:
+    if np is not None:
+        return {
+            name: np.array(values, dtype=_DTYPES[COLUMNS[name]])
+            for name, values in lists.items()
+        }
+    return {
+        name: array(COLUMNS[name], values) for name, values in lists.items()
+    }
@@ -0,0 +1,152 @@
+"""Opt-in snapshot cache for the JCDecaux clients."""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from .models import Contract, Station
+
+
+class _Snapshot:
+    __slots__ = ("expires", "stations")
+
+    def __init__(self, expires: float, stations: Dict[int, Station]):
+        self.expires = expires
+        self.stations = stations
+
+
+class StationCache:
+    """Latest bulk station snapshots indexed by ``(contract, number)``.
+
+    Each contract snapshot expires ``ttl`` seconds after it was stored and at
+    most ``max_contracts`` snapshots are kept, evicting the least recently
+    used one. Stations merged in later (e.g. poll deltas) only replace cached
+    ones with an older ``lastUpdate``.
+    """
+
+    def __init__(
+        self,
+        ttl: float = 60.0,
+        max_contracts: Optional[int] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.ttl = ttl
+        self.max_contracts = max_contracts
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._snapshots: "OrderedDict[str, _Snapshot]" = OrderedDict()
+        self._contracts: Optional[List[Contract]] = None
+        self._contracts_expires = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def _record(self, hit: bool) -> None:
+        if hit:
+            self.hits += 1
+        else:
+            self.misses += 1
+
+    def _fresh(self, contract_name: str) -> Optional[_Snapshot]:
+        snapshot = self._snapshots.get(contract_name)
+        if snapshot is None:
+            return None
+        if snapshot.expires <= self.clock():
+            del self._snapshots[contract_name]
+            return None
+        self._snapshots.move_to_end(contract_name)
+        return snapshot
+
+    def has_contract(self, contract_name: str) -> bool:
+        with self._lock:
+            return self._fresh(contract_name) is not None
+
+    def get_station(
+        self, contract_name: str, station_number: int
+    ) -> Optional[Station]:
+        """Return the cached station, or ``None`` on a miss."""
+        with self._lock:
+            snapshot = self._fresh(contract_name)
+            station = None
+            if snapshot is not None:
+                station = snapshot.stations.get(station_number)
+            self._record(station is not None)
+            return station
+
+    def store_stations(
+        self, stations: Iterable[Station], contract_name: Optional[str] = None
+    ) -> None:
+        """Replace the snapshots of the contracts present in ``stations``.
+
+        ``contract_name`` marks that contract as refreshed even when it has
+        no station at all.
+        """
+        grouped: Dict[str, Dict[int, Station]] = {}
+        if contract_name:
+            grouped[contract_name] = {}
+        for station in stations:
+            grouped.setdefault(station.contractName, {})[
+                station.number
+            ] = station
+        expires = self.clock() + self.ttl
+        with self._lock:
+            for name, by_number in grouped.items():
+                self._snapshots[name] = _Snapshot(expires, by_number)
+                self._snapshots.move_to_end(name)
+            self._evict()
+
+    def merge_stations(
+        self,
+        stations: Iterable[Station],
+        removed: Iterable[Tuple[str, int]] = (),
+    ) -> None:
+        """Update cached snapshots with newer versions of some stations.
+
+        ``removed`` ``(contract, number)`` keys are dropped from them.
+        """
+        with self._lock:
+            for contract_name, number in removed:
+                snapshot = self._snapshots.get(contract_name)
+                if snapshot is not None:
+                    snapshot.stations.pop(number, None)
+            for station in stations:
+                snapshot = self._snapshots.get(station.contractName)
+                if snapshot is None:
+                    continue
+                cached = snapshot.stations.get(station.number)
+                if cached is None or cached.lastUpdate <= station.lastUpdate:
+                    snapshot.stations[station.number] = station
+
+    def get_contracts(self) -> Optional[List[Contract]]:
+        with self._lock:
+            hit = (
+                self._contracts is not None
+                and self._contracts_expires > self.clock()
+            )
+            self._record(hit)
+            return self._contracts if hit else None
+
+    def store_contracts(self, contracts: List[Contract]) -> None:
+        with self._lock:
+            self._contracts = contracts
+            self._contracts_expires = self.clock() + self.ttl
+
+    def invalidate(self, contract_name: Optional[str] = None) -> None:
+        """Drop one contract snapshot, or everything when no name is given."""
+        with self._lock:
+            if contract_name is None:
+                self._snapshots.clear()
+                self._contracts = None
+            else:
+                self._snapshots.pop(contract_name, None)
+
+    def _evict(self) -> None:
+        if self.max_contracts is None:
+            return
+        while len(self._snapshots) > self.max_contracts:
+            self._snapshots.popitem(last=False)
@@ -1,124 +1,299 @@
 """Synchronous client for interacting with the JCDecaux API."""
 
 import os
-from typing import List, Optional
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
 from dotenv import load_dotenv
 
 import requests
+from requests.adapters import HTTPAdapter
 
+from .batch import StationBatch
+from .cache import StationCache
 from .constants import API_BASE_URL
-from .models import Contract, Park, Position, Stands, Station
+from .exceptions import ParksNotSupportedError
+from .fanout import ContractResult, iter_completed_threads
+from .models import Contract, Park, Station
+from .parsing import get_loads, parse_contracts, parse_parks, parse_stations
+from .polling import PollResult, StationSnapshot
+from .ratelimit import RequestPolicy
+from .streaming import JSONArrayDecoder
 
 load_dotenv()
 
+DEFAULT_POOL_SIZE = 16
+
 
 class JCDecauxClient:
-    """Convenience wrapper around the JCDecaux REST API using requests."""
-    def __init__(self, api_key: Optional[str] = None):
+    """Convenience wrapper around the JCDecaux REST API using requests.
+
+    The session keeps up to ``pool_size`` connections alive so the
+    ``*_many`` methods can run requests from a thread pool without
+    reconnecting.
+    """
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        fast_json: bool = False,
+        cache: Optional[StationCache] = None,
+        policy: Optional[RequestPolicy] = None,
+        base_url: str = API_BASE_URL,
+        pool_size: int = DEFAULT_POOL_SIZE,
+    ):
         api_key = api_key or os.environ.get("API_KEY")
         if not api_key:
             raise ValueError(
                 "API key must be provided either via argument or API_KEY env var"
             )
         self.api_key = api_key
+        self.base_url = base_url.rstrip("/")
+        self._loads = get_loads(fast_json)
+        self.cache = cache
+        self.policy = policy
         self.session = requests.Session()
         self.session.params = {"apiKey": api_key}
+        self.pool_size = 0
+        self._mount_pool(pool_size)
+        self._snapshots: Dict[Optional[str], StationSnapshot] = {}
+
+    def _mount_pool(self, size: int) -> None:
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=size)
+        for prefix in ("https://", "http://"):
+            # Release the sockets of the pool being replaced.
+            self.session.get_adapter(prefix).close()
+            self.session.mount(prefix, adapter)
+        self.pool_size = size
+
+    def _workers(self, workers: Optional[int]) -> int:
+        """Return the thread count, growing the pool to match it."""
+        workers = workers or self.pool_size
+        if workers > self.pool_size:
+            self._mount_pool(workers)
+        return workers
+
+    def _get(self, endpoint: str, url: str, **kwargs) -> requests.Response:
+        """Send a GET request, paced and retried by ``self.policy``."""
+        policy = self.policy
+        if policy is None:
+            return self.session.get(url, **kwargs)
+        attempt = 0
+        while True:
+            wait = policy.before_request(endpoint)
+            if wait:
+                time.sleep(wait)
+            try:
+                resp = self.session.get(url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                delay = policy.after_error(endpoint, attempt)
+                if delay is None:
+                    raise
+            else:
+                delay = policy.after_response(
+                    endpoint,
+                    resp.status_code,
+                    resp.headers.get("Retry-After"),
+                    attempt,
+                )
+                if delay is None:
+                    return resp
+                resp.close()
+            time.sleep(delay)
+            attempt += 1
 
     def get_contracts(self) -> List[Contract]:
-        url = f"{API_BASE_URL}/vls/v3/contracts"
-        resp = self.session.get(url)
+        if self.cache is not None:
+            contracts = self.cache.get_contracts()
+            if contracts is not None:
+                return contracts
+        url = f"{self.base_url}/vls/v3/contracts"
+        resp = self._get("contracts", url)
         resp.raise_for_status()
-        data = resp.json()
-        return [Contract(**c) for c in data]
+        contracts = parse_contracts(self._loads(resp.content))
+        if self.cache is not None:
+            self.cache.store_contracts(contracts)
+        return contracts
 
     def get_station(self, station_number: int, contract_name: str) -> Station:
-        url = f"{API_BASE_URL}/vls/v3/stations/{station_number}"
+        """Return one station.
+
+        With a cache, the station is served from the contract snapshot,
+        which is loaded in bulk through :meth:`list_stations` on a miss.
+        """
+        if self.cache is not None:
+            return self._get_cached_station(station_number, contract_name)
+        url = f"{self.base_url}/vls/v3/stations/{station_number}"
         params = {"contract": contract_name}
-        resp = self.session.get(url, params=params)
+        resp = self._get("station", url, params=params)
         if resp.status_code == 404:
             raise ValueError(
                 f"Station {station_number} not found in contract {contract_name}"
             )
         resp.raise_for_status()
-        s = resp.json()
-        return self._parse_station(s)
+        return Station.from_api(self._loads(resp.content))
+
+    def _get_cached_station(
+        self, station_number: int, contract_name: str
+    ) -> Station:
+        station = self.cache.get_station(contract_name, station_number)
+        if station is not None:
+            return station
+        if not self.cache.has_contract(contract_name):
+            for station in self.list_stations(contract_name):
+                if station.number == station_number:
+                    return station
+        raise ValueError(
+            f"Station {station_number} not found in contract {contract_name}"
+        )
 
-    def list_stations(self, contract_name: Optional[str] = None) -> List[Station]:
-        url = f"{API_BASE_URL}/vls/v3/stations"
+    def list_stations(
+        self, contract_name: Optional[str] = None, as_batch: bool = False
+    ) -> Union[List[Station], StationBatch]:
+        """Return the stations of one contract, or of all of them.
+
+        ``as_batch`` returns a columnar :class:`StationBatch` built straight
+        from the payload instead; the cache is not updated in that case.
+        """
+        url = f"{self.base_url}/vls/v3/stations"
         params = {}
         if contract_name:
             params["contract"] = contract_name
-        resp = self.session.get(url, params=params)
+        resp = self._get("stations", url, params=params)
         resp.raise_for_status()
-        data = resp.json()
-        return [self._parse_station(s) for s in data]
+        data = self._loads(resp.content)
+        if as_batch:
+            return StationBatch.from_api(data)
+        stations = parse_stations(data)
+        if self.cache is not None:
+            self.cache.store_stations(stations, contract_name)
+        return stations
+
+    def iter_stations(
+        self, contract_name: Optional[str] = None, chunk_size: int = 65536
+    ) -> Iterator[Station]:
+        """Yield stations one at a time while the response is downloaded.
+
+        Unlike :meth:`list_stations` the body is never held in memory as a
+        whole, which keeps memory flat for the all-contracts feed.
+        """
+        url = f"{self.base_url}/vls/v3/stations"
+        params = {}
+        if contract_name:
+            params["contract"] = contract_name
+        with self._get("stations", url, params=params, stream=True) as resp:
+            resp.raise_for_status()
+            decoder = JSONArrayDecoder()
+            for chunk in resp.iter_content(chunk_size):
+                for data in decoder.feed(chunk):
+                    yield Station.from_api(data)
+            for data in decoder.close():
+                yield Station.from_api(data)
+
+    def poll_stations(
+        self, contract_name: Optional[str] = None
+    ) -> PollResult:
+        """Fetch stations conditionally and return only those that changed.
+
+        ETag/Last-Modified validators and station fingerprints are kept per
+        ``contract_name`` so successive calls only report deltas.
+        """
+        url = f"{self.base_url}/vls/v3/stations"
+        params = {}
+        if contract_name:
+            params["contract"] = contract_name
+        snapshot = self._snapshots.setdefault(contract_name, StationSnapshot())
+        resp = self._get(
+            "stations", url, params=params, headers=snapshot.request_headers()
+        )
+        if resp.status_code != 304:
+            resp.raise_for_status()
+        result = snapshot.update(
+            resp.status_code,
+            resp.headers,
+            resp.content,
+            Station.from_api,
+            self._loads,
+        )
+        if self.cache is not None:
+            self.cache.merge_stations(result.changed, result.removed)
+        return result
 
     def list_parks(self, contract_name: str) -> List[Park]:
-        url = f"{API_BASE_URL}/parking/v1/contracts/{contract_name}/parks"
-        resp = self.session.get(url)
+        url = f"{self.base_url}/parking/v1/contracts/{contract_name}/parks"
+        resp = self._get("parks", url)
         if resp.status_code == 400:
-            raise ValueError(
-                f"Contract {contract_name} not found or does not support parks API"
-            )
+            raise ParksNotSupportedError(contract_name)
         resp.raise_for_status()
-        data = resp.json()
-        return [self._parse_park(p) for p in data]
+        return parse_parks(self._loads(resp.content))
+
+    def list_stations_many(
+        self, contracts: Iterable[str], workers: Optional[int] = None
+    ) -> Iterator[ContractResult[List[Station]]]:
+        """Fetch several contracts' stations from a thread pool.
+
+        Results are yielded as each contract completes; errors are reported
+        per contract without stopping the others. ``workers`` defaults to
+        the connection pool size.
+        """
+        return iter_completed_threads(
+            self.list_stations, contracts, self._workers(workers)
+        )
+
+    def list_parks_many(
+        self, contracts: Iterable[str], workers: Optional[int] = None
+    ) -> Iterator[ContractResult[List[Park]]]:
+        """Fetch several contracts' parks from a thread pool.
+
+        Behaves like :meth:`list_stations_many`.
+        """
+        return iter_completed_threads(
+            self.list_parks, contracts, self._workers(workers)
+        )
+
+    def get_stations(
+        self,
+        lookups: Iterable[Tuple[int, str]],
+        workers: Optional[int] = None,
+    ) -> Dict[Tuple[str, int], Station]:
+        """Look up several ``(station_number, contract_name)`` pairs at once.
+
+        Returns the stations keyed by ``(contract, number)``; stations that
+        do not exist are left out. With a cache, each contract missing from
+        it is loaded once in bulk before the lookups run.
+        """
+        lookups = list(lookups)
+        workers = self._workers(workers)
+        if self.cache is not None:
+            missing = {
+                contract
+                for _, contract in lookups
+                if not self.cache.has_contract(contract)
+            }
+            for result in iter_completed_threads(
+                self.list_stations, missing, workers
+            ):
+                if result.error is not None:
+                    raise result.error
+
+        def fetch(lookup: Tuple[int, str]) -> Optional[Station]:
+            try:
+                return self.get_station(*lookup)
+            except ValueError:
+                return None
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            stations = list(executor.map(fetch, lookups))
+        return {(s.contractName, s.number): s for s in stations if s}
 
     def get_park(self, contract_name: str, park_number: int) -> Park:
-        url = f"{API_BASE_URL}/parking/v1/contracts/{contract_name}/parks/{park_number}"
-        resp = self.session.get(url)
+        url = (
+            f"{self.base_url}/parking/v1/contracts/{contract_name}"
+            f"/parks/{park_number}"
+        )
+        resp = self._get("park", url)
         if resp.status_code == 404:
             raise ValueError(
                 f"Park {park_number} not found in contract {contract_name}"
             )
         resp.raise_for_status()
-        return self._parse_park(resp.json())
-
-    def _parse_station(self, data: dict) -> Station:
-        pos = Position(**data["position"])
-
-        def make_stands(obj):
-            av = obj["availabilities"]
-            return Stands(**av, capacity=obj.get("capacity"))
-
-        total = make_stands(data["totalStands"])
-        main = make_stands(data["mainStands"])
-        overflow = None
-        if data.get("overflowStands"):
-            overflow = make_stands(data["overflowStands"])
-        return Station(
-            number=data["number"],
-            contractName=data["contractName"],
-            name=data["name"],
-            address=data["address"],
-            position=pos,
-            banking=data["banking"],
-            bonus=data["bonus"],
-            status=data["status"],
-            lastUpdate=data["lastUpdate"],
-            connected=data["connected"],
-            overflow=data["overflow"],
-            totalStands=total,
-            mainStands=main,
-            overflowStands=overflow,
-        )
-
-    def _parse_park(self, data: dict) -> Park:
-        pos = Position(**data["position"])
-        return Park(
-            contractName=data["contractName"],
-            name=data["name"],
-            number=data["number"],
-            status=data["status"],
-            position=pos,
-            accessType=data["accessType"],
-            lockerType=data["lockerType"],
-            hasSurveillance=data["hasSurveillance"],
-            isFree=data["isFree"],
-            address=data["address"],
-            zipCode=data["zipCode"],
-            city=data["city"],
-            isOffStreet=data["isOffStreet"],
-            hasElectricSupport=data["hasElectricSupport"],
-            hasPhysicalReception=data["hasPhysicalReception"],
-        )
+        return Park.from_api(self._loads(resp.content))
@@ -0,0 +1,15 @@
+"""Errors raised by the JCDecaux clients."""
+
+
+class ParksNotSupportedError(ValueError):
+    """The parks API answered 400 for a contract.
+
+    JCDecaux returns 400 both for unknown contracts and for contracts
+    without parks, so callers can remember these and stop asking.
+    """
+
+    def __init__(self, contract: str):
+        self.contract = contract
+        super().__init__(
+            f"Contract {contract} not found or does not support parks API"
+        )
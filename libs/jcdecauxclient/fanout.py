@@ -0,0 +1,88 @@
+"""Per-contract fan-out helpers shared by the JCDecaux clients."""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from typing import (
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Generic,
+    Iterable,
+    Iterator,
+    Optional,
+    TypeVar,
+)
+
+T = TypeVar("T")
+
+
+@dataclass(slots=True)
+class ContractResult(Generic[T]):
+    """Result of one contract in a multi-contract call.
+
+    Exactly one of ``value`` and ``error`` is set.
+    """
+
+    contract: str
+    value: Optional[T] = None
+    error: Optional[Exception] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+async def iter_completed(
+    fetch: Callable[[str], Awaitable[T]],
+    contracts: Iterable[str],
+    max_concurrency: int,
+) -> AsyncIterator[ContractResult[T]]:
+    """Run ``fetch`` for each contract and yield results as they complete.
+
+    At most ``max_concurrency`` calls are in flight. A failing contract is
+    reported through ``ContractResult.error`` and does not cancel the
+    others; leaving the loop early cancels whatever is still pending.
+    """
+    if max_concurrency < 1:
+        raise ValueError("max_concurrency must be at least 1")
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def run(contract: str) -> ContractResult[T]:
+        async with semaphore:
+            try:
+                return ContractResult(contract, value=await fetch(contract))
+            except Exception as exc:
+                return ContractResult(contract, error=exc)
+
+    tasks = [asyncio.ensure_future(run(c)) for c in contracts]
+    try:
+        for future in asyncio.as_completed(tasks):
+            yield await future
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+def iter_completed_threads(
+    fetch: Callable[[str], T],
+    contracts: Iterable[str],
+    workers: int,
+) -> Iterator[ContractResult[T]]:
+    """Thread-pool counterpart of :func:`iter_completed`."""
+    if workers < 1:
+        raise ValueError("workers must be at least 1")
+
+    def run(contract: str) -> ContractResult[T]:
+        try:
+            return ContractResult(contract, value=fetch(contract))
+        except Exception as exc:
+            return ContractResult(contract, error=exc)
+
+    executor = ThreadPoolExecutor(max_workers=workers)
+    try:
+        futures = [executor.submit(run, c) for c in contracts]
+        for future in as_completed(futures):
+            yield future.result()
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
@@ -1,16 +1,28 @@
-"""Data models used by the JCDecaux API clients."""
+"""Data models used by the JCDecaux API clients.
+
+Models are slotted dataclasses so that full network snapshots stay compact
+in memory. ``from_api`` builds an instance straight from a decoded API
+payload and ``to_dict`` returns the same payload shape.
+"""
 
 from dataclasses import dataclass, field
 from typing import List, Optional
 
 
-@dataclass
+@dataclass(slots=True)
 class Position:
     latitude: float
     longitude: float
 
+    @classmethod
+    def from_api(cls, data: dict) -> "Position":
+        return cls(data["latitude"], data["longitude"])
+
+    def to_dict(self) -> dict:
+        return {"latitude": self.latitude, "longitude": self.longitude}
+
 
-@dataclass
+@dataclass(slots=True)
 class Stands:
     bikes: int
     stands: int
@@ -20,8 +32,38 @@ class Stands:
     electricalRemovableBatteryBikes: int
     capacity: Optional[int] = None
 
+    @classmethod
+    def from_api(cls, data: dict) -> "Stands":
+        av = data["availabilities"]
+        return cls(
+            av["bikes"],
+            av["stands"],
+            av["mechanicalBikes"],
+            av["electricalBikes"],
+            av["electricalInternalBatteryBikes"],
+            av["electricalRemovableBatteryBikes"],
+            data.get("capacity"),
+        )
 
-@dataclass
+    def to_dict(self) -> dict:
+        return {
+            "availabilities": {
+                "bikes": self.bikes,
+                "stands": self.stands,
+                "mechanicalBikes": self.mechanicalBikes,
+                "electricalBikes": self.electricalBikes,
+                "electricalInternalBatteryBikes": (
+                    self.electricalInternalBatteryBikes
+                ),
+                "electricalRemovableBatteryBikes": (
+                    self.electricalRemovableBatteryBikes
+                ),
+            },
+            "capacity": self.capacity,
+        }
+
+
+@dataclass(slots=True)
 class Station:
     number: int
     contractName: str
@@ -38,16 +80,72 @@ class Station:
     mainStands: Stands
     overflowStands: Optional[Stands]
 
+    @classmethod
+    def from_api(cls, data: dict) -> "Station":
+        overflow = data.get("overflowStands")
+        return cls(
+            data["number"],
+            data["contractName"],
+            data["name"],
+            data["address"],
+            Position.from_api(data["position"]),
+            data["banking"],
+            data["bonus"],
+            data["status"],
+            data["lastUpdate"],
+            data["connected"],
+            data["overflow"],
+            Stands.from_api(data["totalStands"]),
+            Stands.from_api(data["mainStands"]),
+            Stands.from_api(overflow) if overflow else None,
+        )
+
+    def to_dict(self) -> dict:
+        overflow = self.overflowStands
+        return {
+            "number": self.number,
+            "contractName": self.contractName,
+            "name": self.name,
+            "address": self.address,
+            "position": self.position.to_dict(),
+            "banking": self.banking,
+            "bonus": self.bonus,
+            "status": self.status,
+            "lastUpdate": self.lastUpdate,
+            "connected": self.connected,
+            "overflow": self.overflow,
+            "totalStands": self.totalStands.to_dict(),
+            "mainStands": self.mainStands.to_dict(),
+            "overflowStands": overflow.to_dict() if overflow else None,
+        }
 
-@dataclass
+
+@dataclass(slots=True)
 class Contract:
     name: str
     commercial_name: str
     country_code: str
     cities: List[str] = field(default_factory=list)
 
+    @classmethod
+    def from_api(cls, data: dict) -> "Contract":
+        return cls(
+            data["name"],
+            data["commercial_name"],
+            data["country_code"],
+            data.get("cities") or [],
+        )
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "commercial_name": self.commercial_name,
+            "country_code": self.country_code,
+            "cities": list(self.cities),
+        }
+
 
-@dataclass
+@dataclass(slots=True)
 class Park:
     contractName: str
     name: str
@@ -64,3 +162,42 @@ class Park:
     isOffStreet: bool
     hasElectricSupport: bool
     hasPhysicalReception: bool
+
+    @classmethod
+    def from_api(cls, data: dict) -> "Park":
+        return cls(
+            data["contractName"],
+            data["name"],
+            data["number"],
+            data["status"],
+            Position.from_api(data["position"]),
+            data["accessType"],
+            data["lockerType"],
+            data["hasSurveillance"],
+            data["isFree"],
+            data["address"],
+            data["zipCode"],
+            data["city"],
+            data["isOffStreet"],
+            data["hasElectricSupport"],
+            data["hasPhysicalReception"],
+        )
+
+    def to_dict(self) -> dict:
+        return {
+            "contractName": self.contractName,
+            "name": self.name,
+            "number": self.number,
+            "status": self.status,
+            "position": self.position.to_dict(),
+            "accessType": self.accessType,
+            "lockerType": self.lockerType,
+            "hasSurveillance": self.hasSurveillance,
+            "isFree": self.isFree,
+            "address": self.address,
+            "zipCode": self.zipCode,
+            "city": self.city,
+            "isOffStreet": self.isOffStreet,
+            "hasElectricSupport": self.hasElectricSupport,
+            "hasPhysicalReception": self.hasPhysicalReception,
+        }
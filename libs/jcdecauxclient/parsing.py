@@ -0,0 +1,51 @@
+"""Payload decoding and parsing shared by the JCDecaux clients."""
+
+import json
+from typing import Any, Callable, Iterable, List
+
+from .models import Contract, Park, Station
+
+try:  # pragma: no cover - depends on the environment
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None
+
+Loads = Callable[[bytes], Any]
+Dumps = Callable[[Any], bytes]
+
+
+def get_loads(fast: bool = False) -> Loads:
+    """Return the JSON decoder to use for response bodies.
+
+    ``fast`` selects ``orjson`` when it is installed and silently falls back
+    to the standard library otherwise.
+    """
+    if fast and orjson is not None:
+        return orjson.loads
+    return json.loads
+
+
+def _json_dumps(data: Any) -> bytes:
+    return json.dumps(data, separators=(",", ":")).encode()
+
+
+def get_dumps(fast: bool = False) -> Dumps:
+    """Return a compact JSON encoder producing ``bytes``.
+
+    Counterpart of :func:`get_loads`, used to pre-serialize responses.
+    """
+    if fast and orjson is not None:
+        return orjson.dumps
+    return _json_dumps
+
+
+def parse_contracts(data: Iterable[dict]) -> List[Contract]:
+    return list(map(Contract.from_api, data))
+
+
+def parse_stations(data: Iterable[dict]) -> List[Station]:
+    return list(map(Station.from_api, data))
+
+
+def parse_parks(data: Iterable[dict]) -> List[Park]:
+    return list(map(Park.from_api, data))
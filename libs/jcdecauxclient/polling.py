@@ -0,0 +1,120 @@
+"""Conditional polling helpers shared by the JCDecaux clients."""
+
+import hashlib
+import json
+from dataclasses import dataclass, field
+from importlib.util import find_spec
+from operator import itemgetter
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple
+
+from .models import Station
+
+StationKey = Tuple[str, int]
+
+_availabilities = itemgetter(
+    "bikes",
+    "stands",
+    "mechanicalBikes",
+    "electricalBikes",
+    "electricalInternalBatteryBikes",
+    "electricalRemovableBatteryBikes",
+)
+
+
+def _accept_encoding() -> str:
+    """Return the encodings both HTTP stacks can decode here."""
+    encodings = ["gzip", "deflate"]
+    if find_spec("brotli") or find_spec("brotlicffi"):
+        encodings.insert(0, "br")
+    return ", ".join(encodings)
+
+
+ACCEPT_ENCODING = _accept_encoding()
+
+
+def fingerprint(data: dict) -> tuple:
+    """Return the parts of a raw station payload that signal a change."""
+    overflow = data.get("overflowStands")
+    return (
+        data["lastUpdate"],
+        _availabilities(data["totalStands"]["availabilities"]),
+        _availabilities(data["mainStands"]["availabilities"]),
+        _availabilities(overflow["availabilities"]) if overflow else None,
+    )
+
+
+@dataclass
+class PollResult:
+    """Outcome of a ``poll_stations`` call.
+
+    ``modified`` is ``False`` when the server answered 304 or returned a
+    payload identical to the previous one; ``changed`` then stays empty.
+    """
+
+    modified: bool
+    changed: List[Station] = field(default_factory=list)
+    removed: List[StationKey] = field(default_factory=list)
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+
+
+class StationSnapshot:
+    """Validators and per-station fingerprints of the previous poll."""
+
+    def __init__(self) -> None:
+        self.etag: Optional[str] = None
+        self.last_modified: Optional[str] = None
+        self.digest: Optional[bytes] = None
+        self.fingerprints: Dict[StationKey, tuple] = {}
+
+    def request_headers(self) -> Dict[str, str]:
+        headers = {"Accept-Encoding": ACCEPT_ENCODING}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+    def _unchanged(self) -> PollResult:
+        return PollResult(
+            modified=False, etag=self.etag, last_modified=self.last_modified
+        )
+
+    def update(
+        self,
+        status_code: int,
+        headers: Mapping[str, str],
+        content: bytes,
+        parse: Callable[[dict], Station],
+        loads: Callable[[bytes], Any] = json.loads,
+    ) -> PollResult:
+        """Diff a response against the snapshot and store the new state.
+
+        Only stations whose fingerprint differs are passed to ``parse``.
+        """
+        if status_code == 304:
+            return self._unchanged()
+        self.etag = headers.get("ETag")
+        self.last_modified = headers.get("Last-Modified")
+        digest = hashlib.blake2b(content, digest_size=16).digest()
+        if digest == self.digest:
+            return self._unchanged()
+
+        previous = self.fingerprints
+        current: Dict[StationKey, tuple] = {}
+        changed = []
+        for data in loads(content):
+            key = (data["contractName"], data["number"])
+            fp = current[key] = fingerprint(data)
+            if previous.get(key) != fp:
+                changed.append(parse(data))
+        removed = [key for key in previous if key not in current]
+        self.digest = digest
+        self.fingerprints = current
+        return PollResult(
+            modified=True,
+            changed=changed,
+            removed=removed,
+            etag=self.etag,
+            last_modified=self.last_modified,
+        )
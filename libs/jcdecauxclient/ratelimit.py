@@ -0,0 +1,248 @@
+"""Request pacing, retries and circuit breaking for the JCDecaux clients.
+
+The pieces are independent of the HTTP stack: they return how long to wait
+and the clients do the actual sleeping, with ``time.sleep`` or
+``asyncio.sleep``.
+"""
+
+import random
+import threading
+import time
+from datetime import timezone
+from email.utils import parsedate_to_datetime
+from typing import Callable, Dict, FrozenSet, Optional
+
+Clock = Callable[[], float]
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling an endpoint whose circuit is open."""
+
+    def __init__(self, endpoint: str, retry_in: float):
+        super().__init__(
+            f"Circuit for {endpoint!r} is open, retry in {retry_in:.1f}s"
+        )
+        self.endpoint = endpoint
+        self.retry_in = retry_in
+
+
+class TokenBucket:
+    """Token bucket whose refill rate adapts to throttling (AIMD).
+
+    ``rate`` tokens per second are added up to ``burst``. Each throttled
+    response halves the rate (not below ``min_rate``) and each successful
+    one adds back ``max_rate / 20``, so the steady state hovers just under
+    the quota the server actually enforces.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        burst: Optional[float] = None,
+        min_rate: Optional[float] = None,
+        clock: Clock = time.monotonic,
+    ):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.max_rate = rate
+        self.rate = rate
+        self.min_rate = min_rate if min_rate is not None else rate / 16
+        self.burst = burst if burst is not None else max(rate, 1.0)
+        self.clock = clock
+        self._tokens = self.burst
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Take one token and return how long to wait before using it."""
+        with self._lock:
+            now = self.clock()
+            self._tokens = min(
+                self.burst, self._tokens + (now - self._updated) * self.rate
+            )
+            self._updated = now
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def throttled(self) -> None:
+        with self._lock:
+            self.rate = max(self.min_rate, self.rate / 2)
+
+    def succeeded(self) -> None:
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.max_rate / 20)
+
+
+class CircuitBreaker:
+    """Stop calling an endpoint after ``failure_threshold`` failures.
+
+    Once open, calls are refused for ``reset_timeout`` seconds. The circuit
+    then half-opens: a single call is let through as a probe and closes the
+    circuit if it succeeds or reopens it if it fails, while concurrent
+    calls keep being refused. A probe that never reports back is replaced
+    after another ``reset_timeout``.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        clock: Clock = time.monotonic,
+    ):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.probe_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self) -> bool:
+        return self.opened_at is not None
+
+    @property
+    def is_half_open(self) -> bool:
+        return self.probe_at is not None
+
+    def check(self, endpoint: str) -> None:
+        """Raise unless a call may go through, admitting at most one probe."""
+        with self._lock:
+            if self.opened_at is None:
+                return
+            now = self.clock()
+            since = self.opened_at if self.probe_at is None else self.probe_at
+            retry_in = since + self.reset_timeout - now
+            if retry_in > 0:
+                raise CircuitOpenError(endpoint, retry_in)
+            self.probe_at = now
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self.probe_at = None
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self.opened_at is not None or (
+                self.failures >= self.failure_threshold
+            ):
+                self.opened_at = self.clock()
+                self.probe_at = None
+
+
+def parse_retry_after(
+    value: Optional[str], now: Optional[float] = None
+) -> Optional[float]:
+    """Return the delay in seconds requested by a Retry-After header."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    now = now if now is not None else time.time()
+    return max(0.0, when.timestamp() - now)
+
+
+class RequestPolicy:
+    """Shared pacing, retry and circuit-breaking rules for one client.
+
+    ``limiter`` paces every request of the client. Responses with a status
+    in ``retry_statuses`` and transport errors are retried up to
+    ``max_retries`` times with full-jitter exponential backoff, never
+    sooner than the server's Retry-After. Failures are tracked per
+    endpoint by a :class:`CircuitBreaker`.
+    """
+
+    THROTTLED = 429
+
+    def __init__(
+        self,
+        limiter: Optional[TokenBucket] = None,
+        max_retries: int = 3,
+        backoff_base: float = 0.5,
+        backoff_cap: float = 30.0,
+        retry_statuses: FrozenSet[int] = frozenset({429, 500, 502, 503, 504}),
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        clock: Clock = time.monotonic,
+    ):
+        self.limiter = limiter
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.retry_statuses = retry_statuses
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def breaker(self, endpoint: str) -> CircuitBreaker:
+        with self._lock:
+            breaker = self.breakers.get(endpoint)
+            if breaker is None:
+                breaker = self.breakers[endpoint] = CircuitBreaker(
+                    self.failure_threshold, self.reset_timeout, self.clock
+                )
+            return breaker
+
+    def backoff(
+        self, attempt: int, retry_after: Optional[str] = None
+    ) -> float:
+        """Return the delay before retry number ``attempt`` (from 0)."""
+        ceiling = min(self.backoff_cap, self.backoff_base * 2**attempt)
+        delay = random.uniform(0, ceiling)
+        requested = parse_retry_after(retry_after)
+        if requested is not None:
+            delay = max(delay, requested)
+        return delay
+
+    def before_request(self, endpoint: str) -> float:
+        """Check the circuit and return how long to wait before sending."""
+        self.breaker(endpoint).check(endpoint)
+        return self.limiter.reserve() if self.limiter else 0.0
+
+    def after_response(
+        self,
+        endpoint: str,
+        status_code: int,
+        retry_after: Optional[str],
+        attempt: int,
+    ) -> Optional[float]:
+        """Record a response; return a retry delay or ``None`` to accept it."""
+        breaker = self.breaker(endpoint)
+        if status_code == self.THROTTLED:
+            if self.limiter:
+                self.limiter.throttled()
+        elif status_code >= 500:
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+            if self.limiter:
+                self.limiter.succeeded()
+        if status_code not in self.retry_statuses:
+            return None
+        if attempt >= self.max_retries or breaker.is_open:
+            return None
+        return self.backoff(attempt, retry_after)
+
+    def after_error(self, endpoint: str, attempt: int) -> Optional[float]:
+        """Record a transport error; return a retry delay or ``None``."""
+        breaker = self.breaker(endpoint)
+        breaker.record_failure()
+        if attempt >= self.max_retries or breaker.is_open:
+            return None
+        return self.backoff(attempt)
+
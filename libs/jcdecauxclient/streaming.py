@@ -0,0 +1,75 @@
+"""Incremental decoding of large JSON array responses."""
+
+import codecs
+import json
+from typing import Any, Iterator, List
+
+_WHITESPACE = " \t\n\r"
+
+
+class JSONArrayDecoder:
+    """Decode the items of a top-level JSON array as bytes arrive.
+
+    Feed raw body chunks with ``feed`` and iterate over the returned items;
+    only the current, not yet complete, item is kept in memory.
+    """
+
+    def __init__(self) -> None:
+        self._text = codecs.getincrementaldecoder("utf-8")()
+        self._decoder = json.JSONDecoder()
+        self._buffer = ""
+        self._started = False
+        self._expect_item = True
+        self._done = False
+
+    def feed(self, chunk: bytes) -> List[Any]:
+        """Add ``chunk`` to the buffer and return the items it completed."""
+        self._buffer += self._text.decode(chunk)
+        return list(self._drain(final=False))
+
+    def close(self) -> List[Any]:
+        """Flush the buffer and check that the array was terminated."""
+        self._buffer += self._text.decode(b"", final=True)
+        items = list(self._drain(final=True))
+        if not self._done:
+            raise ValueError("Truncated JSON array in response body")
+        return items
+
+    def _drain(self, final: bool) -> Iterator[Any]:
+        buf = self._buffer
+        pos = 0
+        end = len(buf)
+        while not self._done:
+            while pos < end and buf[pos] in _WHITESPACE:
+                pos += 1
+            if pos == end:
+                break
+            char = buf[pos]
+            if not self._started:
+                if char != "[":
+                    raise ValueError("Expected a JSON array in response body")
+                self._started = True
+                pos += 1
+            elif char == "]":
+                self._done = True
+                pos += 1
+            elif not self._expect_item:
+                if char != ",":
+                    raise ValueError(f"Unexpected {char!r} in JSON array")
+                self._expect_item = True
+                pos += 1
+            else:
+                try:
+                    item, stop = self._decoder.raw_decode(buf, pos)
+                except json.JSONDecodeError:
+                    if final:
+                        raise
+                    break
+                if stop == end and not final:
+                    # A trailing number may still be missing digits.
+                    break
+                pos = stop
+                self._expect_item = False
+                yield item
+        self._buffer = buf[pos:]
+
@@ -0,0 +1,63 @@
+"""Helpers building raw JCDecaux API payloads for tests."""
+
+from app.models import Station
+from libs.jcdecauxclient import Station as ApiStation
+
+
+def stands_payload(bikes=1, stands=1, electrical=0, capacity=None):
+    return {
+        "availabilities": {
+            "bikes": bikes,
+            "stands": stands,
+            "mechanicalBikes": bikes - electrical,
+            "electricalBikes": electrical,
+            "electricalInternalBatteryBikes": electrical,
+            "electricalRemovableBatteryBikes": 0,
+        },
+        "capacity": capacity if capacity is not None else bikes + stands,
+    }
+
+
+def station_payload(
+    number=1,
+    contract="test",
+    bikes=1,
+    stands=1,
+    electrical=0,
+    status="OPEN",
+    last_update="2023-01-01T00:00:00Z",
+    latitude=1.0,
+    longitude=2.0,
+):
+    return {
+        "number": number,
+        "contractName": contract,
+        "name": f"Station {number}",
+        "address": "Somewhere",
+        "position": {"latitude": latitude, "longitude": longitude},
+        "banking": True,
+        "bonus": False,
+        "status": status,
+        "lastUpdate": last_update,
+        "connected": True,
+        "overflow": False,
+        "totalStands": stands_payload(bikes, stands, electrical),
+        "mainStands": stands_payload(bikes, stands, electrical),
+        "overflowStands": None,
+    }
+
+
+def api_stations(count, contract="test", **kwargs):
+    """``count`` parsed stations numbered from 0."""
+    return [
+        ApiStation.from_api(station_payload(n, contract, **kwargs))
+        for n in range(count)
+    ]
+
+
+def station_id(key):
+    """Database id of the stored station with public ``key``."""
+    contract, number = Station.parse_key(key)
+    return Station.objects.values_list("id", flat=True).get(
+        contract_id=contract, number=number
+    )
@@ -0,0 +1,107 @@
+from datetime import datetime, timedelta, timezone
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from app.admin import ApproximatePaginator
+from app.ingest import upsert_stations
+from app.models import StandSnapshot, Station
+from libs.jcdecauxclient import Station as ApiStation
+
+from .factories import station_id, station_payload
+
+T0 = datetime(2023, 1, 1, tzinfo=timezone.utc)
+
+
+def stations(count, contract="test"):
+    return [
+        ApiStation.from_api(station_payload(n, contract)) for n in range(count)
+    ]
+
+
+class AdminTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        upsert_stations(stations(30) + stations(5, "other"))
+        ids = [station_id(f"test-{n}") for n in range(30)]
+        StandSnapshot.objects.bulk_create(
+            StandSnapshot(
+                station_id=ids[n % 30],
+                ts=T0 + timedelta(minutes=n + 1),
+                bikes=1,
+                electrical_bikes=0,
+                stands=1,
+            )
+            for n in range(500)
+        )
+        cls.user = get_user_model().objects.create_superuser(
+            "admin", "admin@example.com", "password"
+        )
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def changelist(self, model, **params):
+        url = f"/admin/app/{model}/"
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return response, [q["sql"] for q in queries]
+
+    def test_changelists_do_not_query_per_row(self):
+        for model in ("station", "park", "contract", "standsnapshot"):
+            _, queries = self.changelist(model)
+            self.assertLess(len(queries), 12, model)
+
+    def test_history_is_not_counted(self):
+        response, queries = self.changelist("standsnapshot")
+        self.assertEqual(response.context["cl"].result_count, 535)
+        table = StandSnapshot._meta.db_table
+        counts = [q for q in queries if "COUNT(" in q and table in q]
+        self.assertEqual(counts, [])
+
+    def test_filtered_counts_are_capped(self):
+        paginator = ApproximatePaginator(
+            StandSnapshot.objects.filter(bikes=1).order_by("pk"), 100
+        )
+        paginator.CAP = 50
+        self.assertEqual(paginator.count, 51)
+
+    def test_contract_filter_and_indexed_search(self):
+        response, _ = self.changelist("station", contract="other")
+        self.assertEqual(response.context["cl"].result_count, 5)
+
+        response, _ = self.changelist(
+            "station", contract="test", q='"station 1"'
+        )
+        self.assertEqual(response.context["cl"].result_count, 11)
+        response, _ = self.changelist("station", q="station 1")
+        plan = response.context["cl"].queryset.explain()
+        self.assertIn("station_name_lower_idx", plan)
+        self.assertIn("station_address_lower_idx", plan)
+
+        response, _ = self.changelist("station", contract="test", q="SOME")
+        self.assertEqual(response.context["cl"].result_count, 30)
+        response, _ = self.changelist("station", q="where")
+        self.assertEqual(response.context["cl"].result_count, 0)
+
+    def test_natural_key_search(self):
+        response, _ = self.changelist("station", q="test-3")
+        self.assertEqual(
+            [s.number for s in response.context["cl"].result_list], [3]
+        )
+        response, _ = self.changelist("standsnapshot", q="test-3")
+        # 17 of the 500 rows plus the snapshot written by the upsert.
+        self.assertEqual(response.context["cl"].result_count, 18)
+        response, _ = self.changelist("standsnapshot", q="Station 3")
+        self.assertEqual(response.context["cl"].result_count, 0)
+
+    def test_station_change_page_shows_availability_inline(self):
+        station = Station.objects.get(contract_id="test", number=0)
+        response = self.client.get(
+            f"/admin/app/station/{station.pk}/change/"
+        )
+        self.assertContains(response, "total")
+        self.assertContains(response, "overflow")
@@ -0,0 +1,100 @@
+import tempfile
+
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from app import views
+from app.feed import FeedStore, publish_contracts, upsert_and_publish
+from app.ingest import upsert_stations
+
+from .factories import api_stations
+
+
+class FeedApiTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        settings = override_settings(API_FEED_DIR=tmp.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        views.store = FeedStore()
+        upsert_stations(api_stations(3, bikes=2))
+        publish_contracts(["test"])
+
+    def test_contract_stations(self):
+        response = self.client.get("/api/contracts/test/stations")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "application/json")
+        self.assertEqual(response["Cache-Control"], "public, max-age=30")
+        data = response.json()
+        self.assertEqual([s["number"] for s in data], [0, 1, 2])
+        expected = api_stations(3, bikes=2)[1].to_dict()
+        self.assertEqual(data[1], expected)
+
+    def test_station_detail_and_not_modified(self):
+        response = self.client.get("/api/stations/test-2")
+        self.assertEqual(response.json()["number"], 2)
+        etag = response["ETag"]
+        self.assertTrue(etag.startswith('"'))
+
+        with CaptureQueriesContext(connection) as queries:
+            cached = self.client.get(
+                "/api/stations/test-2", headers={"if-none-match": etag}
+            )
+            self.client.get("/api/contracts/test/stations")
+        self.assertEqual(cached.status_code, 304)
+        self.assertEqual(cached["ETag"], etag)
+        self.assertEqual(len(queries), 0)
+
+    def test_weak_etags_match(self):
+        etag = self.client.get("/api/stations/test-2")["ETag"]
+        response = self.client.get(
+            "/api/stations/test-2",
+            headers={"if-none-match": f'W/"other", W/{etag}'},
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def test_unknown_contracts_are_not_queried_again(self):
+        self.assertEqual(
+            self.client.get("/api/contracts/missing/stations").status_code,
+            404,
+        )
+        with self.assertNumQueries(0):
+            response = self.client.get("/api/contracts/missing/stations")
+        self.assertEqual(response.status_code, 404)
+        # Forgotten once a feed is published.
+        upsert_stations(api_stations(1, contract="missing"))
+        publish_contracts(["test"])
+        response = self.client.get("/api/contracts/missing/stations")
+        self.assertEqual(len(response.json()), 1)
+
+    def test_republished_after_ingestion(self):
+        before = self.client.get("/api/contracts/test/stations")["ETag"]
+        upsert_and_publish(api_stations(1, bikes=5))
+
+        response = self.client.get(
+            "/api/contracts/test/stations", headers={"if-none-match": before}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], before)
+        self.assertEqual(
+            response.json()[0]["totalStands"]["availabilities"]["bikes"], 5
+        )
+
+    def test_not_found(self):
+        for url in (
+            "/api/contracts/missing/stations",
+            "/api/stations/test-99",
+            "/api/stations/test",
+        ):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 404, url)
+        response = self.client.post("/api/stations/test-1")
+        self.assertEqual(response.status_code, 405)
+
+    def test_missing_feed_is_built_on_first_request(self):
+        upsert_stations(api_stations(2, contract="other"))
+        response = self.client.get("/api/contracts/other/stations")
+        self.assertEqual(len(response.json()), 2)
@@ -0,0 +1,124 @@
+import tempfile
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from unittest.mock import patch
+
+from django.test import TestCase
+
+from app.archive import Archive, DayArchive, archive_history, seal_day
+from app.ingest import upsert_stations
+from app.models import StandSnapshot
+from libs.jcdecauxclient import Station as ApiStation
+
+from .factories import station_id, station_payload
+
+T0 = datetime(2023, 1, 1, tzinfo=timezone.utc)
+
+
+def write_poll(ts, count=3, **kwargs):
+    last_update = ts.isoformat(timespec="milliseconds").replace("+00:00", "Z")
+    upsert_stations(
+        [
+            ApiStation.from_api(
+                station_payload(n, last_update=last_update, **kwargs)
+            )
+            for n in range(count)
+        ]
+    )
+
+
+class ArchiveTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.directory = Path(tmp.name)
+        for minute in range(0, 600, 10):
+            write_poll(
+                T0 + timedelta(minutes=minute, milliseconds=250),
+                bikes=minute % 7 + 2,
+                electrical=minute % 3,
+            )
+        write_poll(T0 + timedelta(days=1, hours=2), bikes=9)
+
+    def expected(self, key, start, end):
+        return list(
+            StandSnapshot.objects.filter(
+                station_id=station_id(key), ts__gte=start, ts__lt=end
+            )
+            .order_by("ts")
+            .values_list("ts", "bikes", "electrical_bikes", "stands")
+        )
+
+    def test_sealed_day_round_trips(self):
+        self.assertEqual(seal_day(T0, self.directory), 180)
+        start, end = T0 + timedelta(hours=2), T0 + timedelta(hours=3)
+        expected = self.expected("test-1", start, end)
+
+        with DayArchive(self.directory / "2023-01-01.vta") as archive:
+            self.assertEqual(archive.stations, ["test-0", "test-1", "test-2"])
+            series = archive.series("test-1", start, end)
+            self.assertEqual(len(archive.series("test-1")), 60)
+            self.assertEqual(len(archive.series("missing")), 0)
+
+        self.assertEqual(len(series), 6)
+        self.assertEqual(
+            list(
+                zip(
+                    series.ts,
+                    series.bikes,
+                    series.electrical_bikes,
+                    series.stands,
+                )
+            ),
+            expected,
+        )
+
+    def test_archive_history_moves_old_days_out_of_the_database(self):
+        expected = self.expected("test-2", T0, T0 + timedelta(days=2))
+
+        days = dict(
+            archive_history(T0 + timedelta(days=1, hours=5), self.directory)
+        )
+
+        self.assertEqual(days, {T0: 180})
+        self.assertEqual(StandSnapshot.objects.count(), 3)
+        archive = Archive(self.directory)
+        self.assertEqual(archive.days(), [T0])
+        series = archive.series("test-2", T0, T0 + timedelta(days=2))
+        self.assertEqual(series.ts, [row[0] for row in expected[:-1]])
+
+        # Sealing again merges new rows instead of replacing the file.
+        StandSnapshot.objects.create(
+            station_id=station_id("test-0"),
+            ts=T0 + timedelta(hours=23),
+            bikes=1,
+            electrical_bikes=0,
+            stands=1,
+        )
+        self.assertEqual(seal_day(T0, self.directory), 181)
+        with DayArchive(self.directory / "2023-01-01.vta") as day:
+            self.assertEqual(day.series("test-0").bikes[-1], 1)
+
+    def test_archive_reuses_opened_days(self):
+        seal_day(T0, self.directory)
+        seal_day(T0 + timedelta(days=1), self.directory)
+        archive = Archive(self.directory, max_open=1)
+        end = T0 + timedelta(days=2)
+
+        with patch("app.archive.DayArchive", wraps=DayArchive) as opened:
+            archive.series("test-1", T0, T0 + timedelta(days=1))
+            archive.series("test-1", T0, T0 + timedelta(days=1))
+            self.assertEqual(opened.call_count, 1)
+            self.assertEqual(len(archive.series("test-1", T0, end)), 61)
+            self.assertEqual(opened.call_count, 2)
+
+            StandSnapshot.objects.create(
+                station_id=station_id("test-1"),
+                ts=T0 + timedelta(days=1, hours=3),
+                bikes=4,
+                electrical_bikes=0,
+                stands=1,
+            )
+            seal_day(T0 + timedelta(days=1), self.directory)
+            series = archive.series("test-1", T0 + timedelta(days=1), end)
+        self.assertEqual(series.bikes, [9, 4])
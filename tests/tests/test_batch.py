@@ -0,0 +1,62 @@
+from django.test import TestCase
+from unittest.mock import patch
+import responses
+
+from libs.jcdecauxclient import API_BASE_URL, JCDecauxClient, StationBatch
+from libs.jcdecauxclient.models import Station
+
+from .factories import station_payload
+
+PAYLOAD = [
+    station_payload(1, "a", bikes=0, stands=10),
+    station_payload(2, "a", bikes=4, stands=6, electrical=1),
+    station_payload(1, "b", bikes=5, stands=0, electrical=5),
+    station_payload(2, "b", bikes=3, stands=3, status="CLOSED"),
+]
+
+
+class StationBatchTests(TestCase):
+    def check_aggregates(self):
+        batch = StationBatch.from_api(PAYLOAD)
+
+        self.assertEqual(len(batch), 4)
+        self.assertEqual(batch.contracts, ["a", "b"])
+        self.assertEqual(batch.total("total_bikes"), 12)
+        self.assertEqual(batch.group_sum("total_bikes"), {"a": 4, "b": 8})
+        self.assertEqual(
+            batch.group_sum("total_electrical_bikes"), {"a": 1, "b": 5}
+        )
+        self.assertEqual(batch.group_mean("total_bikes"), {"a": 2, "b": 4})
+        empty = [bikes == 0 for bikes in batch["total_bikes"]]
+        self.assertEqual(batch.group_ratio(empty), {"a": 0.5, "b": 0.0})
+        self.assertEqual(
+            batch.group_count(batch["open"]), {"a": 2, "b": 1}
+        )
+
+        only_b = batch.filter(batch.contract_mask("b"))
+        self.assertEqual(list(only_b["number"]), [1, 2])
+        self.assertEqual(list(only_b["overflow_capacity"]), [0, 0])
+        self.assertEqual(only_b["last_update"][0], 1672531200.0)
+
+    def test_aggregates(self):
+        self.check_aggregates()
+
+    def test_aggregates_without_numpy(self):
+        with patch("libs.jcdecauxclient.batch.np", None):
+            self.check_aggregates()
+
+    def test_from_stations(self):
+        stations = [Station.from_api(p) for p in PAYLOAD]
+        batch = StationBatch.from_stations(stations)
+        self.assertEqual(batch.group_sum("main_bikes"), {"a": 4, "b": 8})
+
+    @responses.activate
+    def test_list_stations_as_batch(self):
+        url = f"{API_BASE_URL}/vls/v3/stations"
+        responses.add(responses.GET, url, json=PAYLOAD)
+
+        client = JCDecauxClient(api_key="dummy")
+        batch = client.list_stations(as_batch=True)
+
+        self.assertIsInstance(batch, StationBatch)
+        self.assertEqual(batch.group_count(), {"a": 2, "b": 2})
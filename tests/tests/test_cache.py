@@ -0,0 +1,92 @@
+from django.test import TestCase
+import responses
+
+from libs.jcdecauxclient import (
+    API_BASE_URL,
+    JCDecauxClient,
+    Station,
+    StationCache,
+)
+
+from .factories import station_payload
+
+URL = f"{API_BASE_URL}/vls/v3/stations"
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def station(number, contract="test", **kwargs):
+    return Station.from_api(station_payload(number, contract, **kwargs))
+
+
+class StationCacheTests(TestCase):
+    def test_ttl_expiry(self):
+        clock = FakeClock()
+        cache = StationCache(ttl=10, clock=clock)
+        cache.store_stations([station(1)])
+
+        self.assertEqual(cache.get_station("test", 1).number, 1)
+        clock.now = 10
+        self.assertIsNone(cache.get_station("test", 1))
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+    def test_lru_eviction_across_contracts(self):
+        cache = StationCache(max_contracts=2)
+        cache.store_stations([station(1, "a"), station(1, "b")])
+        cache.get_station("a", 1)
+        cache.store_stations([station(1, "c")])
+
+        self.assertTrue(cache.has_contract("a"))
+        self.assertFalse(cache.has_contract("b"))
+        self.assertTrue(cache.has_contract("c"))
+
+    def test_merge_keeps_the_newest_station(self):
+        cache = StationCache()
+        cache.store_stations(
+            [station(1, bikes=5, last_update="2024-01-01T00:00:02Z")]
+        )
+        cache.merge_stations(
+            [station(1, bikes=0, last_update="2024-01-01T00:00:01Z")]
+        )
+        self.assertEqual(cache.get_station("test", 1).totalStands.bikes, 5)
+
+        cache.merge_stations(
+            [station(1, bikes=2, last_update="2024-01-01T00:00:03Z")]
+        )
+        self.assertEqual(cache.get_station("test", 1).totalStands.bikes, 2)
+
+
+class CachedClientTests(TestCase):
+    @responses.activate
+    def test_get_station_uses_one_bulk_request(self):
+        data = [station_payload(n) for n in range(1, 4)]
+        responses.add(responses.GET, URL, json=data)
+
+        cache = StationCache()
+        client = JCDecauxClient(api_key="dummy", cache=cache)
+        numbers = [client.get_station(n, "test").number for n in (1, 2, 3)]
+        with self.assertRaises(ValueError):
+            client.get_station(99, "test")
+
+        self.assertEqual(numbers, [1, 2, 3])
+        self.assertEqual(len(responses.calls), 1)
+        self.assertEqual(cache.hits, 2)
+
+    @responses.activate
+    def test_get_contracts_is_cached(self):
+        url = f"{API_BASE_URL}/vls/v3/contracts"
+        data = [{"name": "test", "commercial_name": "T", "country_code": "FR"}]
+        responses.add(responses.GET, url, json=data)
+
+        client = JCDecauxClient(api_key="dummy", cache=StationCache())
+        client.get_contracts()
+        contracts = client.get_contracts()
+
+        self.assertEqual(contracts[0].name, "test")
+        self.assertEqual(len(responses.calls), 1)
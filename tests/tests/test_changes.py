@@ -0,0 +1,88 @@
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
+
+from app.changes import ChangeDetector
+from app.ingest import upsert_stations
+from app.poller import Poller
+from libs.jcdecauxclient import PollResult
+from libs.jcdecauxclient import Station as ApiStation
+
+from .factories import api_stations, station_payload
+
+
+class ChangeDetectorTests(SimpleTestCase):
+    def test_only_changed_stations_are_selected(self):
+        detector = ChangeDetector()
+        changes = detector.select(api_stations(3))
+        self.assertEqual(len(changes.changed), 3)
+        detector.commit(changes)
+
+        stations = api_stations(3, last_update="2023-01-01T00:05:00Z")
+        stations[1] = ApiStation.from_api(station_payload(1, bikes=5))
+        changes = detector.select(stations)
+
+        self.assertEqual([s.number for s in changes.changed], [1])
+        self.assertEqual(changes.skipped, 2)
+        self.assertAlmostEqual(changes.skip_ratio, 2 / 3)
+
+    def test_uncommitted_changes_are_selected_again(self):
+        detector = ChangeDetector()
+        detector.select(api_stations(2))
+        self.assertEqual(len(detector.select(api_stations(2)).changed), 2)
+
+
+class WarmDetectorTests(TestCase):
+    def test_warmed_fingerprints_match_written_stations(self):
+        upsert_stations(api_stations(4, bikes=2, electrical=1))
+        detector = ChangeDetector()
+        self.assertEqual(detector.warm(), 4)
+
+        changes = detector.select(api_stations(4, bikes=2, electrical=1))
+        self.assertEqual(changes.skipped, 4)
+
+    def test_upsert_skips_unchanged_stations(self):
+        detector = ChangeDetector()
+        upsert_stations(api_stations(5), detector=detector)
+        stations = api_stations(5)
+        stations[0] = ApiStation.from_api(station_payload(0, status="CLOSED"))
+
+        with CaptureQueriesContext(connection) as queries:
+            result = upsert_stations(stations, detector=detector)
+        self.assertEqual((result.stations, result.skipped), (1, 4))
+        self.assertEqual(result.skip_ratio, 0.8)
+        self.assertLess(len(queries), 10)
+
+        with CaptureQueriesContext(connection) as queries:
+            result = upsert_stations(stations, detector=detector)
+        self.assertEqual((result.batches, result.skipped), (0, 5))
+        self.assertEqual(len(queries), 0)
+
+
+class StubClient:
+    def __init__(self, stations):
+        self.stations = stations
+
+    async def poll_stations(self, contract):
+        return PollResult(modified=True, changed=self.stations)
+
+
+class PollerSkipTests(SimpleTestCase):
+    async def test_poller_reports_skip_ratio(self):
+        written = []
+
+        async def write(stations):
+            written.extend(stations)
+
+        detector = ChangeDetector()
+        client = StubClient(api_stations(4))
+        poller = Poller(client, ["test"], write=write, detector=detector)
+        schedule = poller.schedules["test"]
+        await poller.poll(schedule)
+        client.stations = api_stations(4, last_update="2023-01-02T00:00:00Z")
+        await poller.poll(schedule)
+
+        self.assertEqual(len(written), 4)
+        metrics = poller.metrics()["test"]
+        self.assertEqual((metrics["skipped"], metrics["skip_ratio"]), (4, 1))
+        self.assertEqual(metrics["changed"], 4)
@@ -0,0 +1,42 @@
+from django.test import SimpleTestCase
+
+from benchmarks.fake_server import FakeJCDecauxServer
+from libs.jcdecauxclient import JCDecauxClient, RequestPolicy
+
+
+class FakeServerTests(SimpleTestCase):
+    def test_endpoints_and_churn(self):
+        with FakeJCDecauxServer(stations=40, contracts=4, tick=None) as server:
+            client = JCDecauxClient(api_key="dummy", base_url=server.url)
+
+            self.assertEqual(len(client.get_contracts()), 4)
+            self.assertEqual(len(client.list_stations()), 40)
+            self.assertEqual(client.get_station(5, "contract1").number, 5)
+            self.assertEqual(len(client.list_parks("contract0")), 5)
+            with self.assertRaises(ValueError):
+                client.list_parks("contract1")
+
+            self.assertEqual(len(client.poll_stations().changed), 40)
+            self.assertFalse(client.poll_stations().modified)
+            changed = server.network.tick()
+            self.assertEqual(len(client.poll_stations().changed), changed)
+
+    def test_injected_throttling_is_retried(self):
+        server = FakeJCDecauxServer(
+            stations=10,
+            contracts=1,
+            tick=None,
+            throttle_ratio=0.5,
+            retry_after=0,
+        )
+        with server:
+            client = JCDecauxClient(
+                api_key="dummy",
+                base_url=server.url,
+                policy=RequestPolicy(max_retries=20, backoff_cap=0),
+            )
+            for _ in range(5):
+                client.get_contracts()
+
+        self.assertGreater(server.throttled, 0)
+        self.assertEqual(server.requests, 5 + server.throttled)
@@ -0,0 +1,59 @@
+import asyncio
+
+from django.test import TestCase
+import httpx
+
+from libs.jcdecauxclient import JCDecauxClientAsync
+
+from .factories import station_payload
+
+
+def make_client(handler):
+    client = JCDecauxClientAsync(api_key="dummy")
+    client.client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return client
+
+
+class FanOutTests(TestCase):
+    async def test_errors_are_reported_per_contract(self):
+        def handler(request):
+            contract = request.url.params["contract"]
+            if contract == "broken":
+                return httpx.Response(500)
+            return httpx.Response(200, json=[station_payload(1, contract)])
+
+        client = make_client(handler)
+        results = {
+            r.contract: r
+            async for r in client.list_stations_many(["a", "broken", "b"])
+        }
+        await client.close()
+
+        self.assertEqual(set(results), {"a", "broken", "b"})
+        self.assertTrue(results["a"].ok)
+        self.assertEqual(results["b"].value[0].contractName, "b")
+        self.assertIsInstance(results["broken"].error, httpx.HTTPStatusError)
+
+    async def test_concurrency_is_bounded(self):
+        in_flight = peak = 0
+
+        async def handler(request):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            return httpx.Response(200, json=[])
+
+        client = make_client(handler)
+        contracts = [f"c{i}" for i in range(10)]
+        results = [
+            r
+            async for r in client.list_parks_many(
+                contracts, max_concurrency=3
+            )
+        ]
+        await client.close()
+
+        self.assertEqual(len(results), 10)
+        self.assertEqual(peak, 3)
@@ -0,0 +1,148 @@
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
+
+from django.test import TestCase
+
+from app.forecast import Forecaster, week_position
+from app.ingest import upsert_stations
+from app.models import HourlyRollup, StationForecast
+from libs.jcdecauxclient import Station
+
+from .factories import station_id, station_payload
+
+# A Monday; the profile comes from the Monday before.
+NOW = datetime(2023, 1, 9, 8, tzinfo=timezone.utc)
+
+
+def station(number, bikes, stands=14):
+    return Station.from_api(
+        station_payload(
+            number,
+            bikes=bikes,
+            stands=stands,
+            last_update="2023-01-09T08:00:00Z",
+        )
+    )
+
+
+def rollup(key, hour, bikes):
+    return HourlyRollup(
+        station_id=station_id(key),
+        bucket=NOW - timedelta(days=7) + timedelta(hours=hour - 8),
+        samples=2,
+        seconds=3600,
+        bikes_min=bikes,
+        bikes_max=bikes,
+        bikes_sum=bikes * 3600,
+        electrical_bikes_min=0,
+        electrical_bikes_max=0,
+        electrical_bikes_sum=0,
+        stands_min=0,
+        stands_max=0,
+        stands_sum=0,
+    )
+
+
+class ForecasterTests(TestCase):
+    def setUp(self):
+        upsert_stations([station(0, 6), station(1, 3), station(2, 9, 0)])
+        HourlyRollup.objects.bulk_create(
+            [
+                rollup("test-0", 7, 2),
+                rollup("test-0", 8, 10),
+                rollup("test-0", 9, 10),
+                rollup("test-2", 7, 0),
+                rollup("test-2", 8, 0),
+                rollup("test-2", 9, 40),
+            ]
+        )
+
+    def forecasts(self):
+        return {
+            row[0]: row[1:]
+            for row in StationForecast.objects.values_list(
+                "station__number", "bikes_15", "bikes_30", "bikes_60"
+            )
+        }
+
+    def check_forecasts(self):
+        forecaster = Forecaster(clock=lambda: NOW)
+        self.assertEqual(forecaster.update(), 3)
+        self.assertEqual(
+            self.forecasts(),
+            {
+                # usual 6 now, rising to 10: no deviation to fade.
+                0: (8, 10, 10),
+                # no history: persistence.
+                1: (3, 3, 3),
+                # 9 bikes above a usual 0, fading; capped at capacity.
+                2: (7, 5, 9),
+            },
+        )
+        self.assertEqual(forecaster.update(), 0)
+        forecaster.clock = lambda: NOW + timedelta(hours=1, minutes=10)
+        self.assertEqual(forecaster.update([station(1, 0)]), 3)
+        self.assertEqual(self.forecasts()[1], (0, 0, 0))
+
+    def test_week_position(self):
+        self.assertEqual(week_position(NOW), 8.0)
+        self.assertEqual(week_position(NOW - timedelta(hours=9)), 167.0)
+
+    def test_forecasts(self):
+        self.check_forecasts()
+
+    def test_forecasts_without_numpy(self):
+        with patch("app.forecast.np", None):
+            self.check_forecasts()
+
+    def test_hours_leave_the_window(self):
+        forecaster = Forecaster(weeks=1, clock=lambda: NOW)
+        forecaster.update()
+        row = forecaster.index[station_id("test-0")]
+        # Monday 08:00 a week ago.
+        self.assertEqual(forecaster._sums[row][8], 10 * 3600)
+        forecaster.clock = lambda: NOW + timedelta(hours=1)
+        forecaster.update()
+        # Replaced by this Monday's 08:00.
+        self.assertEqual(forecaster._counts[row][8], 3600)
+        self.assertEqual(forecaster._sums[row][8], 6 * 3600)
+
+    def test_quiet_hours_hold_the_current_count(self):
+        forecaster = Forecaster(clock=lambda: NOW + timedelta(hours=3))
+        forecaster.update()
+        row = forecaster.index[station_id("test-1")]
+        for slot in (9, 10):
+            self.assertEqual(forecaster._counts[row][slot], 3600)
+            self.assertEqual(forecaster._sums[row][slot], 3 * 3600)
+
+    def test_after_write(self):
+        forecaster = Forecaster(clock=lambda: NOW)
+        written = []
+        write = forecaster.after(lambda stations: written.extend(stations))
+        write([station(0, 6)])
+        self.assertEqual(len(written), 1)
+        self.assertEqual(StationForecast.objects.count(), 3)
+
+        with patch.object(forecaster, "store", side_effect=RuntimeError):
+            with self.assertLogs("app.forecast", "ERROR"):
+                write([station(0, 7)])
+        self.assertEqual(len(written), 2)
+
+    def test_api(self):
+        Forecaster(clock=lambda: NOW).update()
+        response = self.client.get("/api/stations/test-0/forecast")
+        self.assertEqual(
+            response.json(),
+            {
+                "station": "test-0",
+                "changedAt": "2023-01-09T08:00:00Z",
+                "bikes": {"15": 8, "30": 10, "60": 10},
+            },
+        )
+        data = self.client.get("/api/contracts/test/forecast").json()
+        self.assertEqual(
+            [f["station"] for f in data], ["test-0", "test-1", "test-2"]
+        )
+        self.assertEqual(
+            self.client.get("/api/stations/test-9/forecast").status_code, 404
+        )
@@ -0,0 +1,345 @@
+import json
+import warnings
+from datetime import datetime, timedelta, timezone
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+
+from app.history import (
+    bucket_start,
+    contract_series,
+    prune_history,
+    rebuild_rollups,
+    rollup_for,
+    station_series,
+)
+from app.ingest import upsert_stations
+from app.models import (
+    ContractFiveMinuteRollup,
+    ContractHourlyRollup,
+    FiveMinuteRollup,
+    HourlyRollup,
+    StandSnapshot,
+)
+from libs.jcdecauxclient import Station as ApiStation
+
+from .factories import station_id, station_payload
+
+T0 = datetime(2023, 1, 1, tzinfo=timezone.utc)
+
+
+def poll(minutes, count=2, **kwargs):
+    ts = T0 + timedelta(minutes=minutes)
+    return [
+        ApiStation.from_api(
+            station_payload(
+                n, last_update=ts.isoformat().replace("+00:00", "Z"), **kwargs
+            )
+        )
+        for n in range(count)
+    ]
+
+
+def write_polls():
+    upsert_stations(poll(0, bikes=2, electrical=1))
+    upsert_stations(poll(1, bikes=6, electrical=3))
+    upsert_stations(poll(7, bikes=4, electrical=0))
+
+
+class BucketTests(TestCase):
+    def test_bucket_start(self):
+        ts = datetime(2023, 1, 1, 10, 7, 31, tzinfo=timezone.utc)
+        self.assertEqual(bucket_start(ts, 300), ts.replace(minute=5, second=0))
+        self.assertEqual(
+            bucket_start(ts, 3600), ts.replace(minute=0, second=0)
+        )
+
+
+class RecordHistoryTests(TestCase):
+    def test_snapshots_and_rollups_follow_writes(self):
+        write_polls()
+
+        self.assertEqual(StandSnapshot.objects.count(), 6)
+        first = FiveMinuteRollup.objects.get(
+            station_id=station_id("test-0"), bucket=T0
+        )
+        self.assertEqual(first.samples, 2)
+        self.assertEqual((first.bikes_min, first.bikes_max), (2, 6))
+        self.assertEqual(first.seconds, 300)
+        self.assertEqual(first.bikes_mean, 5.2)
+        self.assertEqual(first.electrical_bikes_mean, 2.6)
+        self.assertEqual(FiveMinuteRollup.objects.count(), 4)
+        hour = HourlyRollup.objects.get(
+            station_id=station_id("test-1"), bucket=T0
+        )
+        self.assertEqual((hour.samples, hour.seconds), (3, 3600))
+        self.assertAlmostEqual(hour.bikes_mean, 15000 / 3600)
+        self.assertEqual((hour.bikes_min, hour.bikes_max), (2, 6))
+        self.assertEqual(
+            (hour.electrical_bikes_min, hour.electrical_bikes_max), (0, 3)
+        )
+
+    def test_replayed_poll_is_not_recorded_twice(self):
+        upsert_stations(poll(0))
+        upsert_stations(poll(0))
+        self.assertEqual(StandSnapshot.objects.count(), 2)
+        self.assertEqual(
+            HourlyRollup.objects.get(station_id=station_id("test-0")).samples,
+            1,
+        )
+
+    def test_series_read_rollups_only(self):
+        write_polls()
+        pk = station_id("test-0")
+        for seconds, model in ((300, FiveMinuteRollup), (86400, HourlyRollup)):
+            with CaptureQueriesContext(connection) as queries:
+                rows = list(
+                    station_series(pk, T0, T0 + timedelta(days=1), seconds)
+                )
+            self.assertEqual(rows[0][0], T0)
+            sql = " ".join(q["sql"] for q in queries)
+            self.assertIn(model._meta.db_table, sql)
+            self.assertNotIn(StandSnapshot._meta.db_table, sql)
+
+    def test_prune_history(self):
+        write_polls()
+        result = prune_history(
+            raw_days=1, five_minute_days=1, now=T0 + timedelta(days=1, hours=1)
+        )
+        self.assertEqual((result.snapshots, result.five_minute), (6, 4))
+        self.assertEqual(StandSnapshot.objects.count(), 0)
+        self.assertEqual(HourlyRollup.objects.count(), 2)
+
+
+class SeriesTests(TestCase):
+    def setUp(self):
+        write_polls()
+        self.end = T0 + timedelta(hours=1)
+
+    def test_rollup_for(self):
+        self.assertIs(rollup_for(900), FiveMinuteRollup)
+        self.assertIs(rollup_for(86400), HourlyRollup)
+        with self.assertRaises(ValueError):
+            rollup_for(450)
+
+    def test_station_series_merges_rollup_buckets(self):
+        pk = station_id("test-0")
+        bucket, values = next(station_series(pk, T0, self.end, 900))
+        self.assertEqual(bucket, T0)
+        self.assertEqual((values.samples, values.seconds), (3, 900))
+        self.assertEqual(
+            values.values, [[2, 6, 4200], [0, 3, 1140], [1, 1, 900]]
+        )
+        paged = list(station_series(pk, T0, self.end, 300, 1))
+        self.assertEqual([b.minute for b, _ in paged], [*range(0, 60, 5)])
+
+    def test_station_series_carries_values_forward(self):
+        pk = station_id("test-0")
+        series = list(station_series(pk, T0, self.end, 900))
+        self.assertEqual(
+            [bucket.minute for bucket, _ in series], [0, 15, 30, 45]
+        )
+        for _, values in series[1:]:
+            self.assertEqual((values.samples, values.seconds), (0, 900))
+            self.assertEqual(
+                values.values, [[4, 4, 3600], [0, 0, 0], [1, 1, 900]]
+            )
+
+    def test_hourly_means_are_weighted_by_time(self):
+        [(_, values)] = station_series(
+            station_id("test-0"), T0, self.end, 3600
+        )
+        self.assertEqual(values.seconds, 3600)
+        # 2 bikes for a minute, 6 for six, then 4 until the end of the hour.
+        self.assertEqual(values.values[0][2], 2 * 60 + 6 * 360 + 4 * 3180)
+
+    def test_contract_series(self):
+        five = list(contract_series("test", T0, self.end, 300, page_size=1))
+        self.assertEqual(
+            five[:3],
+            [
+                (T0, 2, [10.4, 5.2, 2.0]),
+                (T0 + timedelta(minutes=5), 2, [9.6, 2.4, 2.0]),
+                # Current totals since the last report.
+                (T0 + timedelta(minutes=10), 2, [8, 0, 2]),
+            ],
+        )
+        self.assertEqual(len(five), 12)
+        (_, stations, totals), *_ = contract_series("test", T0, self.end, 600)
+        self.assertEqual(stations, 2)
+        for total, expected in zip(totals, [10.0, 3.8, 2.0]):
+            self.assertAlmostEqual(total, expected)
+        [(_, _, hourly)] = contract_series("test", T0, self.end, 3600)
+        self.assertAlmostEqual(hourly[1], 2 * 1140 / 3600)
+
+
+class QuietStationTests(TestCase):
+    def setUp(self):
+        upsert_stations(poll(8 * 60, bikes=10))
+        upsert_stations(poll(8 * 60 + 70, count=1, bikes=4))
+        self.eight = T0 + timedelta(hours=8)
+
+    def test_contract_buckets_count_quiet_stations(self):
+        hours = [self.eight + timedelta(hours=h) for h in range(3)]
+        self.assertEqual(
+            list(contract_series("test", hours[0], hours[-1], 3600)),
+            [(hours[0], 2, [20.0, 0.0, 2.0]), (hours[1], 2, [15.0, 0.0, 2.0])],
+        )
+        [(_, stations, totals)] = contract_series(
+            "test", hours[2], hours[2] + timedelta(hours=1), 3600
+        )
+        self.assertEqual((stations, totals), (2, [14, 0, 2]))
+        five = {
+            bucket.minute: totals[0]
+            for bucket, _, totals in contract_series(
+                "test", hours[1], hours[1] + timedelta(minutes=15), 300
+            )
+        }
+        self.assertEqual(five, {0: 20.0, 5: 20.0, 10: 14.0})
+
+    def test_rebuild_counts_quiet_stations(self):
+        def rows():
+            return {
+                model: sorted(
+                    (bucket, stations, round(bikes, 6))
+                    for bucket, stations, bikes in model.objects.values_list(
+                        "bucket", "stations", "bikes"
+                    )
+                )
+                for model in (ContractFiveMinuteRollup, ContractHourlyRollup)
+            }
+
+        expected = rows()
+        ContractFiveMinuteRollup.objects.all().delete()
+        ContractHourlyRollup.objects.all().delete()
+        list(rebuild_rollups(T0, T0 + timedelta(days=1), workers=1))
+        self.assertEqual(rows(), expected)
+
+
+class HistoryApiTests(TestCase):
+    def setUp(self):
+        write_polls()
+
+    async def get(self, path, **params):
+        response = await self.async_client.get(path, params)
+        if not response.streaming:
+            return response, response.json()
+        body = b"".join([chunk async for chunk in response.streaming_content])
+        return response, json.loads(body)
+
+    async def test_station_history(self):
+        response, data = await self.get(
+            "/api/stations/test-0/history",
+            start="2023-01-01T00:00:00Z",
+            end="2023-01-01T01:00:00Z",
+            bucket=900,
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(data["bucket"], 900)
+        self.assertIsNone(data["next"])
+        self.assertEqual(len(data["results"]), 4)
+        item = data["results"][0]
+        self.assertEqual(item["bucket"], "2023-01-01T00:00:00Z")
+        self.assertEqual(item["samples"], 3)
+        self.assertEqual(
+            item["electricalBikes"], {"min": 0, "max": 3, "mean": 1.27}
+        )
+
+    async def test_contract_history_is_paginated(self):
+        params = {"start": "2023-01-01T00:00:00", "bucket": 300, "limit": 1}
+        params["end"] = "2023-01-01T01:00:00"
+        _, page = await self.get("/api/contracts/test/history", **params)
+        self.assertEqual(
+            page["results"],
+            [
+                {
+                    "bucket": "2023-01-01T00:00:00Z",
+                    "stations": 2,
+                    "bikes": 10.4,
+                    "electricalBikes": 5.2,
+                    "stands": 2.0,
+                }
+            ],
+        )
+        self.assertIn("start=2023-01-01T00%3A05%3A00Z", page["next"])
+        _, page = await self.get(page["next"])
+        self.assertEqual(page["results"][0]["electricalBikes"], 2.4)
+        self.assertIn("start=2023-01-01T00%3A10%3A00Z", page["next"])
+
+    def test_streams_under_wsgi(self):
+        response = self.client.get(
+            "/api/stations/test-0/history",
+            {"start": "2023-01-01T00:00:00Z", "end": "2023-01-01T01:00:00Z"},
+        )
+        self.assertTrue(response.streaming)
+        self.assertFalse(response.is_async)
+        with warnings.catch_warnings():
+            warnings.simplefilter("error")
+            data = json.loads(b"".join(response.streaming_content))
+        self.assertEqual(data["results"][0]["samples"], 3)
+
+    async def test_invalid_and_unknown(self):
+        for path, params in (
+            ("/api/contracts/test/history", {"bucket": 450}),
+            ("/api/contracts/test/history", {"start": "yesterday"}),
+            ("/api/stations/test-0/history", {"limit": 0}),
+        ):
+            response, _ = await self.get(path, **params)
+            self.assertEqual(response.status_code, 400, params)
+        response, _ = await self.get("/api/stations/test-9/history")
+        self.assertEqual(response.status_code, 404)
+
+
+class RebuildRollupsTests(TransactionTestCase):
+    def test_parallel_rebuild_matches_incremental_rollups(self):
+        write_polls()
+        upsert_stations(poll(60 * 24 + 5, bikes=1))
+
+        def state():
+            rollups = {
+                model: sorted(
+                    model.objects.values_list(
+                        "station_id",
+                        "bucket",
+                        "samples",
+                        "seconds",
+                        "bikes_sum",
+                    )
+                )
+                for model in (FiveMinuteRollup, HourlyRollup)
+            }
+            for model in (ContractFiveMinuteRollup, ContractHourlyRollup):
+                rollups[model] = sorted(
+                    (bucket, stations, round(ebikes, 6))
+                    for bucket, stations, ebikes in model.objects.values_list(
+                        "bucket", "stations", "electrical_bikes"
+                    )
+                )
+            return rollups
+
+        expected = state()
+        self.assertEqual(
+            expected[ContractHourlyRollup][0],
+            (T0, 2, round(2 * 1140 / 3600, 6)),
+        )
+        FiveMinuteRollup.objects.all().delete()
+        HourlyRollup.objects.all().delete()
+        ContractHourlyRollup.objects.all().delete()
+
+        days = dict(rebuild_rollups(T0, T0 + timedelta(days=2), workers=2))
+
+        # The first day is filled up to the next day's snapshots.
+        self.assertEqual(days, {T0: 624, T0 + timedelta(days=1): 6})
+        self.assertEqual(state(), expected)
+
+    def test_command(self):
+        write_polls()
+        out = StringIO()
+        call_command(
+            "backfill_rollups", "--since", "2023-01-01", "--workers", "1",
+            stdout=out,
+        )
+        self.assertIn("Rebuilt 6 rollups over 1 days", out.getvalue())
@@ -0,0 +1,78 @@
+import tempfile
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from app.ingest import upsert_stations
+from app.models import Contract, Station, StationAvailability
+from libs.jcdecauxclient import Contract as ApiContract
+
+from .factories import api_stations
+
+
+class UpsertStationsTests(TestCase):
+    def test_inserts_stations_and_one_availability_row_each(self):
+        result = upsert_stations(api_stations(5))
+
+        self.assertEqual(result.stations, 5)
+        self.assertEqual(Station.objects.count(), 5)
+        self.assertEqual(StationAvailability.objects.count(), 5)
+        self.assertTrue(Contract.objects.filter(name="test").exists())
+        station = Station.objects.get(contract_id="test", number=3)
+        self.assertEqual(station.number, 3)
+        self.assertEqual(
+            station.availability.values("overflow"),
+            (0, 0, 0, 0, 0, 0, None),
+        )
+
+    def test_updates_existing_rows(self):
+        upsert_stations(api_stations(3, bikes=1))
+        upsert_stations(api_stations(3, bikes=4, status="CLOSED"))
+
+        self.assertEqual(Station.objects.count(), 3)
+        self.assertEqual(
+            set(Station.objects.values_list("status", flat=True)),
+            {"CLOSED"},
+        )
+        availability = StationAvailability.objects.get(
+            station__contract_id="test", station__number=1
+        )
+        self.assertEqual(availability.total_bikes, 4)
+
+    def test_writes_are_batched(self):
+        with CaptureQueriesContext(connection) as queries:
+            upsert_stations(api_stations(300))
+
+        # One row at a time would take at least 2 statements per station;
+        # batches here are split by SQLite's 999 parameter limit, history
+        # included.
+        self.assertLess(len(queries), 50)
+
+
+class SyncStationsCommandTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        settings = override_settings(API_FEED_DIR=tmp.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def test_command(self):
+        contract = ApiContract("test", "T", "FR")
+        with patch(
+            "app.management.commands.sync_stations.JCDecauxClient"
+        ) as client_class:
+            client = client_class.return_value
+            client.get_contracts.return_value = [contract]
+            client.iter_stations.return_value = iter(api_stations(4))
+            out = StringIO()
+            call_command("sync_stations", "--batch-size", "3", stdout=out)
+
+        self.assertIn(
+            "Synced 4 stations in 2 batches", out.getvalue()
+        )
+        self.assertEqual(Contract.objects.get().country_code, "FR")
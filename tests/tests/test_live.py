@@ -0,0 +1,99 @@
+import asyncio
+import tempfile
+
+from django.test import SimpleTestCase, override_settings
+
+from app.feed import FeedStore, write_feed
+from app.live import RESYNC, LiveHub, Subscription
+
+from .factories import station_payload
+
+
+class LiveHubTests(SimpleTestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.directory = tmp.name
+        self.hub = LiveHub(FeedStore(self.directory), poll_every=60)
+        self.write(bikes={})
+        self.assertEqual(self.hub.check(), [])
+
+    def write(self, bikes):
+        write_feed(
+            "test",
+            [
+                station_payload(
+                    number, bikes=bikes.get(number, 1), latitude=number
+                )
+                for number in range(3)
+            ],
+            self.directory,
+        )
+
+    async def test_contract_subscribers_get_changed_stations_only(self):
+        others = self.hub.subscribe(Subscription({"other"}))
+        subscription = self.hub.subscribe(Subscription({"test"}))
+        self.write(bikes={1: 5})
+        for delta in self.hub.check():
+            self.hub.publish(delta)
+
+        event = subscription.queue.get_nowait()
+        self.assertTrue(event.startswith(b"event: stations\ndata: [{"))
+        self.assertEqual(event.count(b'"number":'), 1)
+        self.assertIn(b'"number":1,', event)
+        self.assertTrue(others.queue.empty())
+        self.assertEqual(self.hub.check(), [])
+
+    async def test_bbox_subscribers_get_stations_inside(self):
+        subscription = self.hub.subscribe(
+            Subscription(bbox=(1.0, 1.5, 3.0, 3.0))
+        )
+        self.write(bikes={0: 3, 2: 3})
+        for delta in self.hub.check():
+            self.hub.publish(delta)
+
+        event = subscription.queue.get_nowait()
+        self.assertEqual(event.count(b"event: station\n"), 1)
+        self.assertIn(b'"number":2,', event)
+        self.hub.unsubscribe(subscription)
+        self.assertEqual(self.hub.subscribers, 0)
+
+    async def test_slow_consumer_is_told_to_resync(self):
+        subscription = self.hub.subscribe(
+            Subscription({"test"}, max_queue=2)
+        )
+        for bikes in range(2, 5):
+            self.write(bikes={0: bikes})
+            for delta in self.hub.check():
+                self.hub.publish(delta)
+
+        self.assertEqual(subscription.queue.get_nowait(), RESYNC)
+        self.assertTrue(subscription.queue.empty())
+        self.assertEqual(subscription.dropped, 2)
+
+    async def test_watcher_pushes_deltas(self):
+        self.hub.poll_every = 0.01
+        subscription = self.hub.subscribe(Subscription({"test"}))
+        await asyncio.sleep(0.05)
+        self.write(bikes={2: 4})
+        event = await asyncio.wait_for(subscription.queue.get(), 2)
+        self.assertIn(b'"number":2,', event)
+        self.hub.unsubscribe(subscription)
+
+
+@override_settings(API_FEED_DIR=tempfile.mkdtemp())
+class LiveViewTests(SimpleTestCase):
+    def test_requires_contract_or_bbox(self):
+        for params in ({}, {"bbox": "1,2,3"}, {"bbox": "3,0,1,1"}):
+            response = self.client.get("/api/stations/live", params)
+            self.assertEqual(response.status_code, 400, params)
+
+    async def test_stream_headers(self):
+        response = await self.async_client.get(
+            "/api/stations/live", {"contract": "test"}
+        )
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        self.assertEqual(response["Cache-Control"], "no-cache")
+        stream = aiter(response.streaming_content)
+        self.assertEqual(await anext(stream), b": subscribed\n\n")
+        await stream.aclose()
@@ -0,0 +1,230 @@
+from datetime import datetime, timezone
+
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TransactionTestCase
+
+LAST_UPDATE = datetime(2023, 1, 1, tzinfo=timezone.utc)
+
+
+class MigrationTestCase(TransactionTestCase):
+    """Run ``app`` migrations back and forth around hand-made rows."""
+
+    def setUp(self):
+        self.executor = MigrationExecutor(connection)
+        self.leaves = self.executor.loader.graph.leaf_nodes()
+
+    def tearDown(self):
+        self.migrate(*self.leaves)
+
+    def migrate(self, *targets):
+        """Migrate to ``targets`` and return the historical apps there."""
+        targets = [
+            ("app", target) if isinstance(target, str) else target
+            for target in targets
+        ]
+        self.executor.loader.build_graph()
+        self.executor.migrate(targets)
+        return self.executor.loader.project_state(targets).apps
+
+    def create_station(self, apps, contract, number, **fields):
+        Contract = apps.get_model("app", "Contract")
+        Station = apps.get_model("app", "Station")
+        Contract.objects.get_or_create(
+            name=contract,
+            defaults={"commercial_name": contract, "country_code": "FR"},
+        )
+        return Station.objects.create(
+            number=number,
+            contract_id=contract,
+            name=f"Station {number}",
+            position_latitude=1.0,
+            position_longitude=2.0,
+            status="OPEN",
+            last_update=LAST_UPDATE,
+            **fields,
+        )
+
+
+class StationAvailabilityMigrationTests(MigrationTestCase):
+    def stand_values(self, kind):
+        base = {"total": 10, "main": 20, "overflow": 30}[kind]
+        return {
+            "bikes": base + 1,
+            "stands": base + 2,
+            "mechanical_bikes": base + 3,
+            "electrical_bikes": base + 4,
+            "electrical_internal_battery_bikes": base + 5,
+            "electrical_removable_battery_bikes": base + 6,
+            "capacity": None if kind == "overflow" else base + 7,
+        }
+
+    def test_stands_survive_both_ways(self):
+        apps = self.migrate("0009_name_search_indexes")
+        Stand = apps.get_model("app", "Stand")
+        station = self.create_station(apps, "test", 1, id="test-1")
+        for kind in ("total", "main", "overflow"):
+            Stand.objects.create(
+                station_id=station.pk, kind=kind, **self.stand_values(kind)
+            )
+        bare = self.create_station(apps, "test", 2, id="test-2")
+
+        apps = self.migrate("0010_station_availability")
+        StationAvailability = apps.get_model("app", "StationAvailability")
+        availability = StationAvailability.objects.get(station_id="test-1")
+        for kind in ("total", "main", "overflow"):
+            for name, value in self.stand_values(kind).items():
+                self.assertEqual(
+                    getattr(availability, f"{kind}_{name}"), value
+                )
+        self.assertFalse(
+            StationAvailability.objects.filter(station_id=bare.pk).exists()
+        )
+
+        apps = self.migrate("0009_name_search_indexes")
+        Stand = apps.get_model("app", "Stand")
+        self.assertEqual(Stand.objects.count(), 3)
+        for kind in ("total", "main", "overflow"):
+            stand = Stand.objects.get(station_id="test-1", kind=kind)
+            for name, value in self.stand_values(kind).items():
+                self.assertEqual(getattr(stand, name), value)
+
+
+class IntegerKeysMigrationTests(MigrationTestCase):
+    # Keys in creation order; ids follow ``(contract, number)`` order.
+    KEYS = [("velo-v", 12), ("lyon", 3), ("velo-v", 2)]
+    IDS = {("lyon", 3): 1, ("velo-v", 2): 2, ("velo-v", 12): 3}
+
+    def create_rows(self, apps):
+        StationAvailability = apps.get_model("app", "StationAvailability")
+        StandSnapshot = apps.get_model("app", "StandSnapshot")
+        Park = apps.get_model("app", "Park")
+        for contract, number in self.KEYS:
+            key = f"{contract}-{number}"
+            self.create_station(apps, contract, number, id=key)
+            StationAvailability.objects.create(
+                station_id=key,
+                **{
+                    f"{kind}_{name}": number
+                    for kind in ("total", "main", "overflow")
+                    for name in ("bikes", "stands")
+                },
+                **{
+                    f"{kind}_{name}": 0
+                    for kind in ("total", "main", "overflow")
+                    for name in (
+                        "mechanical_bikes",
+                        "electrical_bikes",
+                        "electrical_internal_battery_bikes",
+                        "electrical_removable_battery_bikes",
+                    )
+                },
+            )
+            StandSnapshot.objects.create(
+                station_id=key,
+                ts=LAST_UPDATE,
+                bikes=number,
+                electrical_bikes=0,
+                stands=0,
+            )
+            for name in ("FiveMinuteRollup", "HourlyRollup"):
+                apps.get_model("app", name).objects.create(
+                    station_id=key,
+                    bucket=LAST_UPDATE,
+                    samples=1,
+                    bikes_min=number,
+                    bikes_max=number,
+                    bikes_sum=number,
+                    electrical_bikes_min=0,
+                    electrical_bikes_max=0,
+                    electrical_bikes_sum=0,
+                    stands_min=0,
+                    stands_max=0,
+                    stands_sum=0,
+                )
+        Park.objects.create(
+            id="velo-v-7",
+            contract_id="velo-v",
+            number=7,
+            name="Park 7",
+            status="OPEN",
+            position_latitude=1.0,
+            position_longitude=2.0,
+            access_type="FREE",
+            locker_type="NONE",
+            has_surveillance=False,
+            is_free=True,
+            address="Somewhere",
+            zip_code="69000",
+            city="Lyon",
+            is_off_street=True,
+            has_electric_support=False,
+            has_physical_reception=False,
+        )
+
+    def references(self, apps):
+        """``{model: {station_id: bikes}}`` for every station reference."""
+        return {
+            name: dict(
+                apps.get_model("app", name).objects.values_list(
+                    "station_id", bikes
+                )
+            )
+            for name, bikes in (
+                ("StationAvailability", "total_bikes"),
+                ("StandSnapshot", "bikes"),
+                ("FiveMinuteRollup", "bikes_sum"),
+                ("HourlyRollup", "bikes_sum"),
+            )
+        }
+
+    def assertRollupKeys(self):
+        """Rollups reference stations with the same column type as others."""
+        introspection = connection.introspection
+        types = {}
+        with connection.cursor() as cursor:
+            for table in (
+                "app_stationavailability",
+                "app_fiveminuterollup",
+                "app_hourlyrollup",
+            ):
+                for column in introspection.get_table_description(
+                    cursor, table
+                ):
+                    if column.name == "station_id":
+                        types[table] = column.type_code
+        self.assertEqual(len(set(types.values())), 1, types)
+
+    def test_keys_survive_both_ways(self):
+        self.create_rows(self.migrate("0010_station_availability"))
+
+        apps = self.migrate("0011_integer_keys")
+        Station = apps.get_model("app", "Station")
+        self.assertEqual(
+            {
+                (station.contract_id, station.number): station.pk
+                for station in Station.objects.all()
+            },
+            self.IDS,
+        )
+        expected = {self.IDS[key]: key[1] for key in self.KEYS}
+        for name, rows in self.references(apps).items():
+            self.assertEqual(rows, expected, name)
+        self.assertEqual(apps.get_model("app", "Park").objects.get().pk, 1)
+        self.assertRollupKeys()
+
+        apps = self.migrate("0010_station_availability")
+        Station = apps.get_model("app", "Station")
+        self.assertEqual(
+            sorted(Station.objects.values_list("pk", flat=True)),
+            sorted(f"{contract}-{number}" for contract, number in self.KEYS),
+        )
+        expected = {
+            f"{contract}-{number}": number for contract, number in self.KEYS
+        }
+        for name, rows in self.references(apps).items():
+            self.assertEqual(rows, expected, name)
+        self.assertEqual(
+            apps.get_model("app", "Park").objects.get().pk, "velo-v-7"
+        )
+        self.assertRollupKeys()
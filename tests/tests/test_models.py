@@ -0,0 +1,61 @@
+import json
+
+from django.test import TestCase
+import responses
+
+from libs.jcdecauxclient import API_BASE_URL, JCDecauxClient, Park, Station
+from libs.jcdecauxclient.parsing import get_loads, parse_stations
+
+from .factories import station_payload
+
+PARK = {
+    "contractName": "test",
+    "name": "Park 1",
+    "number": 1,
+    "status": "OPEN",
+    "position": {"latitude": 1.0, "longitude": 2.0},
+    "accessType": "FREE",
+    "lockerType": "NONE",
+    "hasSurveillance": False,
+    "isFree": True,
+    "address": "Somewhere",
+    "zipCode": "69000",
+    "city": "Lyon",
+    "isOffStreet": True,
+    "hasElectricSupport": False,
+    "hasPhysicalReception": False,
+}
+
+
+class ModelTests(TestCase):
+    def test_station_round_trip(self):
+        data = station_payload(3, bikes=4, stands=6, electrical=2)
+        station = Station.from_api(data)
+
+        self.assertEqual(station.totalStands.electricalBikes, 2)
+        self.assertEqual(station.totalStands.capacity, 10)
+        self.assertIsNone(station.overflowStands)
+        self.assertEqual(station.to_dict(), data)
+
+    def test_park_round_trip(self):
+        self.assertEqual(Park.from_api(PARK).to_dict(), PARK)
+
+    def test_models_are_slotted(self):
+        station = parse_stations([station_payload()])[0]
+        self.assertFalse(hasattr(station, "__dict__"))
+        self.assertFalse(hasattr(station.position, "__dict__"))
+        self.assertFalse(hasattr(station.mainStands, "__dict__"))
+
+    def test_get_loads_defaults_to_stdlib(self):
+        self.assertIs(get_loads(), json.loads)
+        self.assertEqual(get_loads(fast=True)(b"[1]"), [1])
+
+    @responses.activate
+    def test_client_with_fast_json(self):
+        url = f"{API_BASE_URL}/vls/v3/stations"
+        responses.add(responses.GET, url, json=[station_payload(7)])
+
+        client = JCDecauxClient(api_key="dummy", fast_json=True)
+        stations = client.list_stations()
+
+        self.assertEqual(stations[0].number, 7)
@@ -0,0 +1,62 @@
+import time
+from unittest.mock import patch
+
+from django.test import SimpleTestCase
+
+from benchmarks.fake_server import FakeJCDecauxServer
+from libs.jcdecauxclient import JCDecauxClient, StationCache
+
+
+class ParallelClientTests(SimpleTestCase):
+    def test_list_stations_many_runs_concurrently(self):
+        server = FakeJCDecauxServer(
+            stations=80, contracts=8, tick=None, latency=0.1
+        )
+        with server:
+            client = JCDecauxClient(api_key="dummy", base_url=server.url)
+            start = time.perf_counter()
+            results = list(client.list_stations_many(server.network.contracts))
+            elapsed = time.perf_counter() - start
+
+        self.assertEqual(len(results), 8)
+        self.assertTrue(all(len(r.value) == 10 for r in results))
+        self.assertLess(elapsed, 0.5)
+
+    def test_list_parks_many_reports_errors_per_contract(self):
+        with FakeJCDecauxServer(stations=4, contracts=4, tick=None) as server:
+            client = JCDecauxClient(api_key="dummy", base_url=server.url)
+            results = {
+                r.contract: r
+                for r in client.list_parks_many(
+                    server.network.contracts, workers=2
+                )
+            }
+
+        self.assertTrue(results["contract0"].ok)
+        self.assertIsInstance(results["contract1"].error, ValueError)
+
+    def test_get_stations(self):
+        with FakeJCDecauxServer(stations=20, contracts=2, tick=None) as server:
+            cache = StationCache()
+            client = JCDecauxClient(
+                api_key="dummy", base_url=server.url, cache=cache
+            )
+            lookups = [(0, "contract0"), (1, "contract1"), (99, "contract1")]
+            stations = client.get_stations(lookups, workers=4)
+
+        self.assertEqual(
+            set(stations), {("contract0", 0), ("contract1", 1)}
+        )
+        self.assertEqual(server.requests, 2)
+        self.assertGreaterEqual(client.pool_size, 4)
+
+    def test_growing_the_pool_closes_the_old_one(self):
+        client = JCDecauxClient(api_key="dummy", pool_size=2)
+        old = client.session.get_adapter("https://")
+        with patch.object(old, "close", wraps=old.close) as close:
+            self.assertEqual(client._workers(8), 8)
+        close.assert_called()
+        adapter = client.session.get_adapter("https://")
+        self.assertIsNot(adapter, old)
+        self.assertIs(client.session.get_adapter("http://"), adapter)
+        self.assertEqual(adapter._pool_maxsize, 8)
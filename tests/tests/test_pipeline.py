@@ -0,0 +1,78 @@
+import asyncio
+import threading
+
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+
+from app.changes import ChangeDetector
+from app.pipeline import WritePipeline
+from libs.jcdecauxclient import Station
+
+from .factories import station_payload
+
+
+def stations(numbers, **kwargs):
+    return [Station.from_api(station_payload(n, **kwargs)) for n in numbers]
+
+
+class WritePipelineTests(SimpleTestCase):
+    async def test_queued_batches_are_coalesced_into_one_write(self):
+        release = threading.Event()
+        calls = []
+
+        def write(batch):
+            calls.append(batch)
+            if len(calls) == 1:
+                release.wait(timeout=5)
+
+        async with WritePipeline(write=write) as pipeline:
+            await pipeline.submit(stations([1]))
+            await asyncio.sleep(0.05)
+            # The writer is busy: these return at once and pile up.
+            await asyncio.wait_for(pipeline.submit(stations([2, 3])), 0.1)
+            await pipeline.submit(stations([3], bikes=4))
+            release.set()
+
+        self.assertEqual(len(calls), 2)
+        second = {s.number: s for s in calls[1]}
+        self.assertEqual(sorted(second), [2, 3])
+        self.assertEqual(second[3].totalStands.bikes, 4)
+        self.assertEqual(pipeline.metrics()["written"], 3)
+
+    async def test_full_queue_applies_backpressure(self):
+        release = threading.Event()
+
+        async with WritePipeline(
+            write=lambda batch: release.wait(timeout=5), max_queue=1
+        ) as pipeline:
+            await pipeline.submit(stations([1]))
+            await asyncio.sleep(0.05)
+            await pipeline.submit(stations([2]))
+            with self.assertRaises(asyncio.TimeoutError):
+                await asyncio.wait_for(pipeline.submit(stations([3])), 0.05)
+            release.set()
+
+    async def test_failed_write_is_retried_on_next_poll(self):
+        def write(batch):
+            raise RuntimeError("database is locked")
+
+        detector = ChangeDetector()
+        changes = detector.select(stations([1, 2]))
+        detector.commit(changes)
+        with self.assertLogs("app.pipeline", level="ERROR"):
+            async with WritePipeline(write=write, detector=detector) as p:
+                await p.submit(changes.changed)
+                await p.flush()
+
+        self.assertEqual(p.errors, 1)
+        self.assertEqual(len(detector.select(stations([1, 2])).changed), 2)
+
+
+class SQLiteProfileTests(TestCase):
+    def test_pragmas_are_applied(self):
+        with connection.cursor() as cursor:
+            cursor.execute("PRAGMA synchronous")
+            self.assertEqual(cursor.fetchone()[0], 1)
+            cursor.execute("PRAGMA busy_timeout")
+            self.assertEqual(cursor.fetchone()[0], 20000)
+        self.assertEqual(connection.transaction_mode, "IMMEDIATE")
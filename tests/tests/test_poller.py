@@ -0,0 +1,67 @@
+import asyncio
+
+from django.test import SimpleTestCase
+
+from app.poller import ContractSchedule, Poller
+from libs.jcdecauxclient import PollResult, Station
+
+from .factories import station_payload
+
+
+class StubClient:
+    def __init__(self, busy):
+        self.busy = busy
+        self.calls = []
+
+    async def poll_stations(self, contract):
+        self.calls.append(contract)
+        if contract == "broken":
+            raise RuntimeError("boom")
+        changed = []
+        if contract in self.busy:
+            changed = [Station.from_api(station_payload(1, contract))]
+        return PollResult(modified=bool(changed), changed=changed)
+
+
+class ContractScheduleTests(SimpleTestCase):
+    def test_interval_adapts_within_bounds(self):
+        schedule = ContractSchedule("a", 40, min_interval=10, max_interval=60)
+        schedule.record(changed=3)
+        self.assertEqual(schedule.interval, 20)
+        schedule.record(changed=1)
+        schedule.record(changed=1)
+        self.assertEqual(schedule.interval, 10)
+        for _ in range(10):
+            schedule.record(changed=0)
+        self.assertEqual(schedule.interval, 60)
+
+
+class PollerTests(SimpleTestCase):
+    async def test_busy_contracts_are_polled_more_often(self):
+        client = StubClient(busy={"busy"})
+        written = []
+
+        async def write(stations):
+            written.extend(stations)
+
+        poller = Poller(
+            client,
+            ["busy", "quiet", "broken"],
+            min_interval=0.01,
+            max_interval=0.2,
+            write=write,
+        )
+        with self.assertLogs("app.poller", level="ERROR"):
+            task = asyncio.create_task(poller.run())
+            await asyncio.sleep(0.3)
+            poller.stop()
+            await asyncio.wait_for(task, timeout=1)
+
+        metrics = poller.metrics()
+        self.assertGreater(
+            metrics["busy"]["polls"], 2 * metrics["quiet"]["polls"]
+        )
+        self.assertGreater(metrics["quiet"]["interval"], 0.01)
+        self.assertEqual(metrics["busy"]["interval"], 0.01)
+        self.assertGreater(metrics["broken"]["errors"], 0)
+        self.assertEqual(len(written), metrics["busy"]["changed"])
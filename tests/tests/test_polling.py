@@ -0,0 +1,113 @@
+from django.test import TestCase
+from unittest.mock import AsyncMock, patch
+import responses
+import httpx
+
+from libs.jcdecauxclient import (
+    API_BASE_URL,
+    JCDecauxClient,
+    JCDecauxClientAsync,
+    StationCache,
+)
+
+from .factories import station_payload
+
+URL = f"{API_BASE_URL}/vls/v3/stations"
+
+
+class PollStationsTests(TestCase):
+    @responses.activate
+    def test_first_poll_returns_every_station(self):
+        data = [station_payload(1), station_payload(2)]
+        responses.add(responses.GET, URL, json=data, headers={"ETag": '"v1"'})
+
+        client = JCDecauxClient(api_key="dummy")
+        result = client.poll_stations()
+
+        self.assertTrue(result.modified)
+        self.assertEqual([s.number for s in result.changed], [1, 2])
+        self.assertEqual(result.etag, '"v1"')
+
+    @responses.activate
+    def test_second_poll_sends_validators_and_handles_304(self):
+        responses.add(
+            responses.GET,
+            URL,
+            json=[station_payload(1)],
+            headers={"ETag": '"v1"', "Last-Modified": "Mon, 01 Jan 2024"},
+        )
+        responses.add(responses.GET, URL, status=304)
+
+        client = JCDecauxClient(api_key="dummy")
+        client.poll_stations()
+        result = client.poll_stations()
+
+        self.assertFalse(result.modified)
+        self.assertEqual(result.changed, [])
+        headers = responses.calls[1].request.headers
+        self.assertEqual(headers["If-None-Match"], '"v1"')
+        self.assertEqual(headers["If-Modified-Since"], "Mon, 01 Jan 2024")
+
+    @responses.activate
+    def test_only_changed_and_removed_stations_are_reported(self):
+        responses.add(
+            responses.GET, URL, json=[station_payload(1), station_payload(2)]
+        )
+        responses.add(
+            responses.GET, URL, json=[station_payload(1), station_payload(2)]
+        )
+        responses.add(
+            responses.GET,
+            URL,
+            json=[station_payload(1, bikes=0, stands=2)],
+        )
+
+        client = JCDecauxClient(api_key="dummy")
+        client.poll_stations()
+        unchanged = client.poll_stations()
+        result = client.poll_stations()
+
+        self.assertFalse(unchanged.modified)
+        self.assertTrue(result.modified)
+        self.assertEqual([s.number for s in result.changed], [1])
+        self.assertEqual(result.changed[0].totalStands.bikes, 0)
+        self.assertEqual(result.removed, [("test", 2)])
+
+    @responses.activate
+    def test_removed_stations_leave_the_cache(self):
+        data = [station_payload(1), station_payload(2)]
+        responses.add(responses.GET, URL, json=data)
+        responses.add(responses.GET, URL, json=[station_payload(1)])
+
+        cache = StationCache()
+        client = JCDecauxClient(api_key="dummy", cache=cache)
+        first = client.poll_stations()
+        cache.store_stations(first.changed)
+        client.poll_stations()
+
+        self.assertIsNotNone(cache.get_station("test", 1))
+        self.assertIsNone(cache.get_station("test", 2))
+
+
+class PollStationsAsyncTests(TestCase):
+    async def test_not_modified(self):
+        first = httpx.Response(
+            200,
+            json=[station_payload(1)],
+            headers={"ETag": '"v1"'},
+            request=httpx.Request("GET", URL),
+        )
+        second = httpx.Response(304, request=httpx.Request("GET", URL))
+        get = AsyncMock(side_effect=[first, second])
+        with patch(
+            "libs.jcdecauxclient.async_client.httpx.AsyncClient.get", new=get
+        ):
+            client = JCDecauxClientAsync(api_key="dummy")
+            initial = await client.poll_stations()
+            result = await client.poll_stations()
+            await client.close()
+
+        self.assertEqual(len(initial.changed), 1)
+        self.assertFalse(result.modified)
+        headers = get.call_args.kwargs["headers"]
+        self.assertEqual(headers["If-None-Match"], '"v1"')
@@ -0,0 +1,176 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.test import TestCase
+from unittest.mock import patch
+import requests
+import responses
+import httpx
+
+from libs.jcdecauxclient import (
+    API_BASE_URL,
+    CircuitOpenError,
+    JCDecauxClient,
+    JCDecauxClientAsync,
+    RequestPolicy,
+    TokenBucket,
+)
+from libs.jcdecauxclient.ratelimit import CircuitBreaker, parse_retry_after
+
+URL = f"{API_BASE_URL}/vls/v3/contracts"
+CONTRACTS = [{"name": "test", "commercial_name": "T", "country_code": "FR"}]
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TokenBucketTests(TestCase):
+    def test_paces_after_burst(self):
+        clock = FakeClock()
+        bucket = TokenBucket(rate=10, burst=2, clock=clock)
+
+        self.assertEqual(bucket.reserve(), 0.0)
+        self.assertEqual(bucket.reserve(), 0.0)
+        self.assertAlmostEqual(bucket.reserve(), 0.1)
+        self.assertAlmostEqual(bucket.reserve(), 0.2)
+        clock.now = 1.0
+        self.assertEqual(bucket.reserve(), 0.0)
+
+    def test_rate_adapts_to_throttling(self):
+        bucket = TokenBucket(rate=20)
+        bucket.throttled()
+        self.assertEqual(bucket.rate, 10)
+        for _ in range(100):
+            bucket.succeeded()
+        self.assertEqual(bucket.rate, 20)
+
+
+class CircuitBreakerTests(TestCase):
+    def test_opens_then_half_opens(self):
+        clock = FakeClock()
+        breaker = CircuitBreaker(
+            failure_threshold=2, reset_timeout=10, clock=clock
+        )
+        breaker.record_failure()
+        breaker.check("stations")
+        breaker.record_failure()
+        with self.assertRaises(CircuitOpenError):
+            breaker.check("stations")
+
+        clock.now = 10
+        breaker.check("stations")
+        breaker.record_success()
+        self.assertFalse(breaker.is_open)
+
+    def test_half_open_admits_one_probe(self):
+        clock = FakeClock()
+        breaker = CircuitBreaker(
+            failure_threshold=1, reset_timeout=10, clock=clock
+        )
+        breaker.record_failure()
+        clock.now = 10
+
+        breaker.check("stations")
+        self.assertTrue(breaker.is_half_open)
+        with self.assertRaises(CircuitOpenError):
+            breaker.check("stations")
+        breaker.record_failure()
+        self.assertFalse(breaker.is_half_open)
+        with self.assertRaises(CircuitOpenError):
+            breaker.check("stations")
+
+        clock.now = 20
+        breaker.check("stations")
+        clock.now = 30
+        breaker.check("stations")
+        breaker.record_success()
+        breaker.check("stations")
+        self.assertFalse(breaker.is_open)
+
+    def test_concurrent_callers_after_timeout(self):
+        clock = FakeClock()
+        breaker = CircuitBreaker(
+            failure_threshold=1, reset_timeout=10, clock=clock
+        )
+        breaker.record_failure()
+        clock.now = 10
+        admitted = []
+
+        def call():
+            try:
+                breaker.check("stations")
+            except CircuitOpenError:
+                return
+            admitted.append(True)
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            for _ in range(32):
+                executor.submit(call)
+        self.assertEqual(admitted, [True])
+
+
+class RetryAfterTests(TestCase):
+    def test_seconds_and_http_date(self):
+        self.assertEqual(parse_retry_after("3"), 3.0)
+        self.assertEqual(
+            parse_retry_after("Thu, 01 Jan 1970 00:00:10 GMT", now=4), 6.0
+        )
+        self.assertIsNone(parse_retry_after("soon"))
+
+    def test_backoff_honours_retry_after(self):
+        policy = RequestPolicy(backoff_base=0.01)
+        self.assertGreaterEqual(policy.backoff(0, "5"), 5)
+
+
+class ClientRetryTests(TestCase):
+    @responses.activate
+    def test_retries_throttled_requests(self):
+        responses.add(
+            responses.GET, URL, status=429, headers={"Retry-After": "2"}
+        )
+        responses.add(responses.GET, URL, json=CONTRACTS)
+        bucket = TokenBucket(rate=100)
+        client = JCDecauxClient(
+            api_key="dummy", policy=RequestPolicy(limiter=bucket)
+        )
+
+        with patch("libs.jcdecauxclient.client.time.sleep") as sleep:
+            contracts = client.get_contracts()
+
+        self.assertEqual(contracts[0].name, "test")
+        self.assertGreaterEqual(sleep.call_args.args[0], 2)
+        self.assertLess(bucket.rate, 100)
+
+    @responses.activate
+    def test_gives_up_after_max_retries(self):
+        responses.add(responses.GET, URL, status=503)
+        client = JCDecauxClient(
+            api_key="dummy",
+            policy=RequestPolicy(max_retries=2, backoff_base=0),
+        )
+
+        with self.assertRaises(requests.HTTPError):
+            client.get_contracts()
+        self.assertEqual(len(responses.calls), 3)
+
+    async def test_async_retries_server_errors(self):
+        statuses = iter([503, 200])
+
+        def handler(request):
+            status = next(statuses)
+            return httpx.Response(status, json=CONTRACTS)
+
+        client = JCDecauxClientAsync(
+            api_key="dummy", policy=RequestPolicy(backoff_base=0)
+        )
+        client.client = httpx.AsyncClient(
+            transport=httpx.MockTransport(handler)
+        )
+        contracts = await client.get_contracts()
+        await client.close()
+
+        self.assertEqual(contracts[0].name, "test")
@@ -0,0 +1,63 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from app.models import Contract, Park
+from app.reference import sync_contracts, sync_parks
+from benchmarks.fake_server import FakeJCDecauxServer
+from libs.jcdecauxclient import Contract as ApiContract
+from libs.jcdecauxclient import JCDecauxClient
+
+
+class SyncContractsTests(TestCase):
+    def test_unchanged_contracts_are_skipped(self):
+        contracts = [
+            ApiContract("lyon", "Velov", "FR", ["Lyon"]),
+            ApiContract("nantes", "Bicloo", "FR", ["Nantes"]),
+        ]
+        self.assertEqual(sync_contracts(contracts).contracts, 2)
+
+        with CaptureQueriesContext(connection) as queries:
+            result = sync_contracts(contracts)
+        self.assertEqual((result.contracts, result.contracts_skipped), (0, 2))
+        self.assertEqual(len(queries), 1)
+
+        contracts[1].cities.append("Reze")
+        self.assertEqual(sync_contracts(contracts).contracts, 1)
+        self.assertEqual(
+            Contract.objects.get(name="nantes").cities, ["Nantes", "Reze"]
+        )
+
+
+class SyncParksTests(TestCase):
+    def test_parks_are_hash_skipped_and_unsupported_contracts_remembered(
+        self,
+    ):
+        with FakeJCDecauxServer(stations=4, contracts=4, tick=None) as server:
+            client = JCDecauxClient(api_key="dummy", base_url=server.url)
+            sync_contracts(client.get_contracts())
+
+            first = sync_parks(client)
+            self.assertEqual((first.parks, first.unsupported), (10, 2))
+            self.assertEqual(
+                set(
+                    Contract.objects.filter(parks_supported=False).values_list(
+                        "name", flat=True
+                    )
+                ),
+                {"contract1", "contract3"},
+            )
+
+            requests = server.requests
+            second = sync_parks(client)
+            self.assertEqual(server.requests - requests, 2)
+            self.assertEqual((second.parks, second.parks_skipped), (0, 10))
+
+            server.network.parks["contract0"].pop()
+            third = sync_parks(client, retry_unsupported=True)
+            self.assertEqual((third.parks, third.unsupported), (4, 2))
+
+        self.assertEqual(Park.objects.count(), 9)
+        self.assertTrue(
+            Park.objects.filter(contract_id="contract2", number=3).exists()
+        )
@@ -0,0 +1,171 @@
+import random
+import tempfile
+
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from app import models, views
+from app.feed import FeedStore, publish_contracts
+from app.ingest import upsert_stations
+from app.spatial import (
+    Availability,
+    FeedSpatialIndex,
+    GridIndex,
+    Point,
+    distance,
+)
+from libs.jcdecauxclient import Station
+
+from .factories import station_payload
+
+
+def point(key, latitude, longitude, bikes=1, electrical=0, stands=1):
+    contract, number = key.rsplit("-", 1)
+    return Point(
+        key,
+        contract,
+        int(number),
+        key,
+        latitude,
+        longitude,
+        "OPEN",
+        bikes,
+        electrical,
+        stands,
+    )
+
+
+class GridIndexTests(SimpleTestCase):
+    def setUp(self):
+        rng = random.Random(0)
+        self.points = [
+            point(
+                f"lyon-{n}",
+                45.70 + rng.random() * 0.1,
+                4.80 + rng.random() * 0.1,
+                bikes=rng.randint(0, 5),
+            )
+            for n in range(500)
+        ]
+        self.grid = GridIndex()
+        for p in self.points:
+            self.grid.upsert(p)
+
+    def brute_force(self, lat, lon, predicate=lambda p: True):
+        return sorted(
+            (distance(lat, lon, p.latitude, p.longitude), p.key)
+            for p in self.points
+            if predicate(p)
+        )
+
+    def test_nearest_matches_brute_force(self):
+        predicate = Availability(min_bikes=3)
+        for lat, lon in ((45.75, 4.85), (45.70, 4.80), (45.9, 5.0)):
+            found = self.grid.nearest(lat, lon, k=7, predicate=predicate)
+            expected = self.brute_force(lat, lon, predicate)[:7]
+            self.assertEqual(
+                [p.key for _, p in found], [key for _, key in expected]
+            )
+
+    def test_within_radius(self):
+        found = self.grid.within(45.75, 4.85, 1500)
+        expected = [
+            key
+            for meters, key in self.brute_force(45.75, 4.85)
+            if meters <= 1500
+        ]
+        self.assertEqual([p.key for _, p in found], expected)
+        self.assertEqual(self.grid.nearest(0, 0, k=3, radius=1000), [])
+
+    def test_incremental_updates(self):
+        moved = point("lyon-1", 45.0, 4.0, bikes=9)
+        self.grid.upsert(moved)
+        self.assertEqual(len(self.grid), 500)
+        found = self.grid.nearest(45.0, 4.0, k=1)
+        self.assertEqual(found[0][1].bikes, 9)
+
+        self.grid.replace_contract("lyon", [moved])
+        self.assertEqual(len(self.grid), 1)
+        self.grid.drop_contract("lyon")
+        self.assertEqual(self.grid.nearest(45.0, 4.0), [])
+
+
+class NearbyApiTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        settings = override_settings(API_FEED_DIR=tmp.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        views.store = FeedStore()
+        views.spatial = FeedSpatialIndex(views.store, refresh_every=0)
+        self.write([(0, 1.0, 2.0, 0), (1, 1.001, 2.0, 4), (2, 1.01, 2.0, 2)])
+
+    def write(self, rows):
+        upsert_stations(
+            [
+                Station.from_api(
+                    station_payload(
+                        number, latitude=lat, longitude=lon, bikes=bikes
+                    )
+                )
+                for number, lat, lon, bikes in rows
+            ]
+        )
+        publish_contracts(["test"])
+
+    def test_nearest_with_availability_filter(self):
+        response = self.client.get(
+            "/api/stations/nearby",
+            {"lat": 1.0, "lon": 2.0, "k": 2, "min_bikes": 2},
+        )
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual([s["number"] for s in data], [1, 2])
+        self.assertAlmostEqual(data[0]["distance"], 111.2, places=0)
+
+    def test_radius_and_refresh(self):
+        params = {"lat": 1.0, "lon": 2.0, "radius": 500}
+        numbers = [
+            s["number"]
+            for s in self.client.get("/api/stations/nearby", params).json()
+        ]
+        self.assertEqual(numbers, [0, 1])
+
+        self.write([(2, 1.0005, 2.0, 3)])
+        numbers = [
+            s["number"]
+            for s in self.client.get("/api/stations/nearby", params).json()
+        ]
+        self.assertEqual(numbers, [0, 2, 1])
+
+    def test_station_without_availabilities(self):
+        models.Station.objects.create(
+            number=3,
+            contract_id="test",
+            name="Station 3",
+            position_latitude=1.0002,
+            position_longitude=2.0,
+            status="OPEN",
+            last_update=timezone.now(),
+        )
+        publish_contracts(["test"])
+        params = {"lat": 1.0, "lon": 2.0, "radius": 500}
+        response = self.client.get("/api/stations/nearby", params)
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual([s["number"] for s in data], [0, 3, 1])
+        self.assertEqual(data[1]["bikes"], 0)
+        response = self.client.get(
+            "/api/stations/nearby", {**params, "min_bikes": 1}
+        )
+        self.assertEqual([s["number"] for s in response.json()], [1])
+
+    def test_invalid_parameters(self):
+        for params in (
+            {"lat": 1},
+            {"lat": "x", "lon": 1},
+            {"lat": 91, "lon": 0},
+        ):
+            response = self.client.get("/api/stations/nearby", params)
+            self.assertEqual(response.status_code, 400, params)
@@ -0,0 +1,83 @@
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+
+from app.ingest import upsert_stations
+from app.models import Contract, ContractStats
+from app.stats import (
+    apply_stats_deltas,
+    compute_contract_stats,
+    stored_contract_stats,
+)
+from libs.jcdecauxclient import Station
+
+from .factories import station_payload
+
+
+def station(number, contract="test", **kwargs):
+    return Station.from_api(station_payload(number, contract, **kwargs))
+
+
+class ContractStatsTests(TestCase):
+    def setUp(self):
+        upsert_stations(
+            [
+                station(0, bikes=0, stands=5),
+                station(1, bikes=4, stands=0, electrical=2),
+                station(2, bikes=0, stands=3, status="CLOSED"),
+                station(0, "other", bikes=2, stands=2),
+            ]
+        )
+
+    def stats(self, contract="test"):
+        return stored_contract_stats([contract])[contract]
+
+    def test_stats_follow_station_changes(self):
+        self.assertEqual(self.stats(), (3, 4, 2, 8, 1, 1, 1))
+        self.assertEqual(self.stats("other"), (1, 2, 0, 2, 0, 0, 0))
+
+        upsert_stations(
+            [
+                station(0, bikes=3, stands=2),
+                station(2, bikes=0, stands=3),
+                station(3, bikes=1, stands=1),
+            ]
+        )
+        self.assertEqual(self.stats(), (4, 8, 2, 6, 1, 1, 0))
+        self.assertEqual(stored_contract_stats(), compute_contract_stats())
+
+    def test_deltas_move_the_stored_rows(self):
+        Contract.objects.create(name="new", commercial_name="New")
+        deltas = {
+            "test": [0, 1, 1, -1, 0, 0, 0],
+            "new": [1, 2, 0, 3, 0, 0, 0],
+        }
+        # No read: one insert for missing rows, then one relative update
+        # per contract, so a concurrent writer's change is kept.
+        with self.assertNumQueries(3):
+            apply_stats_deltas(deltas)
+        self.assertEqual(self.stats(), (3, 5, 3, 7, 1, 1, 1))
+        self.assertEqual(self.stats("new"), (1, 2, 0, 3, 0, 0, 0))
+
+    def test_dashboard_is_one_query(self):
+        with self.assertNumQueries(1):
+            data = self.client.get("/api/contracts/test/stats").json()
+        self.assertEqual(data["emptyStations"], 1)
+        self.assertEqual(data["fullStations"], 1)
+        self.assertEqual(data["closedStations"], 1)
+        self.assertEqual(
+            self.client.get("/api/contracts/nope/stats").status_code, 404
+        )
+
+    def test_rebuild_command(self):
+        ContractStats.objects.filter(contract_id="test").update(bikes=99)
+        out = StringIO()
+        with self.assertRaisesMessage(CommandError, "1 contracts"):
+            call_command("rebuild_contract_stats", "--check", stdout=out)
+        self.assertIn("test: bikes 99 != 4", out.getvalue())
+
+        call_command("rebuild_contract_stats", stdout=out)
+        self.assertIn("Fixed the stats of 1 contracts", out.getvalue())
+        call_command("rebuild_contract_stats", "--check", stdout=out)
+        self.assertEqual(self.stats()[1], 4)
@@ -0,0 +1,74 @@
+import json
+
+from django.test import TestCase
+import responses
+import httpx
+
+from libs.jcdecauxclient import (
+    API_BASE_URL,
+    JCDecauxClient,
+    JCDecauxClientAsync,
+)
+from libs.jcdecauxclient.streaming import JSONArrayDecoder
+
+from .factories import station_payload
+
+URL = f"{API_BASE_URL}/vls/v3/stations"
+
+
+def decode(body: bytes, size: int):
+    decoder = JSONArrayDecoder()
+    items = []
+    for i in range(0, len(body), size):
+        items.extend(decoder.feed(body[i:i + size]))
+    items.extend(decoder.close())
+    return items
+
+
+class JSONArrayDecoderTests(TestCase):
+    def test_any_chunk_boundary(self):
+        data = [{"name": "Gare Saint-Clément"}, 12, [1, 2], None, "x"]
+        body = json.dumps(data, ensure_ascii=False, indent=1).encode()
+        for size in (1, 2, 3, 7, len(body)):
+            self.assertEqual(decode(body, size), data)
+
+    def test_items_are_released_as_soon_as_complete(self):
+        decoder = JSONArrayDecoder()
+        self.assertEqual(decoder.feed(b'[{"a": 1}, {"b"'), [{"a": 1}])
+        self.assertEqual(decoder.feed(b": 2}]"), [{"b": 2}])
+        self.assertEqual(decoder.close(), [])
+
+    def test_empty_array(self):
+        self.assertEqual(decode(b" [ ] ", 2), [])
+
+    def test_truncated_body(self):
+        decoder = JSONArrayDecoder()
+        decoder.feed(b'[{"a": 1},')
+        with self.assertRaises(ValueError):
+            decoder.close()
+
+
+class IterStationsTests(TestCase):
+    @responses.activate
+    def test_iter_stations(self):
+        data = [station_payload(n, contract=f"c{n}") for n in range(5)]
+        responses.add(responses.GET, URL, body=json.dumps(data))
+
+        client = JCDecauxClient(api_key="dummy")
+        stations = list(client.iter_stations(chunk_size=100))
+
+        self.assertEqual([s.number for s in stations], list(range(5)))
+        self.assertEqual(stations[3].contractName, "c3")
+
+    async def test_iter_stations_async(self):
+        data = [station_payload(n) for n in range(3)]
+        transport = httpx.MockTransport(
+            lambda request: httpx.Response(200, json=data)
+        )
+        client = JCDecauxClientAsync(api_key="dummy")
+        client.client = httpx.AsyncClient(transport=transport)
+
+        numbers = [s.number async for s in client.iter_stations()]
+        await client.close()
+
+        self.assertEqual(numbers, [0, 1, 2])